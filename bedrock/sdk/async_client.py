@@ -0,0 +1,709 @@
+from dataclasses import replace
+from typing import Dict, List, Optional, Tuple, Union, AsyncIterator
+import asyncio
+import inspect
+import json
+import time
+from bedrock_sdk.bedrock_client import BedrockClient, ConversationHistory, ModelConfig, BatchPrompt
+from bedrock_sdk.prompt_template import PromptTemplate, FewShotTemplate
+from bedrock_sdk.concurrency import AsyncAIMDLimiter
+from bedrock_sdk.retry import RetryPolicy, RetryStats, error_code, is_throttling_error
+from bedrock_sdk.cache import ResponseCache
+from bedrock_sdk.streaming import AsyncStreamResponse
+from bedrock_sdk.providers import get_provider
+from bedrock_sdk.clients import DEFAULT_CONNECT_TIMEOUT, DEFAULT_READ_TIMEOUT
+from bedrock_sdk.metrics import MetricsHook
+from bedrock_sdk.ledger import TokenLedger
+from bedrock_sdk.prompt_cache import PromptCache
+from bedrock_sdk.hedging import HedgePolicy
+from bedrock_sdk.cascade import CascadeAttempt, ModelCascade
+from bedrock_sdk.semantic_cache import SemanticCache
+from bedrock_sdk.singleflight import AsyncStreamTee, SingleFlight
+from bedrock_sdk.sessions import Session, SessionStore
+
+try:
+    from aiobotocore.session import AioSession
+    from aiobotocore.config import AioConfig
+except ImportError:  # aiobotocore is only needed for the async client
+    AioSession = None
+    AioConfig = None
+
+
+class AsyncBedrockClient(BedrockClient):
+    """
+    asyncio client for AWS Bedrock model interactions.
+
+    Shares prompt formatting, conversation history and the invoke_model fallback
+    with BedrockClient, but issues requests through aiobotocore so thousands of
+    calls can be in flight on a single event loop.
+
+    Use include_history=False when fanning out independent requests, since all
+    calls on one client share the same conversation history.
+    """
+
+    def __init__(
+        self,
+        region_name: str = "us-east-1",
+        max_retries: int = 4,
+        base_delay: float = 1.0,
+        profile_name: Optional[str] = None,
+        retry_policy: Optional[RetryPolicy] = None,
+        response_cache: Optional[ResponseCache] = None,
+        max_pool_connections: int = 1000,
+        client=None,
+        connect_timeout: float = DEFAULT_CONNECT_TIMEOUT,
+        read_timeout: float = DEFAULT_READ_TIMEOUT,
+        tcp_keepalive: bool = True,
+        metrics_hooks: Optional[List[MetricsHook]] = None,
+        ledger: Optional[TokenLedger] = None,
+        prompt_cache: Optional[PromptCache] = None,
+        hedge_policy: Optional[HedgePolicy] = None,
+        semantic_cache: Optional[SemanticCache] = None,
+        single_flight: Optional[SingleFlight] = None,
+        session_store: Optional[SessionStore] = None
+    ):
+        """
+        Args:
+            region_name: AWS region
+            max_retries: Retries for transient errors, used when retry_policy is not given
+            base_delay: Exponential backoff base in seconds, used when retry_policy is not given
+            profile_name: AWS profile name
+            retry_policy: Backoff, deadline and budget settings for transient errors
+            response_cache: Optional cache of responses keyed on model, inference config and messages
+            max_pool_connections: Size of the HTTP connection pool
+            client: Optional already-entered aiobotocore bedrock-runtime client
+            connect_timeout: Seconds to wait for a connection
+            read_timeout: Seconds to wait for response data
+            tcp_keepalive: Enable TCP keepalive on pooled connections
+            metrics_hooks: Callables receiving a MetricsEvent for every request, retry and fallback
+            ledger: Token and cost ledger; a new TokenLedger with DEFAULT_PRICES if not given
+            prompt_cache: Places Converse cache checkpoints after repeated prompt prefixes
+            hedge_policy: Send a second request when a non-streaming converse call is slower
+                than the policy's delay; the slower call is cancelled. The policy's
+                client must be an already-entered aiobotocore client.
+            semantic_cache: Reuse answers to near-identical requests for opted-in templates
+            single_flight: Share one model call between concurrent identical requests
+            session_store: Conversation histories for converse(..., session_id=...)
+        """
+        super().__init__(
+            region_name=region_name,
+            max_retries=max_retries,
+            base_delay=base_delay,
+            profile_name=profile_name,
+            retry_policy=retry_policy,
+            response_cache=response_cache,
+            client=client,
+            max_pool_connections=max_pool_connections,
+            connect_timeout=connect_timeout,
+            read_timeout=read_timeout,
+            tcp_keepalive=tcp_keepalive,
+            metrics_hooks=metrics_hooks,
+            ledger=ledger,
+            prompt_cache=prompt_cache,
+            hedge_policy=hedge_policy,
+            semantic_cache=semantic_cache,
+            single_flight=single_flight,
+            session_store=session_store
+        )
+        self._client_context = None
+        self._hedge_client_context = None
+        self._client_lock = asyncio.Lock()
+
+    def _create_client(self):
+        """The aiobotocore client is created lazily inside the event loop"""
+        return self._external_client
+
+    async def _get_client(self):
+        """Return the aiobotocore client, creating it on first use"""
+        if self.client is not None:
+            return self.client
+        async with self._client_lock:
+            if self.client is None:
+                if AioSession is None:
+                    raise ImportError(
+                        "AsyncBedrockClient requires aiobotocore: pip install aiobotocore"
+                    )
+                session = AioSession(profile=self.profile_name)
+                self._client_context = session.create_client(
+                    'bedrock-runtime',
+                    region_name=self.region_name,
+                    config=self._client_config(AioConfig)
+                )
+                self.client = await self._client_context.__aenter__()
+        return self.client
+
+    async def _get_hedge_client(self):
+        """Return the aiobotocore client for hedge requests, creating it on first use"""
+        hedge = self.hedge_policy
+        if hedge.client is not None:
+            return hedge.client
+        if hedge.region_name is None and hedge.profile_name is None:
+            return await self._get_client()
+        async with self._client_lock:
+            if hedge.client is None:
+                session = AioSession(profile=hedge.profile_name or self.profile_name)
+                self._hedge_client_context = session.create_client(
+                    'bedrock-runtime',
+                    region_name=hedge.region_name or self.region_name,
+                    config=self._client_config(AioConfig)
+                )
+                hedge.client = await self._hedge_client_context.__aenter__()
+        return hedge.client
+
+    async def close(self):
+        """Close the underlying aiobotocore clients if this instance created them"""
+        if self._client_context is not None:
+            await self._client_context.__aexit__(None, None, None)
+            self._client_context = None
+            self.client = None
+        if self._hedge_client_context is not None:
+            await self._hedge_client_context.__aexit__(None, None, None)
+            self._hedge_client_context = None
+            self.hedge_policy.client = None
+
+    async def __aenter__(self) -> "AsyncBedrockClient":
+        await self._get_client()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    async def converse(
+        self,
+        prompt: Union[str, PromptTemplate],
+        model_config: ModelConfig,
+        variables: Dict[str, str] = {},
+        few_shot_template: Optional[FewShotTemplate] = None,
+        stream: bool = False,
+        include_history: bool = True,
+        should_rety: bool = True,
+        retry_stats: Optional[RetryStats] = None,
+        use_cache: bool = True,
+        tags: Optional[List[str]] = None,
+        session_id: Optional[str] = None,
+    ) -> Union[str, AsyncStreamResponse]:
+        """
+        Conversation with model using converse API when possible, falling back to invoke_model
+
+        When stream=True the result is an AsyncStreamResponse of text chunks that
+        records the turn in history once exhausted:
+
+            response = await client.converse(prompt, config, stream=True)
+            async for chunk in response:
+                ...
+            print(response.time_to_first_token, response.usage)
+
+        With session_id the session's history is used, and calls for one
+        session run one at a time. A streamed call holds the session until its
+        stream is read to the end or closed.
+        """
+        args = (prompt, model_config, variables, few_shot_template, stream,
+                include_history, should_rety, retry_stats, use_cache, tags)
+        if session_id is None:
+            return await self._converse_async(*args, history=self.conversation_history)
+        session = self.sessions.session(session_id)
+        await session.async_lock.acquire()
+        try:
+            response = await self._converse_async(*args, history=session.history)
+        except BaseException:
+            self._end_session_call(session)
+            raise
+        if isinstance(response, AsyncStreamResponse):
+            # The turn is recorded when the stream ends; keep the session locked until then
+            response.on_end = lambda: self._end_session_call(session)
+        else:
+            self._end_session_call(session)
+        return response
+
+    def _end_session_call(self, session: Session):
+        """Count the session's new tokens and release it for the next call"""
+        try:
+            self.sessions.update(session.session_id)
+        finally:
+            session.async_lock.release()
+
+    async def _converse_async(
+        self,
+        prompt: Union[str, PromptTemplate],
+        model_config: ModelConfig,
+        variables: Dict[str, str],
+        few_shot_template: Optional[FewShotTemplate],
+        stream: bool,
+        include_history: bool,
+        should_rety: bool,
+        retry_stats: Optional[RetryStats],
+        use_cache: bool,
+        tags: Optional[List[str]],
+        history: ConversationHistory
+    ) -> Union[str, AsyncStreamResponse]:
+        """converse() against a given conversation history"""
+        new_messages, conversation, use_converse = self._prepare_request(
+            prompt, model_config, variables, few_shot_template, include_history, history
+        )
+        conversation_id = history.conversation_id
+        key, cached = self._cache_lookup(conversation, model_config, use_cache and not stream)
+        semantic_key = None
+        if cached is None:
+            semantic_key, cached = self._semantic_lookup(
+                prompt, model_config, variables, few_shot_template, include_history,
+                use_cache and not stream, history, conversation
+            )
+        if cached is not None:
+            self._record_turn(new_messages, cached, history)
+            self._emit("request", model_config, "cache", tags=tags, conversation_id=conversation_id)
+            return cached
+
+        policy = self.retry_policy if should_rety else self.retry_policy.without_retries()
+        stats = retry_stats if retry_stats is not None else RetryStats()
+        stats.started_at = time.monotonic()
+        # A hedge can be answered by another model; bill the model that answered
+        response, api, usage, metadata, served_config = await self._dispatch_async(
+            conversation, model_config, use_converse, policy, stats,
+            stream=stream, tags=tags, conversation_id=conversation_id
+        )
+
+        if stream:
+            return AsyncStreamResponse(
+                response,
+                metadata=metadata,
+                on_complete=self._stream_recorder(
+                    new_messages, served_config, api, stats, tags, conversation_id, history
+                ),
+                started_at=stats.started_at,
+                on_stop=self._stream_stop_recorder(conversation, served_config, api, stats, tags, conversation_id)
+            )
+        if api != "coalesced":
+            self._cache_store(key, response, stats.elapsed, usage)
+            self._semantic_store(semantic_key, response)
+        self._record_turn(new_messages, response, history)
+        self._emit("request", served_config, api, stats, usage, tags=tags, conversation_id=conversation_id)
+        return response
+
+    async def converse_cascade(
+        self,
+        prompt: Union[str, PromptTemplate],
+        cascade: ModelCascade,
+        variables: Dict[str, str] = {},
+        few_shot_template: Optional[FewShotTemplate] = None,
+        include_history: bool = True,
+        use_cache: bool = True,
+        tags: Optional[List[str]] = None,
+    ) -> str:
+        """Converse with each of the cascade's models in turn until the validator accepts an answer"""
+        attempts: List[CascadeAttempt] = []
+        for i, model_config in enumerate(cascade.tiers):
+            final = i == len(cascade.tiers) - 1
+            new_messages, conversation, use_converse = self._prepare_request(
+                prompt, model_config, variables, few_shot_template, include_history
+            )
+            conversation_id = self.conversation_history.conversation_id
+            stats = RetryStats()
+            usage: Dict[str, int] = {}
+            key, response = self._cache_lookup(conversation, model_config, use_cache)
+            if response is not None:
+                self._emit("request", model_config, "cache", tags=tags, conversation_id=conversation_id)
+            else:
+                try:
+                    response, api = await self._call_model_async(
+                        conversation, model_config, use_converse, self.retry_policy, stats,
+                        usage=usage, tags=tags, conversation_id=conversation_id
+                    )
+                except Exception as e:
+                    if final or not cascade.escalate_on_error:
+                        raise
+                    print(f"Cascade tier {model_config.model_id} failed, escalating: {e}")
+                    attempts.append(CascadeAttempt(model_config.model_id, stats.elapsed, usage, False, error_code(e)))
+                    continue
+                self._cache_store(key, response, stats.elapsed, usage)
+                self._emit("request", model_config, api, stats, usage, tags=tags, conversation_id=conversation_id)
+
+            accepted = cascade.accepts(response)
+            attempts.append(CascadeAttempt(model_config.model_id, stats.elapsed, usage, accepted))
+            if accepted or final:
+                cascade.record(attempts, self.ledger)
+                self._record_turn(new_messages, response)
+                return response
+
+    async def _call_model_async(
+        self,
+        conversation: Dict,
+        model_config: ModelConfig,
+        use_converse: bool,
+        policy: RetryPolicy,
+        stats: RetryStats,
+        stream: bool = False,
+        usage: Optional[Dict[str, int]] = None,
+        metadata: Optional[Dict] = None,
+        tags: Optional[List[str]] = None,
+        conversation_id: Optional[str] = None,
+        client=None
+    ) -> Tuple[Union[str, AsyncIterator[str]], str]:
+        """Call the converse API when possible, falling back to invoke_model"""
+        api = "converse"
+        try:
+            if use_converse:
+                try:
+                    response = await policy.acall(
+                        lambda: self._use_converse_api_async(
+                            conversation, model_config, stream=stream, usage=usage,
+                            metadata=metadata, client=client
+                        ),
+                        stats,
+                        on_retry=self._retry_emitter(model_config, api, tags, conversation_id)
+                    )
+                    return response, api
+                except Exception as e:
+                    if policy.is_retryable(e):
+                        raise
+                    print(f"Converse API failed, falling back to invoke_model: {e}")
+                    self._emit(
+                        "fallback", model_config, api, stats, error=e,
+                        tags=tags, conversation_id=conversation_id
+                    )
+
+            # Fall back to invoke_model with model-specific formatting
+            api = "invoke_model"
+            response = await policy.acall(
+                lambda: self._use_invoke_model_async(
+                    conversation, model_config, stream=stream, usage=usage,
+                    metadata=metadata, client=client
+                ),
+                stats,
+                on_retry=self._retry_emitter(model_config, api, tags, conversation_id)
+            )
+            return response, api
+        except Exception as e:
+            self._emit(
+                "request", model_config, api, stats, error=e, stream=stream,
+                tags=tags, conversation_id=conversation_id
+            )
+            raise
+
+    async def _dispatch_async(
+        self,
+        conversation: Dict,
+        model_config: ModelConfig,
+        use_converse: bool,
+        policy: RetryPolicy,
+        stats: RetryStats,
+        stream: bool = False,
+        tags: Optional[List[str]] = None,
+        conversation_id: Optional[str] = None
+    ) -> Tuple[Union[str, AsyncIterator[str]], str, Dict[str, int], Dict, ModelConfig]:
+        """Make the model call, hedged and coalesced as the client is configured"""
+        async def call():
+            usage: Dict[str, int] = {}
+            metadata: Dict = {}
+            served_config = model_config
+            if self.hedge_policy is not None and not stream:
+                response, api, served_config = await self._call_model_hedged_async(
+                    conversation, model_config, use_converse, policy, stats,
+                    usage=usage, tags=tags, conversation_id=conversation_id
+                )
+            else:
+                response, api = await self._call_model_async(
+                    conversation, model_config, use_converse, policy, stats,
+                    stream=stream, usage=usage, metadata=metadata,
+                    tags=tags, conversation_id=conversation_id
+                )
+            if stream and self.single_flight is not None:
+                response = AsyncStreamTee(response)
+            return response, api, usage, metadata, served_config
+
+        if self.single_flight is None:
+            return await call()
+        (response, api, usage, metadata, served_config), leader = await self.single_flight.ado(
+            self._flight_key(conversation, model_config, use_converse, stream), call,
+            # Each caller gets its own reader, and the upstream closes when all are closed
+            on_shared=(lambda result, callers: result[0].expect(callers)) if stream else None
+        )
+        if stream:
+            response = response.reader()
+        return response, api if leader else "coalesced", usage, metadata, served_config
+
+    async def _call_model_hedged_async(
+        self,
+        conversation: Dict,
+        model_config: ModelConfig,
+        use_converse: bool,
+        policy: RetryPolicy,
+        stats: RetryStats,
+        usage: Dict[str, int],
+        tags: Optional[List[str]] = None,
+        conversation_id: Optional[str] = None
+    ) -> Tuple[str, str, ModelConfig]:
+        """
+        Call the model, sending a hedge request if the first is slower than the hedge delay
+
+        Returns:
+            Tuple of (response text, API used, config of the call that won)
+        """
+        hedge = self.hedge_policy
+        hedge.on_request()
+        calls: Dict[asyncio.Task, Tuple[ModelConfig, Dict[str, int]]] = {}
+
+        def start(config: ModelConfig, call_stats: RetryStats, client=None) -> asyncio.Task:
+            call_usage: Dict[str, int] = {}
+            task = asyncio.ensure_future(self._call_model_async(
+                conversation, config, use_converse, policy, call_stats,
+                usage=call_usage, tags=tags, conversation_id=conversation_id, client=client
+            ))
+            calls[task] = (config, call_usage)
+            return task
+
+        primary = start(model_config, stats)
+        done, pending = await asyncio.wait({primary}, timeout=hedge.delay_for(model_config.model_id))
+        if pending and hedge.try_hedge():
+            hedge_config = replace(model_config, model_id=hedge.model_id) if hedge.model_id else model_config
+            self._emit("hedge", model_config, "converse" if use_converse else "invoke_model", stats,
+                       tags=tags, conversation_id=conversation_id)
+            pending.add(start(hedge_config, RetryStats(), await self._get_hedge_client()))
+
+        winner = primary if done else None
+        error = None
+        try:
+            while winner is None and pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        winner = task
+                        break
+                    error = task.exception()
+        finally:
+            for task in pending:
+                task.cancel()
+        if winner is None:
+            raise error
+
+        if winner is primary:
+            if winner.exception() is None:
+                hedge.record(model_config.model_id, stats.elapsed)
+        else:
+            hedge.on_hedge_win()
+        config, call_usage = calls[winner]
+        usage.update(call_usage)
+        response, api = winner.result()
+        return response, api, config
+
+    async def stream(
+        self,
+        prompt: Union[str, PromptTemplate],
+        model_config: ModelConfig,
+        variables: Dict[str, str] = {},
+        few_shot_template: Optional[FewShotTemplate] = None,
+        include_history: bool = True,
+        should_rety: bool = True,
+    ) -> AsyncIterator[str]:
+        """
+        Stream a response as an async generator
+
+        Example:
+            async for chunk in client.stream(prompt, config):
+                print(chunk, end="")
+        """
+        chunks = await self.converse(
+            prompt,
+            model_config,
+            variables=variables,
+            few_shot_template=few_shot_template,
+            stream=True,
+            include_history=include_history,
+            should_rety=should_rety
+        )
+        async for chunk in chunks:
+            yield chunk
+
+    async def converse_many(
+        self,
+        prompts: List[BatchPrompt],
+        model_config: ModelConfig,
+        variables: Dict[str, str] = {},
+        few_shot_template: Optional[FewShotTemplate] = None,
+        max_concurrency: int = 256,
+        initial_concurrency: int = 4,
+        return_exceptions: bool = False,
+        limiter: Optional[AsyncAIMDLimiter] = None,
+        tags: Optional[List[str]] = None,
+    ) -> List[Union[str, Exception]]:
+        """
+        Run many independent prompts concurrently, without conversation history
+        
+        See BedrockClient.converse_many; the limiter here gates coroutines instead of threads.
+        """
+        if limiter is None:
+            limiter = AsyncAIMDLimiter(
+                initial_limit=min(initial_concurrency, max_concurrency),
+                max_limit=max_concurrency
+            )
+
+        async def run(item: BatchPrompt) -> str:
+            prompt, item_variables = item if isinstance(item, tuple) else (item, {})
+            return await self._converse_with_limiter_async(
+                prompt,
+                model_config,
+                {**variables, **item_variables},
+                few_shot_template,
+                limiter,
+                tags
+            )
+
+        tasks = [asyncio.ensure_future(run(item)) for item in prompts]
+        try:
+            return await asyncio.gather(*tasks, return_exceptions=return_exceptions)
+        except Exception:
+            for task in tasks:
+                task.cancel()
+            raise
+
+    async def _converse_with_limiter_async(
+        self,
+        prompt: Union[str, PromptTemplate],
+        model_config: ModelConfig,
+        variables: Dict[str, str],
+        few_shot_template: Optional[FewShotTemplate],
+        limiter: AsyncAIMDLimiter,
+        tags: Optional[List[str]] = None
+    ) -> str:
+        """Single history-free call that reports throttling to an AIMD limiter"""
+        _, conversation, use_converse = self._prepare_request(
+            prompt, model_config, variables, few_shot_template, include_history=False
+        )
+        key, cached = self._cache_lookup(conversation, model_config, use_cache=True)
+        if cached is not None:
+            self._emit("request", model_config, "cache", tags=tags)
+            return cached
+        if self.single_flight is None:
+            return await self._limited_call_async(conversation, model_config, use_converse, limiter, key, tags)
+        response, leader = await self.single_flight.ado(
+            self._flight_key(conversation, model_config, use_converse),
+            lambda: self._limited_call_async(conversation, model_config, use_converse, limiter, key, tags)
+        )
+        if not leader:
+            self._emit("request", model_config, "coalesced", tags=tags)
+        return response
+
+    async def _limited_call_async(
+        self,
+        conversation: Dict,
+        model_config: ModelConfig,
+        use_converse: bool,
+        limiter: AsyncAIMDLimiter,
+        key: Optional[str],
+        tags: Optional[List[str]] = None
+    ) -> str:
+        """Call the model under an AIMD limiter, retrying throttled calls"""
+        policy = self.retry_policy
+        stats = RetryStats()
+        usage: Dict[str, int] = {}
+        while True:
+            token = await limiter.acquire()
+            stats.attempts += 1
+            api = "converse" if use_converse else "invoke_model"
+            try:
+                if use_converse:
+                    try:
+                        response = await self._use_converse_api_async(conversation, model_config, usage=usage)
+                    except Exception as e:
+                        if policy.is_retryable(e):
+                            raise
+                        print(f"Converse API failed, falling back to invoke_model: {e}")
+                        self._emit("fallback", model_config, api, stats, error=e, tags=tags)
+                        # Later retries stay on invoke_model instead of trying converse again
+                        use_converse = False
+                        api = "invoke_model"
+                        response = await self._use_invoke_model_async(conversation, model_config, usage=usage)
+                else:
+                    response = await self._use_invoke_model_async(conversation, model_config, usage=usage)
+            except Exception as e:
+                await limiter.release(token, throttled=is_throttling_error(e), success=False)
+                delay = policy.next_delay(e, stats)
+                if delay is None:
+                    self._emit("request", model_config, api, stats, error=e, tags=tags)
+                    raise
+                self._emit("retry", model_config, api, stats, error=e, tags=tags)
+                await asyncio.sleep(delay)
+                continue
+            await limiter.release(token)
+            policy.record_success()
+            self._cache_store(key, response, stats.elapsed, usage)
+            self._emit("request", model_config, api, stats, usage, tags=tags)
+            return response
+
+    async def _use_converse_api_async(
+        self,
+        conversation: Dict,
+        model_config: ModelConfig,
+        stream: bool = False,
+        usage: Optional[Dict[str, int]] = None,
+        metadata: Optional[Dict] = None,
+        client=None
+    ) -> Union[str, AsyncIterator[str]]:
+        """Use the Bedrock converse API, copying token usage into `usage` if given"""
+        client = client or await self._get_client()
+        kwargs = self._build_converse_request(conversation, model_config)
+        if self.prompt_cache is not None:
+            kwargs = self.prompt_cache.apply(kwargs)
+        if stream:
+            response = await client.converse_stream(**kwargs)
+            return self._handle_stream_response_async(response, metadata)
+        else:
+            response = await client.converse(**kwargs)
+            if usage is not None:
+                usage.update(response.get("usage", {}))
+            return response["output"]["message"]["content"][0]["text"]
+
+    async def _use_invoke_model_async(
+        self,
+        conversation: Dict,
+        model_config: ModelConfig,
+        stream: bool = False,
+        usage: Optional[Dict[str, int]] = None,
+        metadata: Optional[Dict] = None,
+        client=None
+    ) -> Union[str, AsyncIterator[str]]:
+        """Use invoke_model with model-specific formatting, copying token usage into `usage` if given"""
+        client = client or await self._get_client()
+        kwargs = self._build_invoke_request(conversation, model_config)
+        if stream:
+            response = await client.invoke_model_with_response_stream(**kwargs)
+            return self._handle_stream_response_async(response, metadata, model_config.model_id)
+        else:
+            response = await client.invoke_model(**kwargs)
+            if usage is not None:
+                usage.update(self._invoke_model_usage(response))
+            raw_body = await response['body'].read()
+            return self._parse_response_body(raw_body, model_config.model_id)
+
+    async def _handle_stream_response_async(
+        self,
+        response: Dict,
+        metadata: Optional[Dict] = None,
+        model_id: str = ""
+    ) -> AsyncIterator[str]:
+        """Handle streaming responses from both APIs, copying the final metadata into `metadata`"""
+        events = response['stream'] if 'stream' in response else response['body']
+        try:
+            if 'stream' in response:  # converse_stream response
+                async for event in events:
+                    if 'contentBlockDelta' in event:
+                        delta = event['contentBlockDelta']
+                        if 'delta' in delta and 'text' in delta['delta']:
+                            yield delta['delta']['text']
+                    elif 'metadata' in event and metadata is not None:
+                        metadata.update(event['metadata'])
+            else:  # invoke_model_with_response_stream response
+                provider = get_provider(model_id)
+                async for event in events:
+                    if 'chunk' in event:
+                        chunk = json.loads(event['chunk']['bytes'])
+                        if metadata is not None:
+                            self._invoke_stream_metadata(chunk, metadata)
+                        text = provider.decode_stream_chunk(chunk)
+                        if text:
+                            yield text
+        finally:
+            close = getattr(events, "close", None)
+            if close is not None:
+                result = close()
+                if inspect.isawaitable(result):
+                    await result
@@ -1,11 +1,39 @@
-from dataclasses import dataclass
-from typing import Dict, List, Optional, Union, Iterator
+from dataclasses import dataclass, field, replace
+from typing import Callable, Deque, Dict, List, Optional, Union, Iterator, Tuple
+from collections import deque
 import json
 import time
-import re
+import uuid
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from concurrent.futures import TimeoutError as FutureTimeoutError
 import boto3
+from botocore.config import Config
 from botocore.exceptions import ClientError
 from bedrock_sdk.prompt_template import PromptTemplate, FewShotTemplate
+from bedrock_sdk.concurrency import AIMDLimiter
+from bedrock_sdk.retry import RetryPolicy, RetryStats, error_code, is_throttling_error
+from bedrock_sdk.cache import ResponseCache, cache_key
+from bedrock_sdk.prompt_parser import Segment, concat_segments, parse_prompt, segments_to_messages
+from bedrock_sdk.tokens import context_window, estimate_tokens
+from bedrock_sdk.streaming import StreamResponse
+from bedrock_sdk.metrics import MetricsEvent, MetricsHook
+from bedrock_sdk.ledger import TokenLedger
+from bedrock_sdk.prompt_cache import PromptCache
+from bedrock_sdk.hedging import HedgePolicy
+from bedrock_sdk.cascade import CascadeAttempt, ModelCascade
+from bedrock_sdk.semantic_cache import SemanticCache
+from bedrock_sdk.singleflight import SingleFlight, StreamTee
+from bedrock_sdk.sessions import Session, SessionStore
+from bedrock_sdk.providers import get_provider
+from bedrock_sdk.clients import (
+    DEFAULT_CONNECT_TIMEOUT,
+    DEFAULT_MAX_POOL_CONNECTIONS,
+    DEFAULT_READ_TIMEOUT,
+    client_config,
+    get_shared_client
+)
+
+BatchPrompt = Union[str, PromptTemplate, Tuple[Union[str, PromptTemplate], Dict[str, str]]]
 
 @dataclass 
 class ModelConfig:
@@ -14,77 +42,155 @@ class ModelConfig:
     max_tokens: int = 512
     temperature: float = 0.01
     top_p: float = 0.99
+    context_window: Optional[int] = None  # Defaults to tokens.context_window(model_id)
+    stop_sequences: List[str] = field(default_factory=list)
+    top_k: Optional[int] = None  # Ignored by providers without top-k sampling
+    additional_model_request_fields: Dict = field(default_factory=dict)  # Native fields, sent as is
 
 class ConversationHistory:
-    """Manages conversation history"""
-    def __init__(self, max_messages: int = 100):
-        self.messages: List[Dict[str, str]] = []
+    """
+    Manages conversation history as ready-to-send Converse message blocks
+    
+    Turns are appended to a bounded deque in O(1). Model-specific string
+    formats are only produced on demand for the invoke_model fallback.
+    
+    When a token budget applies, only the most recent turns that fit are sent.
+    With a summarizer, turns that fall out of the window are collapsed into a
+    running summary that is appended to the system message.
+    """
+    def __init__(
+        self,
+        max_messages: int = 100,
+        max_tokens: Optional[int] = None,
+        summarizer: Optional[Callable[[Optional[str], List[Dict[str, str]]], str]] = None,
+        token_estimator: Callable[[str], int] = estimate_tokens
+    ):
+        """
+        Args:
+            max_messages: Maximum number of messages kept
+            max_tokens: Token budget for history sent with each request
+            summarizer: Called with (previous summary, dropped messages) to produce a new summary
+            token_estimator: Function estimating the tokens in a piece of text
+        """
+        self._messages: Deque[Dict] = deque(maxlen=max_messages)  # Limit conversation history
+        self._tokens: Deque[int] = deque(maxlen=max_messages)
+        self._token_count = 0
         self.system_message: Optional[str] = None
-        self.max_messages = max_messages  # Limit conversation history
+        self.summary: Optional[str] = None
+        self.conversation_id = uuid.uuid4().hex
+        self.max_messages = max_messages
+        self.max_tokens = max_tokens
+        self.summarizer = summarizer
+        self.token_estimator = token_estimator
+
+    @property
+    def messages(self) -> List[Dict[str, str]]:
+        """Messages as role/content text pairs"""
+        return [self._to_text_message(msg) for msg in self._messages]
+
+    @property
+    def token_count(self) -> int:
+        """Estimated tokens across all stored messages"""
+        return self._token_count
+
+    @staticmethod
+    def _to_text_message(msg: Dict) -> Dict[str, str]:
+        return {"role": msg["role"], "content": "".join(block.get("text", "") for block in msg["content"])}
     
     def add_message(self, role: str, content: str):
-        """Add a message to conversation history"""
+        """Add a message to conversation history, evicting the oldest if full"""
         if role == "system":
             self.system_message = content
         else:
-            # Maintain max message limit by removing oldest messages if needed
-            while len(self.messages) >= self.max_messages:
-                self.messages.pop(0)
-            self.messages.append({"role": role, "content": content})
-    
-    def get_formatted_history(self, model_id: str) -> str:
-        """Format history based on model"""
-        if not self.messages:
-            return ""
-            
-        if "llama3" in model_id:
-            return self._format_llama3()
-        elif "mistral" in model_id:
-            return self._format_mistral()
-        else:
-            return self._format_default()
+            if len(self._tokens) == self.max_messages:
+                self._token_count -= self._tokens[0]
+            tokens = self.token_estimator(content)
+            self._messages.append({"role": role, "content": [{"text": content}]})
+            self._tokens.append(tokens)
+            self._token_count += tokens
+
+    def get_converse_messages(self, max_tokens: Optional[int] = None) -> List[Dict]:
+        """
+        History as Converse API message blocks, starting with a user turn
+        
+        Args:
+            max_tokens: Token budget for this request; the tighter of this and
+                the history's own max_tokens applies. The running summary,
+                which is sent in the system message, counts against it.
+        """
+        budgets = [budget for budget in (max_tokens, self.max_tokens) if budget is not None]
+        start = 0
+        while budgets:
+            budget = min(budgets) - self.token_estimator(self._summary_text())
+            if self._token_count <= budget:
+                break
+            # Walk back from the newest message to find the oldest one that fits
+            total, start = 0, len(self._tokens)
+            for tokens in reversed(self._tokens):
+                if total + tokens > budget:
+                    break
+                total += tokens
+                start -= 1
+            if self.summarizer is None or start == 0:
+                break
+            # The new summary can be longer, so check the budget again
+            self._summarize(start)
+            start = 0
+
+        messages = list(self._messages)
+        while start < len(messages) and messages[start]["role"] != "user":
+            start += 1
+        return messages[start:] if start else messages
+
+    def _summarize(self, count: int):
+        """Collapse the oldest `count` messages into the running summary"""
+        dropped = []
+        for _ in range(count):
+            dropped.append(self._to_text_message(self._messages.popleft()))
+            self._token_count -= self._tokens.popleft()
+        self.summary = self.summarizer(self.summary, dropped)
 
-    def _format_llama3(self) -> str:
-        formatted = "<|begin_of_text|>"
-        if self.system_message:
-            formatted += f"<|start_header_id|>system<|end_header_id|>\n{self.system_message}<|eot_id|>\n"
+    def get_system_message(self, system: Optional[str] = None) -> str:
+        """
+        System text for a request, with the running summary appended
         
-        for msg in self.messages:
-            formatted += f"<|start_header_id|>{msg['role']}<|end_header_id|>\n{msg['content']}<|eot_id|>\n"
-        return formatted
+        Args:
+            system: System text from the new prompt, overriding the stored one
+        """
+        system = system or self.system_message or ""
+        summary = self._summary_text()
+        if summary:
+            system = f"{system}\n\n{summary}" if system else summary
+        return system
 
-    def _format_mistral(self) -> str:
-        formatted = ""
-        if self.system_message:
-            formatted += f"<<SYS>>{self.system_message}<</SYS>>"
-            
-        formatted += "<s>[INST]"
-        for i, msg in enumerate(self.messages):
-            if msg["role"] == "user":
-                if i > 0:
-                    formatted += "</s><s>[INST]"
-                formatted += msg["content"]
-            else:
-                formatted += "[/INST]" + msg["content"]
-        return formatted
+    def _summary_text(self) -> str:
+        """Running summary as it is added to the system message"""
+        if not self.summary:
+            return ""
+        return f"Summary of the earlier conversation:\n{self.summary}"
 
-    def _format_default(self) -> str:
-        formatted = ""
-        if self.system_message:
-            formatted += f"<<system>>\n{self.system_message}\n"
-            
-        for msg in self.messages:
-            formatted += f"<<{msg['role']}>>\n{msg['content']}\n"
-        return formatted
+    def __len__(self) -> int:
+        return len(self._messages)
+    
+    def get_formatted_history(self, model_id: str) -> str:
+        """Format history based on model"""
+        if not self._messages:
+            return ""
+        return get_provider(model_id).format_history(self.system_message, self.messages)
 
     def get_last_messages(self, n: int = 1) -> List[Dict[str, str]]:
         """Get the last n messages from history"""
-        return self.messages[-n:] if self.messages else []
+        n = min(n, len(self._messages))
+        return [self._to_text_message(self._messages[-i]) for i in range(n, 0, -1)]
 
     def clear(self):
         """Clear conversation history"""
-        self.messages = []
+        self._messages.clear()
+        self._tokens.clear()
+        self._token_count = 0
         self.system_message = None
+        self.summary = None
+        self.conversation_id = uuid.uuid4().hex
 
 class BedrockClient:
     """Client for AWS Bedrock model interactions"""
@@ -93,14 +199,82 @@ class BedrockClient:
         self,
         region_name: str = "us-east-1",
         max_retries: int = 4,
-        base_delay: float = 65.0,
-        profile_name: Optional[str] = None
+        base_delay: float = 1.0,
+        profile_name: Optional[str] = None,
+        retry_policy: Optional[RetryPolicy] = None,
+        response_cache: Optional[ResponseCache] = None,
+        client=None,
+        session: Optional[boto3.Session] = None,
+        config: Optional[Config] = None,
+        max_pool_connections: int = DEFAULT_MAX_POOL_CONNECTIONS,
+        connect_timeout: float = DEFAULT_CONNECT_TIMEOUT,
+        read_timeout: float = DEFAULT_READ_TIMEOUT,
+        tcp_keepalive: bool = True,
+        shared_client: bool = True,
+        metrics_hooks: Optional[List[MetricsHook]] = None,
+        ledger: Optional[TokenLedger] = None,
+        prompt_cache: Optional[PromptCache] = None,
+        hedge_policy: Optional[HedgePolicy] = None,
+        semantic_cache: Optional[SemanticCache] = None,
+        single_flight: Optional[SingleFlight] = None,
+        session_store: Optional[SessionStore] = None
     ):
-        session = boto3.Session(profile_name=profile_name)
-        self.client = session.client('bedrock-runtime', region_name=region_name)
-        self.max_retries = max_retries
-        self.base_delay = base_delay
+        """
+        Args:
+            region_name: AWS region
+            max_retries: Retries for transient errors, used when retry_policy is not given
+            base_delay: Exponential backoff base in seconds, used when retry_policy is not given
+            profile_name: AWS profile name
+            retry_policy: Backoff, deadline and budget settings for transient errors
+            response_cache: Optional cache of responses keyed on model, inference config and messages
+            client: Existing bedrock-runtime client to use as is
+            session: boto3 Session to create the client from
+            config: botocore Config for the client, overriding the pool and timeout arguments
+            max_pool_connections: Size of the HTTP connection pool
+            connect_timeout: Seconds to wait for a connection
+            read_timeout: Seconds to wait for response data
+            tcp_keepalive: Enable TCP keepalive on pooled connections
+            shared_client: Reuse the process-wide client for this profile, region and pool
+                settings; ignored when session or config is given
+            metrics_hooks: Callables receiving a MetricsEvent for every request, retry and fallback
+            ledger: Token and cost ledger; a new TokenLedger with DEFAULT_PRICES if not given
+            prompt_cache: Places Converse cache checkpoints after repeated prompt prefixes;
+                a new PromptCache if not given. Set client.prompt_cache = None to disable.
+            hedge_policy: Send a second request when a non-streaming converse call is slower
+                than the policy's delay and use whichever answers first
+            semantic_cache: Reuse answers to near-identical requests for opted-in templates
+            single_flight: Share one model call between concurrent identical requests
+            session_store: Conversation histories for converse(..., session_id=...);
+                a new SessionStore if not given
+        """
+        self.region_name = region_name
+        self.profile_name = profile_name
+        self.session = session
+        self.config = config
+        self.max_pool_connections = max_pool_connections
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.tcp_keepalive = tcp_keepalive
+        self.shared_client = shared_client
+        self._external_client = client
+        self.client = self._create_client()
+        self.retry_policy = retry_policy or RetryPolicy(
+            max_retries=max_retries,
+            base_delay=base_delay,
+            max_delay=max(base_delay, 20.0)
+        )
+        self.max_retries = self.retry_policy.max_retries
+        self.base_delay = self.retry_policy.base_delay
+        self.response_cache = response_cache
+        self.semantic_cache = semantic_cache
+        self.single_flight = single_flight
+        self.ledger = ledger if ledger is not None else TokenLedger()
+        self.prompt_cache = prompt_cache if prompt_cache is not None else PromptCache()
+        self.metrics_hooks: List[MetricsHook] = [self.ledger] + list(metrics_hooks or [])
+        self.hedge_policy = hedge_policy
+        self._hedge_executor: Optional[ThreadPoolExecutor] = None
         self.conversation_history = ConversationHistory()
+        self.sessions = session_store if session_store is not None else SessionStore()
 
     def converse(
         self,
@@ -111,377 +285,1075 @@ class BedrockClient:
         stream: bool = False,
         include_history: bool = True,
         should_rety: bool = True,
-    ) -> Union[str, Iterator[str]]:
+        retry_stats: Optional[RetryStats] = None,
+        use_cache: bool = True,
+        tags: Optional[List[str]] = None,
+        session_id: Optional[str] = None,
+    ) -> Union[str, StreamResponse]:
         """
         Conversation with model using converse API when possible, falling back to invoke_model
+        
+        Transient errors (throttling, ModelNotReady, 5xx, timeouts) are retried on
+        the same API according to the client's retry policy. Other converse errors
+        fall back to invoke_model.
+        
+        With stream=True a StreamResponse is returned. Iterating it yields text
+        chunks; once exhausted the turn is added to conversation history and it
+        reports time-to-first-token, inter-token latency and usage.
+        
+        Args:
+            retry_stats: Optional RetryStats filled in with attempts, retries and time spent sleeping
+            use_cache: Consult the client's response cache; streaming calls always bypass it
+            tags: Tags attributing the call's tokens and cost in the ledger
+            session_id: Use this session's history from the session store instead of
+                the client's conversation_history. Calls for one session run one at a time;
+                a streamed call holds the session until its stream is read to the end or closed.
         """
-        import time
+        args = (prompt, model_config, variables, few_shot_template, stream,
+                include_history, should_rety, retry_stats, use_cache, tags)
+        if session_id is None:
+            return self._converse(*args, history=self.conversation_history)
+        session = self.sessions.session(session_id)
+        session.lock.acquire()
+        try:
+            response = self._converse(*args, history=session.history)
+        except BaseException:
+            self._end_session_call(session)
+            raise
+        if isinstance(response, StreamResponse):
+            # The turn is recorded when the stream ends; keep the session locked until then
+            response.on_end = lambda: self._end_session_call(session)
+        else:
+            self._end_session_call(session)
+        return response
 
-        if isinstance(prompt, str):
-            if not(('<<system>>' in prompt) or ('<<user>>' in prompt) or ('<<assistant>>' in prompt)):
-                prompt = '<<user>>\n' + prompt
-            prompt = PromptTemplate('tmp', prompt)
+    def _end_session_call(self, session: Session):
+        """Count the session's new tokens and release it for the next call"""
+        try:
+            self.sessions.update(session.session_id)
+        finally:
+            session.lock.release()
+
+    def _converse(
+        self,
+        prompt: Union[str, PromptTemplate],
+        model_config: ModelConfig,
+        variables: Dict[str, str],
+        few_shot_template: Optional[FewShotTemplate],
+        stream: bool,
+        include_history: bool,
+        should_rety: bool,
+        retry_stats: Optional[RetryStats],
+        use_cache: bool,
+        tags: Optional[List[str]],
+        history: ConversationHistory
+    ) -> Union[str, StreamResponse]:
+        """converse() against a given conversation history"""
+        new_messages, conversation, use_converse = self._prepare_request(
+            prompt, model_config, variables, few_shot_template, include_history, history
+        )
+        conversation_id = history.conversation_id
+        key, cached = self._cache_lookup(conversation, model_config, use_cache and not stream)
+        semantic_key = None
+        if cached is None:
+            semantic_key, cached = self._semantic_lookup(
+                prompt, model_config, variables, few_shot_template, include_history,
+                use_cache and not stream, history, conversation
+            )
+        if cached is not None:
+            self._record_turn(new_messages, cached, history)
+            self._emit("request", model_config, "cache", tags=tags, conversation_id=conversation_id)
+            return cached
         
-        # Format prompt with variables and few-shot examples
-        prompt_text = self._format_prompt(prompt, variables, few_shot_template)
+        policy = self.retry_policy if should_rety else self.retry_policy.without_retries()
+        stats = retry_stats if retry_stats is not None else RetryStats()
+        stats.started_at = time.monotonic()
+        # A hedge can be answered by another model; bill the model that answered
+        response, api, usage, metadata, served_config = self._dispatch(
+            conversation, model_config, use_converse, policy, stats,
+            stream=stream, tags=tags, conversation_id=conversation_id
+        )
         
-        # Parse the new prompt first (without history)
-        new_messages = self.prompt_to_json(prompt_text)
+        if stream:
+            return StreamResponse(
+                response,
+                metadata=metadata,
+                on_complete=self._stream_recorder(
+                    new_messages, served_config, api, stats, tags, conversation_id, history
+                ),
+                started_at=stats.started_at,
+                on_stop=self._stream_stop_recorder(conversation, served_config, api, stats, tags, conversation_id)
+            )
+        if api != "coalesced":
+            self._cache_store(key, response, stats.elapsed, usage)
+            self._semantic_store(semantic_key, response)
+        self._record_turn(new_messages, response, history)
+        self._emit("request", served_config, api, stats, usage, tags=tags, conversation_id=conversation_id)
+        return response
+
+    def converse_cascade(
+        self,
+        prompt: Union[str, PromptTemplate],
+        cascade: ModelCascade,
+        variables: Dict[str, str] = {},
+        few_shot_template: Optional[FewShotTemplate] = None,
+        include_history: bool = True,
+        use_cache: bool = True,
+        tags: Optional[List[str]] = None,
+    ) -> str:
+        """
+        Converse with each of the cascade's models in turn until the validator accepts an answer
         
-        # Get formatted conversation history and combine with prompt if needed
-        if include_history:
-            history = self.conversation_history.get_formatted_history(model_config.model_id)
-            if history:
-                prompt_text = f"{history}\n{prompt_text}"
-    
-        # Parse complete prompt (including history) for API formatting
-        parsed_prompt = self.prompt_to_json(prompt_text)
+        Only the answer that is returned is added to conversation history. The
+        tier calls made are recorded in cascade.stats.
         
-        # Check if prompt ends with assistant message
-        ends_with_assistant = (
-            parsed_prompt["assistant"] and 
-            len(parsed_prompt["assistant"]) == len(parsed_prompt["user"])
-        )
+        Args:
+            cascade: Model tiers, cheapest first, and the validator deciding when to escalate
+            use_cache: Consult the client's response cache for each tier
+            tags: Tags attributing the calls' tokens and cost in the ledger
+        """
+        attempts: List[CascadeAttempt] = []
+        for i, model_config in enumerate(cascade.tiers):
+            final = i == len(cascade.tiers) - 1
+            new_messages, conversation, use_converse = self._prepare_request(
+                prompt, model_config, variables, few_shot_template, include_history
+            )
+            conversation_id = self.conversation_history.conversation_id
+            stats = RetryStats()
+            usage: Dict[str, int] = {}
+            key, response = self._cache_lookup(conversation, model_config, use_cache)
+            if response is not None:
+                self._emit("request", model_config, "cache", tags=tags, conversation_id=conversation_id)
+            else:
+                try:
+                    response, api = self._call_model(
+                        conversation, model_config, use_converse, self.retry_policy, stats,
+                        usage=usage, tags=tags, conversation_id=conversation_id
+                    )
+                except Exception as e:
+                    if final or not cascade.escalate_on_error:
+                        raise
+                    print(f"Cascade tier {model_config.model_id} failed, escalating: {e}")
+                    attempts.append(CascadeAttempt(model_config.model_id, stats.elapsed, usage, False, error_code(e)))
+                    continue
+                self._cache_store(key, response, stats.elapsed, usage)
+                self._emit("request", model_config, api, stats, usage, tags=tags, conversation_id=conversation_id)
+            
+            accepted = cascade.accepts(response)
+            attempts.append(CascadeAttempt(model_config.model_id, stats.elapsed, usage, accepted))
+            if accepted or final:
+                cascade.record(attempts, self.ledger)
+                self._record_turn(new_messages, response)
+                return response
+
+    def converse_many(
+        self,
+        prompts: List[BatchPrompt],
+        model_config: ModelConfig,
+        variables: Dict[str, str] = {},
+        few_shot_template: Optional[FewShotTemplate] = None,
+        max_concurrency: int = 32,
+        initial_concurrency: int = 4,
+        return_exceptions: bool = False,
+        limiter: Optional[AIMDLimiter] = None,
+        tags: Optional[List[str]] = None,
+    ) -> List[Union[str, Exception]]:
+        """
+        Run many independent prompts concurrently, without conversation history
         
-        # Use converse API if possible
-        if (not ends_with_assistant) or ("anthropic" in model_config.model_id) or (".nova" in model_config.model_id):
-            max_retries = self.max_retries if should_rety else 0
-            current_retry = 0
+        Concurrency adapts AIMD-style: it grows while calls succeed and is cut
+        back whenever a ThrottlingException is returned.
+        
+        Args:
+            prompts: Prompts, templates, or (prompt, variables) tuples
+            model_config: Model configuration shared by every call
+            variables: Variables shared by every prompt; per-prompt variables take precedence
+            few_shot_template: Optional few-shot examples prepended to every prompt
+            max_concurrency: Upper bound on concurrent calls
+            initial_concurrency: Concurrent calls to start with
+            return_exceptions: Return exceptions in place of results instead of raising
+            limiter: Optional limiter to share across batches
+            tags: Tags attributing the calls' tokens and cost in the ledger
             
-            while current_retry <= max_retries:
+        Returns:
+            Responses in the same order as prompts
+        """
+        if limiter is None:
+            limiter = AIMDLimiter(
+                initial_limit=min(initial_concurrency, max_concurrency),
+                max_limit=max_concurrency
+            )
+
+        def run(item: BatchPrompt) -> Union[str, Exception]:
+            prompt, item_variables = item if isinstance(item, tuple) else (item, {})
+            try:
+                return self._converse_with_limiter(
+                    prompt,
+                    model_config,
+                    {**variables, **item_variables},
+                    few_shot_template,
+                    limiter,
+                    tags
+                )
+            except Exception as e:
+                if return_exceptions:
+                    return e
+                raise
+
+        with ThreadPoolExecutor(max_workers=limiter.max_limit) as executor:
+            futures = [executor.submit(run, item) for item in prompts]
+            try:
+                return [future.result() for future in futures]
+            except Exception:
+                for future in futures:
+                    future.cancel()
+                raise
+
+    def _converse_with_limiter(
+        self,
+        prompt: Union[str, PromptTemplate],
+        model_config: ModelConfig,
+        variables: Dict[str, str],
+        few_shot_template: Optional[FewShotTemplate],
+        limiter: AIMDLimiter,
+        tags: Optional[List[str]] = None
+    ) -> str:
+        """Single history-free call that reports throttling to an AIMD limiter"""
+        _, conversation, use_converse = self._prepare_request(
+            prompt, model_config, variables, few_shot_template, include_history=False
+        )
+        key, cached = self._cache_lookup(conversation, model_config, use_cache=True)
+        if cached is not None:
+            self._emit("request", model_config, "cache", tags=tags)
+            return cached
+        if self.single_flight is None:
+            return self._limited_call(conversation, model_config, use_converse, limiter, key, tags)
+        response, leader = self.single_flight.do(
+            self._flight_key(conversation, model_config, use_converse),
+            lambda: self._limited_call(conversation, model_config, use_converse, limiter, key, tags)
+        )
+        if not leader:
+            self._emit("request", model_config, "coalesced", tags=tags)
+        return response
+
+    def _limited_call(
+        self,
+        conversation: Dict,
+        model_config: ModelConfig,
+        use_converse: bool,
+        limiter: AIMDLimiter,
+        key: Optional[str],
+        tags: Optional[List[str]] = None
+    ) -> str:
+        """Call the model under an AIMD limiter, retrying throttled calls"""
+        policy = self.retry_policy
+        stats = RetryStats()
+        usage: Dict[str, int] = {}
+        while True:
+            token = limiter.acquire()
+            stats.attempts += 1
+            api = "converse" if use_converse else "invoke_model"
+            try:
+                if use_converse:
+                    try:
+                        response = self._use_converse_api(conversation, model_config, usage=usage)
+                    except Exception as e:
+                        if policy.is_retryable(e):
+                            raise
+                        print(f"Converse API failed, falling back to invoke_model: {e}")
+                        self._emit("fallback", model_config, api, stats, error=e, tags=tags)
+                        # Later retries stay on invoke_model instead of trying converse again
+                        use_converse = False
+                        api = "invoke_model"
+                        response = self._use_invoke_model(conversation, model_config, usage=usage)
+                else:
+                    response = self._use_invoke_model(conversation, model_config, usage=usage)
+            except Exception as e:
+                limiter.release(token, throttled=is_throttling_error(e), success=False)
+                delay = policy.next_delay(e, stats)
+                if delay is None:
+                    self._emit("request", model_config, api, stats, error=e, tags=tags)
+                    raise
+                self._emit("retry", model_config, api, stats, error=e, tags=tags)
+                time.sleep(delay)
+                continue
+            limiter.release(token)
+            policy.record_success()
+            self._cache_store(key, response, stats.elapsed, usage)
+            self._emit("request", model_config, api, stats, usage, tags=tags)
+            return response
+
+    def _call_model(
+        self,
+        conversation: Dict,
+        model_config: ModelConfig,
+        use_converse: bool,
+        policy: RetryPolicy,
+        stats: RetryStats,
+        stream: bool = False,
+        usage: Optional[Dict[str, int]] = None,
+        metadata: Optional[Dict] = None,
+        tags: Optional[List[str]] = None,
+        conversation_id: Optional[str] = None,
+        client=None
+    ) -> Tuple[Union[str, Iterator[str]], str]:
+        """
+        Call the converse API when possible, falling back to invoke_model
+        
+        Transient errors are retried on the same API; other converse errors
+        fall back to invoke_model. `client` overrides the bedrock-runtime client,
+        as hedge requests do.
+        
+        Returns:
+            Tuple of (response text or chunk iterator, API used)
+        """
+        api = "converse"
+        try:
+            if use_converse:
                 try:
-                    response = self._use_converse_api(
-                        parsed_prompt,
-                        model_config,
-                        stream=stream
+                    response = policy.call(
+                        lambda: self._use_converse_api(
+                            conversation, model_config, stream=stream, usage=usage,
+                            metadata=metadata, client=client
+                        ),
+                        stats,
+                        on_retry=self._retry_emitter(model_config, api, tags, conversation_id)
                     )
-                    # Add assistant response to history if not streaming
-                    if not stream:
-                        # Add new messages to conversation history
-                        if new_messages["system"]:
-                            self.conversation_history.add_message("system", new_messages["system"])
-                        for i in range(len(new_messages["user"])):
-                            self.conversation_history.add_message("user", new_messages["user"][i])
-                            if i < len(new_messages["assistant"]):
-                                self.conversation_history.add_message("assistant", new_messages["assistant"][i])
-                        self.conversation_history.add_message("assistant", response)
-                    return response
+                    return response, api
                 except Exception as e:
-                    if "ThrottlingException" in str(e) and current_retry < max_retries:
-                        print(f"Throttling detected, waiting {self.base_delay} seconds before retry...")
-                        time.sleep(self.base_delay)
-                        current_retry += 1
-                        continue
+                    if policy.is_retryable(e):
+                        raise
                     print(f"Converse API failed, falling back to invoke_model: {e}")
+                    self._emit(
+                        "fallback", model_config, api, stats, error=e,
+                        tags=tags, conversation_id=conversation_id
+                    )
+            
+            # Fall back to invoke_model with model-specific formatting
+            api = "invoke_model"
+            response = policy.call(
+                lambda: self._use_invoke_model(
+                    conversation, model_config, stream=stream, usage=usage,
+                    metadata=metadata, client=client
+                ),
+                stats,
+                on_retry=self._retry_emitter(model_config, api, tags, conversation_id)
+            )
+            return response, api
+        except Exception as e:
+            self._emit(
+                "request", model_config, api, stats, error=e, stream=stream,
+                tags=tags, conversation_id=conversation_id
+            )
+            raise
+
+    def _dispatch(
+        self,
+        conversation: Dict,
+        model_config: ModelConfig,
+        use_converse: bool,
+        policy: RetryPolicy,
+        stats: RetryStats,
+        stream: bool = False,
+        tags: Optional[List[str]] = None,
+        conversation_id: Optional[str] = None
+    ) -> Tuple[Union[str, Iterator[str]], str, Dict[str, int], Dict, ModelConfig]:
+        """
+        Make the model call, hedged and coalesced as the client is configured
+        
+        A caller that joined an identical in-flight call gets its result with
+        api "coalesced". Streams are teed so every caller reads all the chunks.
+        
+        Returns:
+            Tuple of (response text or chunk iterator, API used, usage, stream
+            metadata, config of the model that answered)
+        """
+        def call():
+            usage: Dict[str, int] = {}
+            metadata: Dict = {}
+            served_config = model_config
+            if self.hedge_policy is not None and not stream:
+                response, api, served_config = self._call_model_hedged(
+                    conversation, model_config, use_converse, policy, stats,
+                    usage=usage, tags=tags, conversation_id=conversation_id
+                )
+            else:
+                response, api = self._call_model(
+                    conversation, model_config, use_converse, policy, stats,
+                    stream=stream, usage=usage, metadata=metadata,
+                    tags=tags, conversation_id=conversation_id
+                )
+            if stream and self.single_flight is not None:
+                response = StreamTee(response)
+            return response, api, usage, metadata, served_config
+        
+        if self.single_flight is None:
+            return call()
+        (response, api, usage, metadata, served_config), leader = self.single_flight.do(
+            self._flight_key(conversation, model_config, use_converse, stream), call,
+            # Each caller gets its own reader, and the upstream closes when all are closed
+            on_shared=(lambda result, callers: result[0].expect(callers)) if stream else None
+        )
+        if stream:
+            response = response.reader()
+        return response, api if leader else "coalesced", usage, metadata, served_config
+
+    def _flight_key(
+        self,
+        conversation: Dict,
+        model_config: ModelConfig,
+        use_converse: bool,
+        stream: bool = False
+    ) -> str:
+        """Key identifying identical in-flight requests for single-flight coalescing"""
+        request = self._build_converse_request(conversation, model_config)
+        request["converse"] = use_converse
+        request["stream"] = stream
+        return cache_key(request)
+
+    def _call_model_hedged(
+        self,
+        conversation: Dict,
+        model_config: ModelConfig,
+        use_converse: bool,
+        policy: RetryPolicy,
+        stats: RetryStats,
+        usage: Dict[str, int],
+        tags: Optional[List[str]] = None,
+        conversation_id: Optional[str] = None
+    ) -> Tuple[str, str, ModelConfig]:
+        """
+        Call the model, sending a hedge request if the first is slower than the hedge delay
+        
+        The first successful answer wins and its token usage is copied into
+        `usage`. The other call can't be cancelled once sent, so it is left to
+        finish in the background and its tokens are still recorded, under the
+        model it was sent to.
+        
+        Returns:
+            Tuple of (response text, API used, config of the call that won)
+        """
+        hedge = self.hedge_policy
+        executor = self._get_hedge_executor()
+        hedge.on_request()
+        calls: Dict[Future, Tuple[ModelConfig, RetryStats, Dict[str, int]]] = {}
+        
+        def submit(config: ModelConfig, call_stats: RetryStats, client=None) -> Future:
+            call_usage: Dict[str, int] = {}
+            future = executor.submit(
+                self._call_model, conversation, config, use_converse, policy, call_stats,
+                usage=call_usage, tags=tags, conversation_id=conversation_id, client=client
+            )
+            calls[future] = (config, call_stats, call_usage)
+            return future
+        
+        primary = submit(model_config, stats)
+        primary.add_done_callback(
+            lambda future: future.exception() is None and hedge.record(model_config.model_id, stats.elapsed)
+        )
+        try:
+            primary.result(timeout=hedge.delay_for(model_config.model_id))
+            pending = set()
+        except FutureTimeoutError:
+            pending = {primary}
+            if hedge.try_hedge():
+                hedge_config = replace(model_config, model_id=hedge.model_id) if hedge.model_id else model_config
+                self._emit("hedge", model_config, "converse" if use_converse else "invoke_model", stats,
+                           tags=tags, conversation_id=conversation_id)
+                pending.add(submit(hedge_config, RetryStats(), self._hedge_client()))
+        
+        winner = primary if not pending else None
+        error = None
+        while winner is None and pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    winner = future
                     break
+                error = future.exception()
+        if winner is None:
+            raise error
         
-        # Fall back to invoke_model with model-specific formatting
-        response = self._use_invoke_model(
-            parsed_prompt,
-            model_config,
-            stream=stream
+        for future in pending:
+            future.add_done_callback(self._hedge_loser_recorder(calls[future], tags, conversation_id))
+        if winner is not primary:
+            hedge.on_hedge_win()
+        usage.update(calls[winner][2])
+        response, api = winner.result()
+        return response, api, calls[winner][0]
+
+    def _hedge_loser_recorder(
+        self,
+        call: Tuple[ModelConfig, RetryStats, Dict[str, int]],
+        tags: Optional[List[str]] = None,
+        conversation_id: Optional[str] = None
+    ) -> Callable[[Future], None]:
+        """Done callback emitting the request event of a hedged call that lost the race"""
+        model_config, stats, usage = call
+        def on_done(future: Future):
+            if future.exception() is None:
+                _, api = future.result()
+                self._emit("request", model_config, api, stats, usage, tags=tags, conversation_id=conversation_id)
+        return on_done
+
+    def _get_hedge_executor(self) -> ThreadPoolExecutor:
+        if self._hedge_executor is None:
+            self._hedge_executor = ThreadPoolExecutor(max_workers=self.hedge_policy.max_workers)
+        return self._hedge_executor
+
+    def _hedge_client(self):
+        """bedrock-runtime client for hedge requests"""
+        hedge = self.hedge_policy
+        if hedge.client is not None:
+            return hedge.client
+        if hedge.region_name is None and hedge.profile_name is None:
+            return self.client
+        hedge.client = get_shared_client(
+            region_name=hedge.region_name or self.region_name,
+            profile_name=hedge.profile_name or self.profile_name,
+            max_pool_connections=self.max_pool_connections,
+            connect_timeout=self.connect_timeout,
+            read_timeout=self.read_timeout,
+            tcp_keepalive=self.tcp_keepalive
+        )
+        return hedge.client
+
+    def add_metrics_hook(self, hook: MetricsHook):
+        """Register a callable that receives a MetricsEvent for every request, retry and fallback"""
+        self.metrics_hooks.append(hook)
+
+    def _emit(
+        self,
+        event: str,
+        model_config: ModelConfig,
+        api: str,
+        stats: Optional[RetryStats] = None,
+        usage: Optional[Dict[str, int]] = None,
+        error: Optional[Exception] = None,
+        stream: bool = False,
+        time_to_first_token: Optional[float] = None,
+        tags: Optional[List[str]] = None,
+        conversation_id: Optional[str] = None
+    ):
+        """Send a MetricsEvent to every metrics hook"""
+        if not self.metrics_hooks:
+            return
+        usage = usage or {}
+        metrics_event = MetricsEvent(
+            event=event,
+            model_id=model_config.model_id,
+            api=api,
+            latency=stats.elapsed if stats is not None else 0.0,
+            time_to_first_token=time_to_first_token,
+            input_tokens=usage.get("inputTokens", 0),
+            output_tokens=usage.get("outputTokens", 0),
+            cache_read_tokens=usage.get("cacheReadInputTokens", 0),
+            cache_write_tokens=usage.get("cacheWriteInputTokens", 0),
+            retries=stats.retries if stats is not None else 0,
+            error=error_code(error) if error is not None else None,
+            stream=stream,
+            tags=list(tags or []),
+            conversation_id=conversation_id
         )
+        for hook in self.metrics_hooks:
+            try:
+                hook(metrics_event)
+            except Exception as e:
+                print(f"Metrics hook failed: {e}")
+
+    def _retry_emitter(
+        self,
+        model_config: ModelConfig,
+        api: str,
+        tags: Optional[List[str]] = None,
+        conversation_id: Optional[str] = None
+    ):
+        """on_retry callback for RetryPolicy.call that emits retry events"""
+        def on_retry(error: Exception, stats: RetryStats):
+            self._emit("retry", model_config, api, stats, error=error, tags=tags, conversation_id=conversation_id)
+        return on_retry
+
+    def _create_client(self):
+        """Create the bedrock-runtime client used for model calls"""
+        if self._external_client is not None:
+            return self._external_client
+        if self.shared_client and self.session is None and self.config is None:
+            return get_shared_client(
+                region_name=self.region_name,
+                profile_name=self.profile_name,
+                max_pool_connections=self.max_pool_connections,
+                connect_timeout=self.connect_timeout,
+                read_timeout=self.read_timeout,
+                tcp_keepalive=self.tcp_keepalive
+            )
+        session = self.session or boto3.Session(profile_name=self.profile_name)
+        return session.client(
+            'bedrock-runtime',
+            region_name=self.region_name,
+            config=self.config or self._client_config()
+        )
+
+    def _client_config(self, config_class: type = Config) -> Config:
+        """Client config from the pool and timeout settings"""
+        return client_config(
+            max_pool_connections=self.max_pool_connections,
+            connect_timeout=self.connect_timeout,
+            read_timeout=self.read_timeout,
+            tcp_keepalive=self.tcp_keepalive,
+            config_class=config_class
+        )
+
+    def _prepare_request(
+        self,
+        prompt: Union[str, PromptTemplate],
+        model_config: ModelConfig,
+        variables: Dict[str, str],
+        few_shot_template: Optional[FewShotTemplate],
+        include_history: bool,
+        history: Optional[ConversationHistory] = None
+    ) -> Tuple[Dict[str, Union[str, List[str]]], Dict, bool]:
+        """
+        Render and parse a prompt, prepending conversation history
         
-        # Add assistant response to history if not streaming
-        if not stream:
-            self.conversation_history.add_message("assistant", response)
-        return response
+        `history` defaults to the client's conversation_history.
+        
+        Returns:
+            Tuple of (new messages, conversation with system text and Converse
+            message blocks, whether the converse API can be used)
+        """
+        if isinstance(prompt, str):
+            if not(('<<system>>' in prompt) or ('<<user>>' in prompt) or ('<<assistant>>' in prompt)):
+                prompt = '<<user>>\n' + prompt
+            prompt = PromptTemplate('tmp', prompt)
+        
+        # Format prompt with variables and few-shot examples
+        segments = self._format_prompt_segments(prompt, variables, few_shot_template)
+        
+        # Parse the new prompt (without history)
+        new_messages = segments_to_messages(segments)
+        conversation = {
+            "system": new_messages["system"],
+            "messages": self._to_converse_messages(new_messages)
+        }
+        
+        # Prepend stored history blocks; nothing is re-rendered or re-parsed
+        if history is None:
+            history = self.conversation_history
+        if include_history and len(history):
+            budget = self._history_token_budget(model_config, conversation, history)
+            conversation["system"] = history.get_system_message(new_messages["system"])
+            conversation["messages"] = history.get_converse_messages(max_tokens=budget) + conversation["messages"]
+        
+        # Check if prompt ends with assistant message
+        messages = conversation["messages"]
+        ends_with_assistant = bool(messages) and messages[-1]["role"] == "assistant"
+        use_converse = (
+            (not ends_with_assistant) or
+            get_provider(model_config.model_id).converse_prefill
+        )
+        return new_messages, conversation, use_converse
 
-    def _format_prompt(
+    def _history_token_budget(
+        self,
+        model_config: ModelConfig,
+        conversation: Dict,
+        history: Optional[ConversationHistory] = None
+    ) -> Optional[int]:
+        """Tokens left for history once the new prompt and the response are accounted for"""
+        window = model_config.context_window or context_window(model_config.model_id)
+        if window is None:
+            return None
+        if history is None:
+            history = self.conversation_history
+        used = model_config.max_tokens + estimate_tokens(
+            conversation["system"] or history.system_message or ""
+        )
+        for msg in conversation["messages"]:
+            used += sum(history.token_estimator(block.get("text", "")) for block in msg["content"])
+        return max(0, window - used)
+
+    def _to_converse_messages(self, parsed_prompt: Dict[str, Union[str, List[str]]]) -> List[Dict]:
+        """Convert parsed prompt into Converse message blocks, keeping the prompt's turn order"""
+        return [
+            {"role": message["role"], "content": [{"text": message["content"]}]}
+            for message in parsed_prompt["messages"]
+        ]
+
+    def _to_parsed_prompt(self, conversation: Dict) -> Dict[str, Union[str, List[str]]]:
+        """Convert a conversation back to system/user/assistant text for invoke_model formatting"""
+        parsed_prompt = {"system": conversation["system"], "user": [], "assistant": []}
+        for msg in conversation["messages"]:
+            parsed_prompt[msg["role"]].append(
+                "".join(block.get("text", "") for block in msg["content"])
+            )
+        return parsed_prompt
+
+    def _cache_lookup(
+        self,
+        conversation: Dict,
+        model_config: ModelConfig,
+        use_cache: bool
+    ) -> Tuple[Optional[str], Optional[str]]:
+        """
+        Look a request up in the response cache
+        
+        Returns:
+            Tuple of (cache key, cached response); the key is None when caching is off
+        """
+        if self.response_cache is None or not use_cache:
+            return None, None
+        key = cache_key(self._build_converse_request(conversation, model_config))
+        return key, self.response_cache.get(key)
+
+    def _cache_store(self, key: Optional[str], response: str, latency: float, usage: Dict[str, int]):
+        """Store a response under a key from _cache_lookup"""
+        if key is not None:
+            self.response_cache.set(key, response, latency=latency, usage=usage)
+
+    def _semantic_lookup(
         self,
         prompt: Union[str, PromptTemplate],
+        model_config: ModelConfig,
         variables: Dict[str, str],
-        few_shot_template: Optional[FewShotTemplate]
-    ) -> str:
-        """Format prompt with variables and few-shot examples"""
-        # Format prompt with variables
+        few_shot_template: Optional[FewShotTemplate],
+        include_history: bool,
+        use_cache: bool,
+        history: Optional[ConversationHistory] = None,
+        conversation: Optional[Dict] = None
+    ) -> Tuple[Optional[Tuple[str, str]], Optional[str]]:
+        """
+        Look a request up in the semantic cache
+        
+        `conversation` is the parsed request; plain prompts are matched on it.
+        
+        Returns:
+            Tuple of ((scope, text) key, cached response); the key is None when
+            the request isn't eligible
+        """
+        cache = self.semantic_cache
+        if cache is None or not use_cache:
+            return None, None
+        if history is None:
+            history = self.conversation_history
+        if include_history and len(history):
+            return None, None
+        scope = self._build_converse_request({"system": None, "messages": []}, model_config)
+        del scope["messages"]
         if isinstance(prompt, str):
-            prompt_template = PromptTemplate('tmp', prompt)
-            prompt_text = prompt_template.render(variables)
+            if not cache.plain_prompts:
+                return None, None
+            if conversation is None:
+                conversation = self._prepare_request(
+                    prompt, model_config, variables, few_shot_template, False, history
+                )[1]
+            scope["system"], scope["context"], text = self._semantic_question(conversation)
         else:
-            prompt_text = prompt.render(variables)
+            if not cache.is_enabled(prompt.name):
+                return None, None
+            fields = cache.fields_for(prompt.name)
+            fuzzy = sorted(variables) if fields is None else [f for f in fields if f in variables]
+            text = "\n".join(str(variables[name]) for name in fuzzy)
+            scope["template"] = prompt.content
+            scope["variables"] = {name: value for name, value in variables.items() if name not in fuzzy}
+        if few_shot_template is not None:
+            scope["few_shot"] = few_shot_template.render()
+        key = (cache_key(scope), text)
+        return key, cache.get(*key)
+
+    @staticmethod
+    def _semantic_question(conversation: Dict) -> Tuple[Optional[str], List, str]:
+        """
+        Split a rendered plain prompt into its exactly and approximately matched parts
+        
+        Only the last paragraph of the final user turn is matched approximately.
+        The system text, the other turns and the earlier paragraphs of that turn
+        must match exactly, so a long shared context can't make two different
+        questions look alike.
+        
+        Returns:
+            Tuple of (system text, exactly matched turns, question text)
+        """
+        messages = [
+            (message["role"], "".join(block.get("text", "") for block in message["content"]))
+            for message in conversation["messages"]
+        ]
+        last_user = max((i for i, (role, _) in enumerate(messages) if role == "user"), default=None)
+        if last_user is None:
+            return conversation["system"], messages, ""
+        context, _, question = messages[last_user][1].strip().rpartition("\n\n")
+        messages[last_user] = ("user", context)
+        return conversation["system"], messages, question
+
+    def _semantic_store(self, key: Optional[Tuple[str, str]], response: str):
+        """Store a response under a key from _semantic_lookup"""
+        if key is not None:
+            self.semantic_cache.set(*key, response)
+
+    def _stream_recorder(
+        self,
+        new_messages: Dict[str, Union[str, List[str]]],
+        model_config: ModelConfig,
+        api: str,
+        stats: RetryStats,
+        tags: Optional[List[str]] = None,
+        conversation_id: Optional[str] = None,
+        history: Optional[ConversationHistory] = None
+    ):
+        """Callback that records a streamed turn and its metrics once the full text is known"""
+        def on_complete(response: StreamResponse):
+            self._record_turn(new_messages, response.text, history)
+            self._emit(
+                "request", model_config, api, stats, response.usage,
+                stream=True, time_to_first_token=response.time_to_first_token,
+                tags=tags, conversation_id=conversation_id
+            )
+        return on_complete
+
+    def _stream_stop_recorder(
+        self,
+        conversation: Dict,
+        model_config: ModelConfig,
+        api: str,
+        stats: RetryStats,
+        tags: Optional[List[str]] = None,
+        conversation_id: Optional[str] = None
+    ):
+        """Callback that reports a stream stopped early; its partial turn is not added to history"""
+        def on_stop(response: StreamResponse):
+            # Bedrock sends no usage for a closed stream, but the prompt and the
+            # output so far are still billed, so report an estimate
+            if not response.usage:
+                response.metadata["usage"] = self._estimate_usage(conversation, response.text)
+            self._emit(
+                "request", model_config, api, stats, response.usage,
+                stream=True, time_to_first_token=response.time_to_first_token,
+                tags=tags, conversation_id=conversation_id
+            )
+        return on_stop
+
+    def _estimate_usage(self, conversation: Dict, output: str) -> Dict[str, int]:
+        """Estimated token usage of a request and its output, in converse usage format"""
+        input_tokens = estimate_tokens(conversation["system"] or "") + sum(
+            estimate_tokens(block.get("text", ""))
+            for message in conversation["messages"] for block in message["content"]
+        )
+        output_tokens = estimate_tokens(output)
+        return {
+            "inputTokens": input_tokens,
+            "outputTokens": output_tokens,
+            "totalTokens": input_tokens + output_tokens
+        }
+
+    def _record_turn(
+        self,
+        new_messages: Dict[str, Union[str, List[str]]],
+        response: str,
+        history: Optional[ConversationHistory] = None
+    ):
+        """Add the new prompt messages and the model response to conversation history"""
+        if history is None:
+            history = self.conversation_history
+        messages = new_messages["messages"]
+        if new_messages["system"]:
+            history.add_message("system", new_messages["system"])
+        if messages and messages[-1]["role"] == "assistant":
+            # A trailing assistant message is a prefill the response continues
+            response = messages[-1]["content"] + response
+            messages = messages[:-1]
+        for message in messages:
+            history.add_message(message["role"], message["content"])
+        history.add_message("assistant", response)
+
+    def _format_prompt_segments(
+        self,
+        prompt: PromptTemplate,
+        variables: Dict[str, str],
+        few_shot_template: Optional[FewShotTemplate]
+    ) -> List[Segment]:
+        """Format prompt with variables and few-shot examples into role segments"""
+        # Format prompt with variables
+        segments = prompt.render_segments(variables)
     
         # Add few-shot examples if provided
         if few_shot_template:
-            prompt_text = f"{few_shot_template.render()}\n\n{prompt_text}"
+            segments = concat_segments(few_shot_template.render_segments(), "\n\n", segments)
             
-        return prompt_text
+        return segments
 
     def _use_converse_api(
         self,
-        parsed_prompt: Dict[str, Union[str, List[str]]],
+        conversation: Dict,
         model_config: ModelConfig,
-        stream: bool = False
+        stream: bool = False,
+        usage: Optional[Dict[str, int]] = None,
+        metadata: Optional[Dict] = None,
+        client=None
     ) -> Union[str, Iterator[str]]:
-        """Use the Bedrock converse API"""
+        """
+        Use the Bedrock converse API, copying token usage into `usage` if given
         
-        # Format messages alternating between user/assistant
-        messages = []
-        # Add system message if present
-        if parsed_prompt["system"]:
-            system = [{"text": parsed_prompt["system"]}]
+        When streaming, `metadata` is filled with the final metadata event as the stream ends.
+        """
+        client = client or self.client
+        kwargs = self._build_converse_request(conversation, model_config)
+        if self.prompt_cache is not None:
+            kwargs = self.prompt_cache.apply(kwargs)
+        if stream:
+            response = client.converse_stream(**kwargs)
+            return self._handle_stream_response(response, metadata)
         else:
-            system = None
-        
-        # Build message sequence
-        for i in range(len(parsed_prompt["user"])):
-            # Add user message
-            if i < len(parsed_prompt["user"]):
-                messages.append({
-                    "role": "user",
-                    "content": [{"text": parsed_prompt["user"][i]}]
-                })
-            # Add assistant message if available
-            if i < len(parsed_prompt["assistant"]):
-                messages.append({
-                    "role": "assistant", 
-                    "content": [{"text": parsed_prompt["assistant"][i]}]
-                })
-        # Call converse API
+            response = client.converse(**kwargs)
+            if usage is not None:
+                usage.update(response.get("usage", {}))
+            return response["output"]["message"]["content"][0]["text"]
+
+    def _build_converse_request(
+        self,
+        conversation: Dict,
+        model_config: ModelConfig
+    ) -> Dict:
+        """Build converse/converse_stream request arguments"""
         kwargs = {
             "modelId": model_config.model_id,
-            "messages": messages,
+            "messages": conversation["messages"],
             "inferenceConfig": {
                 "maxTokens": model_config.max_tokens,
                 "temperature": model_config.temperature,
                 "topP": model_config.top_p
             }
         }
-        if system:
-            kwargs["system"] = system
-        if stream:
-            response = self.client.converse_stream(**kwargs)
-            return self._handle_stream_response(response)
-        else:
-            response = self.client.converse(**kwargs)
-            return response["output"]["message"]["content"][0]["text"]
+        if model_config.stop_sequences:
+            kwargs["inferenceConfig"]["stopSequences"] = list(model_config.stop_sequences)
+        # Parameters outside inferenceConfig, such as top-k, use provider-specific fields
+        fields = get_provider(model_config.model_id).converse_fields(model_config)
+        fields.update(model_config.additional_model_request_fields)
+        if fields:
+            kwargs["additionalModelRequestFields"] = fields
+        # Add system message if present
+        if conversation["system"]:
+            kwargs["system"] = [{"text": conversation["system"]}]
+        return kwargs
 
     def _use_invoke_model(
         self,
-        parsed_prompt: Dict[str, Union[str, List[str]]],
+        conversation: Dict,
         model_config: ModelConfig, 
-        stream: bool = False
+        stream: bool = False,
+        usage: Optional[Dict[str, int]] = None,
+        metadata: Optional[Dict] = None,
+        client=None
     ) -> Union[str, Iterator[str]]:
-        """Use invoke_model with model-specific formatting"""
-        
-        # Format prompt based on model type
-        if "llama3" in model_config.model_id:
-            formatted_prompt = self._format_llama3_prompt(parsed_prompt)
-        elif "mistral" in model_config.model_id:
-            formatted_prompt = self._format_mistral_prompt(parsed_prompt)
-        elif "anthropic" in model_config.model_id:
-            formatted_prompt = self._format_anthropic_prompt(parsed_prompt)
-        elif "ai21" in model_config.model_id:
-            formatted_prompt = self._format_ai21_prompt(parsed_prompt)
-        elif "cohere" in model_config.model_id:
-            formatted_prompt = self._format_cohere_prompt(parsed_prompt)
-        else:  # amazon models
-            formatted_prompt = self._format_amazon_prompt(parsed_prompt)
-
-        # Format request body based on model type
-        body = self._format_model_body(formatted_prompt, model_config)
+        """
+        Use invoke_model with model-specific formatting, copying token usage into `usage` if given
         
+        When streaming, `metadata` is filled from the invocation metrics in the last chunk.
+        """
+        client = client or self.client
+        kwargs = self._build_invoke_request(conversation, model_config)
         if stream:
-            response = self.client.invoke_model_with_response_stream(
-                modelId=model_config.model_id,
-                body=json.dumps(body),
-                contentType="application/json",
-                accept="application/json"
-            )
-            return self._handle_stream_response(response)
+            response = client.invoke_model_with_response_stream(**kwargs)
+            return self._handle_stream_response(response, metadata, model_config.model_id)
         else:
-            response = self.client.invoke_model(
-                modelId=model_config.model_id,
-                body=json.dumps(body),
-                contentType="application/json", 
-                accept="application/json"
-            )
+            response = client.invoke_model(**kwargs)
+            if usage is not None:
+                usage.update(self._invoke_model_usage(response))
             return self._parse_response(response, model_config.model_id)
 
-    def _format_model_body(self, prompt: str, model_config: ModelConfig) -> Dict:
-        """Format request body based on model type"""
-        if "llama3" in model_config.model_id:
-            return {
-                "prompt": prompt,
-                "max_gen_len": model_config.max_tokens,
-                "temperature": model_config.temperature,
-                "top_p": model_config.top_p
-            }
-        elif "mistral" in model_config.model_id:
-            return {
-                "prompt": prompt,
-                "max_tokens": model_config.max_tokens,
-                "temperature": model_config.temperature,
-                "top_p": model_config.top_p
-            }
-        elif "anthropic" in model_config.model_id:
-            return {
-                "prompt": prompt,
-                "max_tokens_to_sample": model_config.max_tokens,
-                "temperature": model_config.temperature,
-                "top_p": model_config.top_p
-            }
-        elif "ai21" in model_config.model_id:
-            return {
-                "prompt": prompt,
-                "maxTokens": model_config.max_tokens,
-                "temperature": model_config.temperature,
-                "topP": model_config.top_p
-            }
-        elif "cohere" in model_config.model_id:
-            return {
-                "prompt": prompt,
-                "max_tokens": model_config.max_tokens,
-                "temperature": model_config.temperature,
-                "p": model_config.top_p
-            }
-        else:  # amazon models
-            return {
-                "inputText": prompt,
-                "textGenerationConfig": {
-                    "maxTokenCount": model_config.max_tokens,
-                    "temperature": model_config.temperature,
-                    "topP": model_config.top_p
-                }
-            }
+    def _invoke_model_usage(self, response: Dict) -> Dict[str, int]:
+        """Read token counts from invoke_model response headers in converse usage format"""
+        headers = response.get("ResponseMetadata", {}).get("HTTPHeaders", {})
+        input_tokens = int(headers.get("x-amzn-bedrock-input-token-count", 0))
+        output_tokens = int(headers.get("x-amzn-bedrock-output-token-count", 0))
+        return {
+            "inputTokens": input_tokens,
+            "outputTokens": output_tokens,
+            "totalTokens": input_tokens + output_tokens
+        }
 
-    def _format_llama3_prompt(self, parsed_prompt: Dict[str, Union[str, List[str]]]) -> str:
-        """Format prompt for Llama 3 models"""
-        prompt = "<|begin_of_text|>"
+    def _build_invoke_request(
+        self,
+        conversation: Dict,
+        model_config: ModelConfig
+    ) -> Dict:
+        """Build invoke_model request arguments with model-specific formatting"""
+        provider = get_provider(model_config.model_id)
+        formatted_prompt = provider.format_prompt(self._to_parsed_prompt(conversation))
+        body = provider.build_body(formatted_prompt, model_config)
+        body.update(model_config.additional_model_request_fields)
+        return {
+            "modelId": model_config.model_id,
+            "body": json.dumps(body),
+            "contentType": "application/json",
+            "accept": "application/json"
+        }
+
+    def _handle_stream_response(
+        self,
+        response: Dict,
+        metadata: Optional[Dict] = None,
+        model_id: str = ""
+    ) -> Iterator[str]:
+        """
+        Handle streaming responses from both APIs, copying the final metadata into `metadata`
         
-        if parsed_prompt["system"]:
-            prompt += f"<|start_header_id|>system<|end_header_id|>\n{parsed_prompt['system']}<|eot_id|>\n"
-            
-        for i in range(max(len(parsed_prompt["user"]), len(parsed_prompt["assistant"]))):
-            if i < len(parsed_prompt["user"]):
-                prompt += f"<|start_header_id|>user<|end_header_id|>\n{parsed_prompt['user'][i]}<|eot_id|>\n"
-            if i < len(parsed_prompt["assistant"]):
-                prompt += f"<|start_header_id|>assistant<|end_header_id|>\n{parsed_prompt['assistant'][i]}<|eot_id|>\n"
-                
-        return prompt
-
-    def _format_mistral_prompt(self, parsed_prompt: Dict[str, Union[str, List[str]]]) -> str:
-        """Format prompt for Mistral models"""
-        prompt = ""
-        
-        if parsed_prompt["system"]:
-            prompt += f"<<SYS>>{parsed_prompt['system']}<</SYS>>"
-            
-        prompt += "<s>[INST]"
-        
-        for i in range(max(len(parsed_prompt["user"]), len(parsed_prompt["assistant"]))):
-            if i < len(parsed_prompt["user"]):
-                if i > 0:
-                    prompt += "</s><s>[INST]"
-                prompt += parsed_prompt["user"][i]
-            if i < len(parsed_prompt["assistant"]):
-                prompt += "[/INST]" + parsed_prompt["assistant"][i]
-                
-        return prompt
-
-    def _format_anthropic_prompt(self, parsed_prompt: Dict[str, Union[str, List[str]]]) -> str:
-        """Format prompt for Anthropic models"""
-        prompt = ""
-        
-        if parsed_prompt["system"]:
-            prompt += f"\n\nHuman: {parsed_prompt['system']}\n\nAssistant: Understood. I'll follow those instructions.\n\n"
-            
-        for i in range(max(len(parsed_prompt["user"]), len(parsed_prompt["assistant"]))):
-            if i < len(parsed_prompt["user"]):
-                prompt += f"Human: {parsed_prompt['user'][i]}\n\n"
-            if i < len(parsed_prompt["assistant"]):
-                prompt += f"Assistant: {parsed_prompt['assistant'][i]}\n\n"
-                
-        return prompt
-
-    def _format_ai21_prompt(self, parsed_prompt: Dict[str, Union[str, List[str]]]) -> str:
-        """Format prompt for AI21 models"""
-        # AI21 specific formatting if needed
-        return self._format_default_prompt(parsed_prompt)
-
-    def _format_cohere_prompt(self, parsed_prompt: Dict[str, Union[str, List[str]]]) -> str:
-        """Format prompt for Cohere models"""
-        # Cohere specific formatting if needed
-        return self._format_default_prompt(parsed_prompt)
-
-    def _format_amazon_prompt(self, parsed_prompt: Dict[str, Union[str, List[str]]]) -> str:
-        """Format prompt for Amazon models"""
-        # Amazon specific formatting if needed
-        return self._format_default_prompt(parsed_prompt)
-
-    def _format_default_prompt(self, parsed_prompt: Dict[str, Union[str, List[str]]]) -> str:
-        """Default prompt formatting"""
-        prompt = ""
-        
-        if parsed_prompt["system"]:
-            prompt += f"<<system>>\n{parsed_prompt['system']}\n\n"
-            
-        for i in range(max(len(parsed_prompt["user"]), len(parsed_prompt["assistant"]))):
-            if i < len(parsed_prompt["user"]):
-                prompt += f"<<user>>\n{parsed_prompt['user'][i]}\n\n"
-            if i < len(parsed_prompt["assistant"]):
-                prompt += f"<<assistant>>\n{parsed_prompt['assistant'][i]}\n\n"
-                
-        return prompt
-
-    def _handle_stream_response(self, response: Dict) -> Iterator[str]:
-        """Handle streaming responses from both APIs"""
-        if 'stream' in response:  # converse_stream response
-            for event in response['stream']:
-                if 'contentBlockDelta' in event:
-                    delta = event['contentBlockDelta']
-                    if 'delta' in delta and 'text' in delta['delta']:
-                        yield delta['delta']['text']
-        else:  # invoke_model_with_response_stream response
-            for event in response['body']:
-                if 'chunk' in event:
-                    yield event['chunk']['bytes'].decode()
+        Closing the generator early closes the event stream, dropping the connection.
+        """
+        events = response['stream'] if 'stream' in response else response['body']
+        try:
+            if 'stream' in response:  # converse_stream response
+                for event in events:
+                    if 'contentBlockDelta' in event:
+                        delta = event['contentBlockDelta']
+                        if 'delta' in delta and 'text' in delta['delta']:
+                            yield delta['delta']['text']
+                    elif 'metadata' in event and metadata is not None:
+                        metadata.update(event['metadata'])
+            else:  # invoke_model_with_response_stream response
+                provider = get_provider(model_id)
+                for event in events:
+                    if 'chunk' in event:
+                        chunk = json.loads(event['chunk']['bytes'])
+                        if metadata is not None:
+                            self._invoke_stream_metadata(chunk, metadata)
+                        text = provider.decode_stream_chunk(chunk)
+                        if text:
+                            yield text
+        finally:
+            close = getattr(events, "close", None)
+            if close is not None:
+                close()
+
+    def _invoke_stream_metadata(self, chunk: Dict, metadata: Dict):
+        """Copy invocation metrics from a decoded invoke_model stream chunk into converse metadata form"""
+        if "amazon-bedrock-invocationMetrics" not in chunk:
+            return
+        metrics = chunk["amazon-bedrock-invocationMetrics"]
+        metadata["usage"] = {
+            "inputTokens": metrics.get("inputTokenCount", 0),
+            "outputTokens": metrics.get("outputTokenCount", 0),
+            "totalTokens": metrics.get("inputTokenCount", 0) + metrics.get("outputTokenCount", 0)
+        }
+        metadata["metrics"] = {"latencyMs": metrics.get("invocationLatency", 0)}
 
     def _parse_response(self, response: Dict, model_id: str) -> str:
         """Parse model response based on provider"""
+        return self._parse_response_body(response.get('body').read(), model_id)
+
+    def _parse_response_body(self, raw_body: Union[str, bytes], model_id: str) -> str:
+        """Extract generated text from a raw invoke_model response body"""
         try:
-            response_body = json.loads(response.get('body').read())
-            
-            if "llama" in model_id:
-                return response_body['generation']
-            elif "mistral" in model_id:
-                return response_body['outputs'][0]['text']
-            elif "anthropic" in model_id:
-                return response_body['completion']
-            elif "ai21" in model_id:
-                return response_body['completions'][0]['data']['text']
-            elif "cohere" in model_id:
-                return response_body['generations'][0]['text']
-            else:
-                return response_body['results'][0]['outputText']
-                
+            return get_provider(model_id).parse_response(json.loads(raw_body))
         except Exception as e:
             raise Exception(f"Failed to parse model response: {str(e)}")
 
     def prompt_to_json(self, prompt: str) -> Dict[str, Union[str, List[str]]]:
         """Parse prompt into system, user, and assistant components"""
-        if ('<<system>>' in prompt) or ('<<user>>' in prompt) or ('<<assistant>>' in prompt):
-            prompt = prompt + '<<'
+        return parse_prompt(prompt)
 
-        system_text = re.search(r'<<system>>(.*?)(<<|\$)', prompt, re.DOTALL)
-        system_text = system_text.group(1).strip() if system_text else ""
 
-        user_texts = re.findall(r'<<user>>(.*?)(<<|\$)', prompt, re.DOTALL)
-        user_texts = [t.strip() for t, _ in user_texts]
-
-        assistant_texts = re.findall(r'<<assistant>>(.*?)(<<|\$)', prompt, re.DOTALL)
-        assistant_texts = [t.strip() for t, _ in assistant_texts if len(t.strip()) > 0]
-
-        if not user_texts and not system_text and not assistant_texts:
-            user_texts = [prompt.strip()]
-
-        return {
-            "system": system_text,
-            "user": user_texts,
-            "assistant": assistant_texts
-        }
-
-
-    def clear_history(self):
-        """Clear conversation history"""
-        self.conversation_history.clear()
\ No newline at end of file
+    def clear_history(self, session_id: Optional[str] = None):
+        """Clear conversation history, or drop a session from the session store"""
+        if session_id is not None:
+            self.sessions.drop(session_id)
+        else:
+            self.conversation_history.clear()
\ No newline at end of file
@@ -0,0 +1,183 @@
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import List, Optional, Sequence
+import argparse
+import math
+import threading
+import time
+from bedrock_sdk.bedrock_client import BedrockClient, ModelConfig
+from bedrock_sdk.clients import client_config
+from bedrock_sdk.fake_runtime import FakeBedrockRuntime, FakeRuntimeConfig, FakeRuntimeServer, LatencyDistribution
+from bedrock_sdk.retry import error_code
+
+
+@dataclass
+class BenchmarkResult:
+    """Throughput and latency of the client at one concurrency level"""
+    concurrency: int
+    requests: int
+    errors: int
+    elapsed: float
+    cpu_time: float
+    p50: Optional[float]
+    p95: Optional[float]
+    p99: Optional[float]
+
+    @property
+    def requests_per_second(self) -> float:
+        return self.requests / self.elapsed if self.elapsed else 0.0
+
+    @property
+    def cpu_per_request(self) -> float:
+        """Process CPU seconds per request"""
+        return self.cpu_time / self.requests if self.requests else 0.0
+
+
+def _percentile(sorted_values: List[float], p: float) -> Optional[float]:
+    """Nearest-rank percentile (0-100) of sorted values"""
+    if not sorted_values:
+        return None
+    rank = max(1, math.ceil(len(sorted_values) * p / 100))
+    return sorted_values[rank - 1]
+
+
+def run_benchmark(
+    client: BedrockClient,
+    model_config: ModelConfig,
+    concurrency_levels: Sequence[int] = (1, 4, 16, 64),
+    requests_per_level: int = 200,
+    prompt: str = "Summarize the benefits of connection pooling in one paragraph.",
+    stream: bool = False,
+    warmup: int = 10
+) -> List[BenchmarkResult]:
+    """
+    Measure the client at rising concurrency
+
+    Each level sends `requests_per_level` history-free converse calls from
+    that many threads. Every prompt is unique so the response cache never
+    answers. Streams are read to the end. CPU time covers the whole process,
+    including an in-process fake or local server.
+
+    Args:
+        client: Client under test, usually backed by a FakeBedrockRuntime or FakeRuntimeServer
+        model_config: Model configuration for every call
+        concurrency_levels: Concurrent callers per level
+        requests_per_level: Calls made at each level
+        prompt: Prompt text; a request number is appended to keep prompts unique
+        stream: Use streaming calls
+        warmup: Calls made before measuring, to open connections
+
+    Returns:
+        One BenchmarkResult per concurrency level
+    """
+    counter = iter(range(1 << 62))
+    counter_lock = threading.Lock()
+
+    def call() -> float:
+        with counter_lock:
+            number = next(counter)
+        start = time.perf_counter()
+        response = client.converse(f"{prompt} #{number}", model_config, stream=stream, include_history=False)
+        if stream:
+            for _ in response:
+                pass
+        return time.perf_counter() - start
+
+    for _ in range(warmup):
+        call()
+
+    results = []
+    for concurrency in concurrency_levels:
+        latencies: List[float] = []
+        errors = 0
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            cpu_start, start = time.process_time(), time.perf_counter()
+            futures = [executor.submit(call) for _ in range(requests_per_level)]
+            for future in futures:
+                try:
+                    latencies.append(future.result())
+                except Exception as e:
+                    print(f"Benchmark request failed: {error_code(e)}")
+                    errors += 1
+            elapsed, cpu_time = time.perf_counter() - start, time.process_time() - cpu_start
+        latencies.sort()
+        results.append(BenchmarkResult(
+            concurrency=concurrency,
+            requests=requests_per_level,
+            errors=errors,
+            elapsed=elapsed,
+            cpu_time=cpu_time,
+            p50=_percentile(latencies, 50),
+            p95=_percentile(latencies, 95),
+            p99=_percentile(latencies, 99)
+        ))
+    return results
+
+
+def format_results(results: List[BenchmarkResult]) -> str:
+    """Results as a plain text table with latencies in milliseconds"""
+    def ms(value: Optional[float]) -> str:
+        return "-" if value is None else f"{value * 1000:.1f}"
+
+    lines = [f"{'concurrency':>11} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'cpu ms/req':>10} {'errors':>6}"]
+    for result in results:
+        lines.append(
+            f"{result.concurrency:>11} {result.requests_per_second:>9.1f} {ms(result.p50):>9} {ms(result.p95):>9} "
+            f"{ms(result.p99):>9} {result.cpu_per_request * 1000:>10.3f} {result.errors:>6}"
+        )
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark BedrockClient against a fake bedrock-runtime")
+    parser.add_argument("--levels", type=int, nargs="+", default=[1, 4, 16, 64], help="Concurrency levels")
+    parser.add_argument("--requests", type=int, default=200, help="Requests per level")
+    parser.add_argument("--model-id", default="us.amazon.nova-lite-v1:0")
+    parser.add_argument("--stream", action="store_true")
+    parser.add_argument("--http", action="store_true", help="Go through a local HTTP endpoint instead of the in-process fake")
+    parser.add_argument("--endpoint-url", default=None, help="Use an already running fake endpoint, e.g. from fake_runtime.py")
+    parser.add_argument("--latency", type=float, default=0.05, help="Median time to first token in seconds")
+    parser.add_argument("--latency-sigma", type=float, default=0.2)
+    parser.add_argument("--tokens-per-second", type=float, default=1000.0)
+    parser.add_argument("--output-tokens", type=int, default=64)
+    parser.add_argument("--throttle", type=float, default=0.0, help="Probability of a ThrottlingException")
+    args = parser.parse_args()
+
+    config = FakeRuntimeConfig(
+        first_token_latency=LatencyDistribution(args.latency, args.latency_sigma),
+        output_tokens_per_second=args.tokens_per_second,
+        output_tokens=args.output_tokens,
+        throttle_probability=args.throttle
+    )
+    max_pool_connections = max(args.levels)
+    server = None
+    if args.endpoint_url:
+        import boto3
+        runtime = boto3.client(
+            "bedrock-runtime", region_name="us-east-1", endpoint_url=args.endpoint_url,
+            aws_access_key_id="fake", aws_secret_access_key="fake",
+            config=client_config(max_pool_connections=max_pool_connections)
+        )
+    elif args.http:
+        server = FakeRuntimeServer(config).start()
+        runtime = server.client(max_pool_connections=max_pool_connections)
+    else:
+        runtime = FakeBedrockRuntime(config)
+
+    try:
+        client = BedrockClient(client=runtime)
+        results = run_benchmark(
+            client,
+            ModelConfig(args.model_id, max_tokens=args.output_tokens),
+            concurrency_levels=args.levels,
+            requests_per_level=args.requests,
+            stream=args.stream
+        )
+        print(format_results(results))
+    finally:
+        if server is not None:
+            server.stop()
+
+
+if __name__ == "__main__":
+    main()
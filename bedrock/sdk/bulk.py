@@ -0,0 +1,249 @@
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, replace
+from typing import Deque, Dict, Iterator, Optional, Tuple
+import argparse
+import itertools
+import json
+import os
+from bedrock_sdk.bedrock_client import BedrockClient, ModelConfig
+from bedrock_sdk.concurrency import AIMDLimiter
+from bedrock_sdk.providers import get_provider
+
+
+@dataclass
+class BulkStats:
+    """Progress of a bulk run"""
+    skipped: int = 0
+    completed: int = 0
+    failed: int = 0
+
+
+def _read_records(path: str, skip: int) -> Iterator[Tuple[int, Dict]]:
+    """Yield (line number, record) for non-blank lines after the first `skip`"""
+    with open(path, encoding="utf-8") as f:
+        lines = (line for line in f if line.strip())
+        for number, line in enumerate(itertools.islice(lines, skip, None), start=skip):
+            yield number, json.loads(line)
+
+
+def _load_checkpoint(path: str) -> Dict:
+    if not os.path.exists(path):
+        return {"records": 0, "output_bytes": 0}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _resume_point(output_path: str, checkpoint: Dict) -> Tuple[int, int]:
+    """
+    Records done and output bytes to keep, counting complete result lines
+    written after the checkpoint
+
+    Returns:
+        Tuple of (records done, output bytes up to the last complete line)
+    """
+    records, output_bytes = checkpoint["records"], checkpoint["output_bytes"]
+    if not os.path.exists(output_path):
+        return records, 0
+    with open(output_path, "rb") as f:
+        f.seek(output_bytes)
+        for line in f:
+            if not line.endswith(b"\n"):
+                break
+            try:
+                result = json.loads(line)
+            except ValueError:
+                break
+            records, output_bytes = result["line"] + 1, output_bytes + len(line)
+    return records, output_bytes
+
+
+def _save_checkpoint(path: str, records: int, output_bytes: int):
+    """Write the checkpoint atomically so a crash never leaves it half written"""
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"records": records, "output_bytes": output_bytes}, f)
+    os.replace(tmp_path, path)
+
+
+class BulkRunner:
+    """
+    Streams a JSONL file of converse requests through a BedrockClient.
+
+    Each input line is a JSON object:
+
+        {"id": "doc-1", "prompt": "Summarize {{text}}", "variables": {"text": "..."},
+         "model_id": "us.amazon.nova-lite-v1:0", "tags": ["summaries"]}
+
+    Only "prompt" is required; "model_id" overrides the runner's model config.
+    Each output line holds the record's id and line number plus "response" or
+    "error", in input order. At most `window` records are held in memory, so a
+    file of any size runs in constant memory.
+
+    Each result line is flushed as it is written, and progress is checkpointed
+    next to the output. Re-running with the same paths resumes after the last
+    complete line in the output, found by reading on from the checkpoint, so
+    finished records are not paid for twice.
+
+    Example:
+        runner = BulkRunner(BedrockClient(), ModelConfig("us.amazon.nova-lite-v1:0"), max_concurrency=16)
+        stats = runner.run("requests.jsonl", "responses.jsonl")
+    """
+
+    def __init__(
+        self,
+        client: BedrockClient,
+        model_config: ModelConfig,
+        max_concurrency: int = 32,
+        initial_concurrency: int = 4,
+        window: Optional[int] = None,
+        checkpoint_every: int = 100
+    ):
+        """
+        Args:
+            client: Client making the calls; its retry policy, caches and ledger apply
+            model_config: Model configuration for records without a model_id
+            max_concurrency: Upper bound on concurrent calls
+            initial_concurrency: Concurrent calls to start with
+            window: Records in flight or waiting to be written in order; defaults to 4 * max_concurrency
+            checkpoint_every: Records written between checkpoints, which bound how
+                much output a resume has to read
+        """
+        self.client = client
+        self.model_config = model_config
+        self.max_concurrency = max_concurrency
+        self.initial_concurrency = min(initial_concurrency, max_concurrency)
+        self.window = window or 4 * max_concurrency
+        self.checkpoint_every = checkpoint_every
+
+    def _call(self, record: Dict, limiter: AIMDLimiter) -> str:
+        model_config = self.model_config
+        if record.get("model_id"):
+            model_config = replace(model_config, model_id=record["model_id"])
+        return self.client._converse_with_limiter(
+            record["prompt"], model_config, record.get("variables", {}), None, limiter, record.get("tags")
+        )
+
+    def run(self, input_path: str, output_path: str, checkpoint_path: Optional[str] = None) -> BulkStats:
+        """
+        Run every record not yet written to output_path
+
+        Args:
+            input_path: JSONL file of requests
+            output_path: JSONL file of results, appended to when resuming
+            checkpoint_path: Progress file; defaults to output_path + ".checkpoint"
+
+        Returns:
+            BulkStats for this run
+        """
+        checkpoint_path = checkpoint_path or output_path + ".checkpoint"
+        records_done, output_bytes = _resume_point(output_path, _load_checkpoint(checkpoint_path))
+        stats = BulkStats(skipped=records_done)
+        limiter = AIMDLimiter(initial_limit=self.initial_concurrency, max_limit=self.max_concurrency)
+        pending: Deque[Tuple[int, Dict, Future]] = deque()
+        records_written = records_done
+
+        with open(output_path, "ab") as output:
+            # Drop a partly written last line; that record runs again
+            output.truncate(output_bytes)
+            output.seek(output_bytes)
+
+            def write_head():
+                nonlocal records_written
+                number, record, future = pending.popleft()
+                result = {"id": record.get("id"), "line": number}
+                try:
+                    result["response"] = future.result()
+                    stats.completed += 1
+                except Exception as e:
+                    result["error"] = str(e)
+                    stats.failed += 1
+                output.write((json.dumps(result, ensure_ascii=False) + "\n").encode("utf-8"))
+                output.flush()
+                records_written += 1
+                if records_written % self.checkpoint_every == 0:
+                    _save_checkpoint(checkpoint_path, records_written, output.tell())
+
+            with ThreadPoolExecutor(max_workers=self.max_concurrency) as executor:
+                for number, record in _read_records(input_path, records_done):
+                    pending.append((number, record, executor.submit(self._call, record, limiter)))
+                    while pending and (len(pending) >= self.window or pending[0][2].done()):
+                        write_head()
+                while pending:
+                    write_head()
+            output.flush()
+            _save_checkpoint(checkpoint_path, records_written, output.tell())
+        return stats
+
+
+def to_batch_records(
+    client: BedrockClient,
+    input_path: str,
+    output_path: str,
+    model_config: ModelConfig
+) -> int:
+    """
+    Convert a JSONL of converse requests into Bedrock batch inference records
+
+    Each output line is {"recordId": ..., "modelInput": ...} with the model's
+    native request body (messages-style for Claude and Nova), ready to upload
+    to S3 for CreateModelInvocationJob. Records are converted one at a time,
+    so memory stays constant.
+
+    Returns:
+        Number of records written
+
+    Raises:
+        ValueError: If a record's model has no batch body format (see ProviderAdapter.batch_body)
+    """
+    count = 0
+    with open(output_path, "w", encoding="utf-8") as output:
+        for number, record in _read_records(input_path, 0):
+            config = model_config
+            if record.get("model_id"):
+                config = replace(config, model_id=record["model_id"])
+            _, conversation, _ = client._prepare_request(
+                record["prompt"], config, record.get("variables", {}), None, include_history=False
+            )
+            messages = [
+                {"role": msg["role"], "content": "".join(block.get("text", "") for block in msg["content"])}
+                for msg in conversation["messages"]
+            ]
+            body = get_provider(config.model_id).batch_body(conversation["system"], messages, config)
+            body.update(config.additional_model_request_fields)
+            batch_record = {
+                "recordId": str(record.get("id", f"{number:011d}")),
+                "modelInput": body
+            }
+            output.write(json.dumps(batch_record, ensure_ascii=False) + "\n")
+            count += 1
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a JSONL file of converse requests through Bedrock")
+    parser.add_argument("input", help="JSONL file of requests")
+    parser.add_argument("output", help="JSONL file for results, or batch records with --batch-records")
+    parser.add_argument("--model-id", required=True, help="Model for records without a model_id")
+    parser.add_argument("--max-tokens", type=int, default=512)
+    parser.add_argument("--temperature", type=float, default=0.01)
+    parser.add_argument("--max-concurrency", type=int, default=32)
+    parser.add_argument("--region", default="us-east-1")
+    parser.add_argument("--profile", default=None)
+    parser.add_argument("--batch-records", action="store_true",
+                        help="Write CreateModelInvocationJob records instead of calling the model")
+    args = parser.parse_args()
+
+    client = BedrockClient(region_name=args.region, profile_name=args.profile)
+    model_config = ModelConfig(args.model_id, max_tokens=args.max_tokens, temperature=args.temperature)
+    if args.batch_records:
+        count = to_batch_records(client, args.input, args.output, model_config)
+        print(f"Wrote {count} batch records to {args.output}")
+        return
+    stats = BulkRunner(client, model_config, max_concurrency=args.max_concurrency).run(args.input, args.output)
+    print(f"Completed {stats.completed}, failed {stats.failed}, skipped {stats.skipped} already done")
+    print(f"Cost: ${client.ledger.snapshot()['total']['cost']:.4f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,310 @@
+from collections import OrderedDict
+from dataclasses import dataclass, asdict
+from typing import Any, Dict, List, Optional, Tuple
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+
+
+def cache_key(request: Dict[str, Any]) -> str:
+    """
+    Content-addressed key for a converse request
+
+    Args:
+        request: Converse request arguments (modelId, inferenceConfig, system, messages)
+
+    Returns:
+        SHA-256 hex digest of the canonical JSON encoding
+    """
+    canonical = json.dumps(request, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+@dataclass
+class CacheEntry:
+    """A cached model response and what it cost to produce"""
+    value: str
+    created_at: float
+    latency: float = 0.0
+    input_tokens: int = 0
+    output_tokens: int = 0
+
+    def expired(self, ttl: Optional[float]) -> bool:
+        return ttl is not None and time.time() - self.created_at > ttl
+
+
+@dataclass
+class CacheStats:
+    """Hit/miss counters and the latency and tokens saved by hits"""
+    hits: int = 0
+    memory_hits: int = 0
+    disk_hits: int = 0
+    misses: int = 0
+    saved_latency: float = 0.0
+    saved_input_tokens: int = 0
+    saved_output_tokens: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+
+class MemoryCache:
+    """Thread-safe in-memory LRU cache with optional TTL"""
+
+    def __init__(self, max_entries: int = 1024, ttl: Optional[float] = None):
+        """
+        Args:
+            max_entries: Entries kept before the least recently used is evicted
+            ttl: Seconds an entry stays valid, or None for no expiry
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, CacheEntry]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry.expired(self.ttl):
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key: str, entry: CacheEntry):
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class SQLiteCache:
+    """
+    Persistent cache tier stored in a SQLite database.
+
+    Entries expire after `ttl` seconds. When `max_entries` or `max_bytes` is
+    exceeded, the least recently accessed entries are evicted. The entry count
+    and size are tracked by this instance, so set() only touches the rows it
+    evicts instead of scanning the table. Rows written by another process
+    sharing the file are counted the next time the cache is opened.
+    """
+
+    def __init__(
+        self,
+        path: str = "bedrock_cache.sqlite",
+        ttl: Optional[float] = None,
+        max_entries: Optional[int] = 100_000,
+        max_bytes: Optional[int] = None
+    ):
+        """
+        Args:
+            path: Database file path
+            ttl: Seconds an entry stays valid, or None for no expiry
+            max_entries: Maximum number of stored entries
+            max_bytes: Maximum total size of stored responses
+        """
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " key TEXT PRIMARY KEY,"
+            " entry TEXT NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " created_at REAL NOT NULL,"
+            " accessed_at REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed_at)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS responses_created ON responses (created_at)"
+        )
+        self._conn.commit()
+        self._count, self._bytes = self._conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses"
+        ).fetchone()
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT entry, size FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            entry = CacheEntry(**json.loads(row[0]))
+            if entry.expired(self.ttl):
+                self._delete([(key, row[1])])
+            else:
+                self._conn.execute(
+                    "UPDATE responses SET accessed_at = ? WHERE key = ?", (time.time(), key)
+                )
+            self._conn.commit()
+            return None if entry.expired(self.ttl) else entry
+
+    def set(self, key: str, entry: CacheEntry):
+        payload = json.dumps(asdict(entry))
+        with self._lock:
+            old = self._conn.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?)",
+                (key, payload, len(payload), entry.created_at, time.time())
+            )
+            if old is None:
+                self._count += 1
+                self._bytes += len(payload)
+            else:
+                self._bytes += len(payload) - old[0]
+            self._evict()
+            self._conn.commit()
+
+    def _delete(self, rows: List[Tuple[str, int]]):
+        """Delete (key, size) rows and update the tracked count and size"""
+        self._conn.executemany("DELETE FROM responses WHERE key = ?", [(key,) for key, _ in rows])
+        self._count -= len(rows)
+        self._bytes -= sum(size for _, size in rows)
+
+    def _evict(self):
+        """Drop expired entries, then least recently accessed ones over the size limits"""
+        # Every query walks an index and stops at the rows it removes
+        if self.ttl is not None:
+            self._delete(self._conn.execute(
+                "SELECT key, size FROM responses WHERE created_at < ?", (time.time() - self.ttl,)
+            ).fetchall())
+        if self.max_entries is not None and self._count > self.max_entries:
+            self._delete(self._conn.execute(
+                "SELECT key, size FROM responses ORDER BY accessed_at LIMIT ?",
+                (self._count - self.max_entries,)
+            ).fetchall())
+        if self.max_bytes is not None and self._bytes > self.max_bytes:
+            rows = self._conn.execute("SELECT key, size FROM responses ORDER BY accessed_at")
+            total, stale = self._bytes, []
+            for key, size in rows:
+                if total <= self.max_bytes:
+                    break
+                stale.append((key, size))
+                total -= size
+            self._delete(stale)
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+            self._conn.commit()
+            self._count = self._bytes = 0
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+
+class ResponseCache:
+    """
+    Two-tier response cache for BedrockClient.converse.
+
+    Lookups check the in-memory LRU first, then the optional on-disk tier;
+    disk hits are promoted into memory.
+
+    Example:
+        cache = ResponseCache(disk=SQLiteCache("responses.sqlite", ttl=86400))
+        client = BedrockClient(response_cache=cache)
+        ...
+        print(cache.stats.hit_rate, cache.stats.saved_latency)
+    """
+
+    def __init__(
+        self,
+        memory: Optional[MemoryCache] = None,
+        disk: Optional[SQLiteCache] = None
+    ):
+        """
+        Args:
+            memory: In-memory tier; a default MemoryCache is used if not given
+            disk: Optional persistent tier
+        """
+        self.memory = memory if memory is not None else MemoryCache()
+        self.disk = disk
+        self.stats = CacheStats()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[str]:
+        """Get a cached response, recording the hit or miss"""
+        entry = self.memory.get(key)
+        tier = "memory"
+        if entry is None and self.disk is not None:
+            entry = self.disk.get(key)
+            tier = "disk"
+            if entry is not None:
+                self.memory.set(key, entry)
+        with self._lock:
+            if entry is None:
+                self.stats.misses += 1
+                return None
+            self.stats.hits += 1
+            if tier == "memory":
+                self.stats.memory_hits += 1
+            else:
+                self.stats.disk_hits += 1
+            self.stats.saved_latency += entry.latency
+            self.stats.saved_input_tokens += entry.input_tokens
+            self.stats.saved_output_tokens += entry.output_tokens
+        return entry.value
+
+    def set(
+        self,
+        key: str,
+        value: str,
+        latency: float = 0.0,
+        usage: Optional[Dict[str, int]] = None
+    ):
+        """
+        Store a response
+
+        Args:
+            key: Key from cache_key()
+            value: Response text
+            latency: Seconds the model call took
+            usage: Converse usage block with inputTokens/outputTokens
+        """
+        usage = usage or {}
+        entry = CacheEntry(
+            value=value,
+            created_at=time.time(),
+            latency=latency,
+            input_tokens=usage.get("inputTokens", 0),
+            output_tokens=usage.get("outputTokens", 0)
+        )
+        self.memory.set(key, entry)
+        if self.disk is not None:
+            self.disk.set(key, entry)
+
+    def reset_stats(self):
+        with self._lock:
+            self.stats = CacheStats()
+
+    def clear(self):
+        """Remove all entries from every tier"""
+        self.memory.clear()
+        if self.disk is not None:
+            self.disk.clear()
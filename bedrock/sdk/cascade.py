@@ -0,0 +1,184 @@
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Callable, Dict, List, Optional
+import json
+import threading
+from bedrock_sdk.ledger import TokenLedger
+from bedrock_sdk.metrics import LatencyHistogram
+
+if TYPE_CHECKING:
+    from bedrock_sdk.bedrock_client import ModelConfig
+
+Validator = Callable[[str], bool]
+
+
+def require_tags(*tags: str) -> Validator:
+    """Validator accepting responses that contain every <tag>...</tag> pair"""
+    def validate(response: str) -> bool:
+        return all(f"<{tag}>" in response and f"</{tag}>" in response for tag in tags)
+    return validate
+
+
+def valid_json(response: str) -> bool:
+    """Validator accepting responses that parse as JSON"""
+    try:
+        json.loads(response)
+        return True
+    except ValueError:
+        return False
+
+
+@dataclass
+class CascadeAttempt:
+    """One tier's call within a cascaded request"""
+    model_id: str
+    latency: float
+    usage: Dict[str, int]
+    accepted: bool
+    error: Optional[str] = None
+
+
+@dataclass
+class CascadeStats:
+    """
+    Escalation and savings counters for a ModelCascade.
+
+    Savings compare against sending every request straight to the last tier:
+    cost uses the last tier's price for the tokens of the answered request, and
+    latency uses the last tier's mean observed latency. The latency baseline is
+    unknown until the last tier has answered at least once, so latency_saved is
+    None until then; requests recorded before that are counted as soon as it has.
+    """
+    requests: int = 0
+    escalations: int = 0
+    final_rejections: int = 0
+    served_by: Dict[str, int] = field(default_factory=dict)
+    cost: float = 0.0
+    baseline_cost: float = 0.0
+    latency: float = 0.0
+    baseline_latency: float = 0.0
+    unbaselined_requests: int = 0
+    unbaselined_latency: float = 0.0
+
+    @property
+    def escalation_rate(self) -> float:
+        return self.escalations / self.requests if self.requests else 0.0
+
+    @property
+    def cost_saved(self) -> float:
+        return self.baseline_cost - self.cost
+
+    @property
+    def latency_saved(self) -> Optional[float]:
+        """Seconds saved against the last tier, or None until it has latency samples"""
+        if self.unbaselined_requests:
+            return None
+        return self.baseline_latency - self.latency
+
+
+class ModelCascade:
+    """
+    Models tried cheapest first, escalating when a validator rejects the answer.
+
+    Only the accepted answer (or the last tier's answer, if every tier is
+    rejected) is added to conversation history.
+
+    Example:
+        cascade = ModelCascade(
+            [ModelConfig("us.amazon.nova-micro-v1:0"), ModelConfig("us.anthropic.claude-3-5-haiku-20241022-v1:0")],
+            validator=require_tags("markdown")
+        )
+        response = client.converse_cascade(prompt, cascade)
+        print(cascade.stats.escalation_rate, cascade.stats.cost_saved)
+    """
+
+    def __init__(self, tiers: List["ModelConfig"], validator: Validator, escalate_on_error: bool = True):
+        """
+        Args:
+            tiers: Model configs in the order they are tried, cheapest first
+            validator: Returns True when a response is good enough to keep
+            escalate_on_error: Escalate when a tier's call fails instead of raising
+        """
+        if not tiers:
+            raise ValueError("ModelCascade needs at least one tier")
+        self.tiers = list(tiers)
+        self.validator = validator
+        self.escalate_on_error = escalate_on_error
+        self.stats = CascadeStats()
+        self._latencies: Dict[str, LatencyHistogram] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def by_price(
+        cls,
+        tiers: List["ModelConfig"],
+        validator: Validator,
+        ledger: Optional[TokenLedger] = None,
+        **kwargs
+    ) -> "ModelCascade":
+        """Cascade ordered by the ledger's input plus output price; unpriced models go last"""
+        ledger = ledger or TokenLedger()
+        def price(config: "ModelConfig") -> float:
+            model_price = ledger.price_for(config.model_id)
+            if model_price is None:
+                return float("inf")
+            return model_price.input_per_1k + model_price.output_per_1k
+        return cls(sorted(tiers, key=price), validator, **kwargs)
+
+    def accepts(self, response: str) -> bool:
+        """Run the validator, treating an exception as a rejection"""
+        try:
+            return bool(self.validator(response))
+        except Exception as e:
+            print(f"Cascade validator failed: {e}")
+            return False
+
+    def record(self, attempts: List[CascadeAttempt], ledger: TokenLedger):
+        """Update the stats with the tier calls made for one request"""
+        final = self.tiers[-1].model_id
+        served = attempts[-1]
+        with self._lock:
+            stats = self.stats
+            stats.requests += 1
+            if len(attempts) > 1:
+                stats.escalations += 1
+            if not served.accepted:
+                stats.final_rejections += 1
+            stats.served_by[served.model_id] = stats.served_by.get(served.model_id, 0) + 1
+
+            for attempt in attempts:
+                if attempt.error is None:
+                    histogram = self._latencies.get(attempt.model_id)
+                    if histogram is None:
+                        histogram = self._latencies[attempt.model_id] = LatencyHistogram()
+                    histogram.record(attempt.latency)
+
+            cost = sum(_attempt_cost(attempt, attempt.model_id, ledger) or 0.0 for attempt in attempts)
+            baseline_cost = _attempt_cost(served, final, ledger)
+            if baseline_cost is not None:
+                stats.cost += cost
+                stats.baseline_cost += baseline_cost
+            stats.unbaselined_requests += 1
+            stats.unbaselined_latency += sum(attempt.latency for attempt in attempts)
+            final_latency = self._latencies.get(final)
+            if final_latency is not None and final_latency.count:
+                # Also credits requests recorded before the last tier had samples
+                stats.latency += stats.unbaselined_latency
+                stats.baseline_latency += stats.unbaselined_requests * final_latency.mean
+                stats.unbaselined_requests = 0
+                stats.unbaselined_latency = 0.0
+
+    def reset(self):
+        with self._lock:
+            self.stats = CascadeStats()
+            self._latencies = {}
+
+
+def _attempt_cost(attempt: CascadeAttempt, model_id: str, ledger: TokenLedger) -> Optional[float]:
+    usage = attempt.usage
+    return ledger.cost(
+        model_id,
+        usage.get("inputTokens", 0),
+        usage.get("outputTokens", 0),
+        usage.get("cacheReadInputTokens", 0),
+        usage.get("cacheWriteInputTokens", 0)
+    )
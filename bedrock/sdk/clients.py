@@ -0,0 +1,77 @@
+from typing import Any, Dict, Optional, Tuple
+import threading
+import boto3
+from botocore.config import Config
+
+DEFAULT_MAX_POOL_CONNECTIONS = 50
+DEFAULT_CONNECT_TIMEOUT = 10.0
+DEFAULT_READ_TIMEOUT = 300.0
+
+_clients: Dict[Tuple, Any] = {}
+_clients_lock = threading.Lock()
+
+
+def client_config(
+    max_pool_connections: int = DEFAULT_MAX_POOL_CONNECTIONS,
+    connect_timeout: float = DEFAULT_CONNECT_TIMEOUT,
+    read_timeout: float = DEFAULT_READ_TIMEOUT,
+    tcp_keepalive: bool = True,
+    config_class: type = Config
+) -> Config:
+    """
+    botocore Config tuned for Bedrock runtime calls
+
+    Retries are left to RetryPolicy, so botocore makes a single attempt per call
+    instead of multiplying retries underneath it.
+
+    Args:
+        max_pool_connections: Size of the HTTP connection pool
+        connect_timeout: Seconds to wait for a connection
+        read_timeout: Seconds to wait for response data; long generations need more than botocore's 60
+        tcp_keepalive: Enable TCP keepalive on pooled connections
+        config_class: Config class to build, e.g. aiobotocore's AioConfig
+    """
+    return config_class(
+        max_pool_connections=max_pool_connections,
+        connect_timeout=connect_timeout,
+        read_timeout=read_timeout,
+        tcp_keepalive=tcp_keepalive,
+        retries={"mode": "standard", "total_max_attempts": 1}
+    )
+
+
+def get_shared_client(
+    region_name: str = "us-east-1",
+    profile_name: Optional[str] = None,
+    service_name: str = "bedrock-runtime",
+    max_pool_connections: int = DEFAULT_MAX_POOL_CONNECTIONS,
+    connect_timeout: float = DEFAULT_CONNECT_TIMEOUT,
+    read_timeout: float = DEFAULT_READ_TIMEOUT,
+    tcp_keepalive: bool = True
+):
+    """
+    Process-wide client for a (profile, region), created on first use
+
+    boto3 clients are thread-safe, so every BedrockClient for the same profile,
+    region and pool settings shares one client and its warm connection pool.
+    """
+    key = (service_name, profile_name, region_name, max_pool_connections, connect_timeout, read_timeout, tcp_keepalive)
+    client = _clients.get(key)
+    if client is not None:
+        return client
+    with _clients_lock:
+        if key not in _clients:
+            # boto3 sessions are not thread-safe, so each client gets its own under the lock
+            session = boto3.Session(profile_name=profile_name)
+            _clients[key] = session.client(
+                service_name,
+                region_name=region_name,
+                config=client_config(max_pool_connections, connect_timeout, read_timeout, tcp_keepalive)
+            )
+        return _clients[key]
+
+
+def clear_shared_clients():
+    """Drop all cached clients, e.g. after credentials change"""
+    with _clients_lock:
+        _clients.clear()
@@ -0,0 +1,118 @@
+import asyncio
+import threading
+
+
+class AIMDLimiter:
+    """
+    Adaptive concurrency limit using additive-increase / multiplicative-decrease.
+
+    The limit grows by roughly one slot per window of successful calls and is
+    cut by `decrease_factor` when a ThrottlingException is seen, so in-flight
+    requests settle just under the account's real throughput ceiling.
+
+    acquire() returns a token identifying the limit epoch the call started in.
+    Throttles from calls started before the most recent cut don't cut again, so
+    one burst of throttling shrinks the limit once rather than once per call.
+
+    Attributes:
+        limit (float): Current concurrency limit
+        successes (int): Number of successful calls recorded
+        throttles (int): Number of throttled calls recorded
+    """
+
+    def __init__(
+        self,
+        initial_limit: int = 4,
+        min_limit: int = 1,
+        max_limit: int = 32,
+        increase: float = 1.0,
+        decrease_factor: float = 0.5
+    ):
+        """
+        Args:
+            initial_limit: Starting number of concurrent calls
+            min_limit: Lowest the limit can be cut to
+            max_limit: Highest the limit can grow to
+            increase: Slots added per window of `limit` successful calls
+            decrease_factor: Multiplier applied to the limit on throttling
+        """
+        if not 1 <= min_limit <= initial_limit <= max_limit:
+            raise ValueError("Limits must satisfy 1 <= min_limit <= initial_limit <= max_limit")
+        if not 0 < decrease_factor < 1:
+            raise ValueError("decrease_factor must be between 0 and 1")
+        self.limit = float(initial_limit)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.increase = increase
+        self.decrease_factor = decrease_factor
+        self.successes = 0
+        self.throttles = 0
+        self.in_flight = 0
+        self._epoch = 0
+        self._condition = threading.Condition()
+
+    def _on_success(self):
+        self.successes += 1
+        self.limit = min(self.max_limit, self.limit + self.increase / self.limit)
+
+    def _on_throttle(self, token: int):
+        self.throttles += 1
+        if token == self._epoch:
+            self.limit = max(self.min_limit, self.limit * self.decrease_factor)
+            self._epoch += 1
+
+    def _has_capacity(self) -> bool:
+        return self.in_flight < int(self.limit)
+
+    def _release(self, token: int, throttled: bool, success: bool):
+        self.in_flight -= 1
+        if throttled:
+            self._on_throttle(token)
+        elif success:
+            self._on_success()
+
+    def acquire(self) -> int:
+        """
+        Block until a slot is available under the current limit
+
+        Returns:
+            Token to pass back to release()
+        """
+        with self._condition:
+            self._condition.wait_for(self._has_capacity)
+            self.in_flight += 1
+            return self._epoch
+
+    def release(self, token: int, throttled: bool = False, success: bool = True):
+        """
+        Release a slot and update the limit
+
+        Args:
+            token: Token returned by acquire()
+            throttled: The call was rejected with a ThrottlingException
+            success: The call completed; ignored when throttled is True
+        """
+        with self._condition:
+            self._release(token, throttled, success)
+            self._condition.notify_all()
+
+
+class AsyncAIMDLimiter(AIMDLimiter):
+    """AIMDLimiter for use from coroutines on a single event loop"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._async_condition = asyncio.Condition()
+
+    async def acquire(self) -> int:
+        """Wait until a slot is available under the current limit"""
+        async with self._async_condition:
+            await self._async_condition.wait_for(self._has_capacity)
+            self.in_flight += 1
+            return self._epoch
+
+    async def release(self, token: int, throttled: bool = False, success: bool = True):
+        """Release a slot and update the limit"""
+        async with self._async_condition:
+            self._release(token, throttled, success)
+            self._async_condition.notify_all()
@@ -0,0 +1,137 @@
+from typing import AsyncIterator, Dict, Iterable, Iterator, List, Optional, Tuple
+
+
+class _TagState:
+    """Search progress for one wanted tag"""
+
+    def __init__(self, tag: str):
+        self.tag = tag
+        self.open_tag = f"<{tag}>"
+        self.close_tag = f"</{tag}>"
+        self.search_from = 0
+        self.content_start: Optional[int] = None
+
+
+class TagExtractor:
+    """
+    Pulls tagged sections such as <markdown>...</markdown> out of streamed text.
+
+    Text is fed in as it arrives and each section is returned as soon as its
+    closing tag is seen, even when a tag is split across chunks. Only the first
+    occurrence of each tag is extracted. Tags may be nested, e.g. both
+    "summary_polly" and "speak" in <summary_polly><speak>...</speak></summary_polly>.
+
+    Example:
+        response = client.converse(prompt, config, stream=True)
+        for tag, content in TagExtractor(["markdown"]).extract(response):
+            print(content)  # the stream is closed once </markdown> arrives
+    """
+
+    def __init__(self, tags: List[str]):
+        """
+        Args:
+            tags: Tag names to extract, without angle brackets
+        """
+        self.tags = list(tags)
+        self.sections: Dict[str, str] = {}
+        self._pending = [_TagState(tag) for tag in self.tags]
+        self._chunks: List[str] = []
+        self._length = 0
+        # Enough trailing text to find a tag split across chunks
+        self._tail = ""
+        self._tail_size = max((len(state.close_tag) - 1 for state in self._pending), default=0)
+
+    @property
+    def done(self) -> bool:
+        """Every wanted section has been extracted"""
+        return not self._pending
+
+    @property
+    def text(self) -> str:
+        """All text fed so far"""
+        if len(self._chunks) > 1:
+            self._chunks = ["".join(self._chunks)]
+        return self._chunks[0] if self._chunks else ""
+
+    def feed(self, chunk: str) -> List[Tuple[str, str]]:
+        """
+        Add streamed text
+
+        Only the new chunk and the few characters before it are searched, so
+        a long stream is scanned once.
+
+        Returns:
+            (tag, content) pairs for sections completed by this chunk, in the order they closed
+        """
+        # Positions are offsets into all text fed so far; window starts at window_start
+        window_start = self._length - len(self._tail)
+        window = self._tail + chunk
+        self._chunks.append(chunk)
+        self._length += len(chunk)
+        self._tail = window[-self._tail_size:] if self._tail_size else ""
+        length = self._length
+        completed = []
+        for state in list(self._pending):
+            if state.content_start is None:
+                start = window.find(state.open_tag, max(0, state.search_from - window_start))
+                if start < 0:
+                    # A partial opening tag may be completed by the next chunk
+                    state.search_from = max(0, length - len(state.open_tag) + 1)
+                    continue
+                state.content_start = state.search_from = window_start + start + len(state.open_tag)
+            end = window.find(state.close_tag, max(0, state.search_from - window_start))
+            if end < 0:
+                state.search_from = max(state.content_start, length - len(state.close_tag) + 1)
+                continue
+            end += window_start
+            content = self.text[state.content_start:end]
+            self.sections[state.tag] = content
+            self._pending.remove(state)
+            completed.append((end, state.tag, content))
+        return [(tag, content) for _, tag, content in sorted(completed)]
+
+    def extract(self, chunks: Iterable[str], stop: bool = True) -> Iterator[Tuple[str, str]]:
+        """
+        Feed a chunk iterator, yielding (tag, content) as each section closes
+
+        Args:
+            chunks: Text chunks, e.g. a StreamResponse
+            stop: Close the stream once every wanted section has been extracted,
+                so no more output tokens are generated
+        """
+        for chunk in chunks:
+            yield from self.feed(chunk)
+            if stop and self.done:
+                close = getattr(chunks, "close", None)
+                if close is not None:
+                    close()
+                return
+
+    async def aextract(self, chunks: AsyncIterator[str], stop: bool = True) -> AsyncIterator[Tuple[str, str]]:
+        """Async counterpart of extract() for an AsyncStreamResponse"""
+        async for chunk in chunks:
+            for section in self.feed(chunk):
+                yield section
+            if stop and self.done:
+                close = getattr(chunks, "aclose", None)
+                if close is not None:
+                    await close()
+                return
+
+
+def extract_tags(chunks: Iterable[str], tags: List[str], stop: bool = True) -> Dict[str, str]:
+    """
+    Consume a stream (or a list with one complete response) and return the wanted sections
+
+    Args:
+        chunks: Text chunks or [text]
+        tags: Tag names to extract
+        stop: Close the stream once every section has been extracted
+
+    Returns:
+        Dict of tag to content for the tags that were found
+    """
+    extractor = TagExtractor(tags)
+    for _ in extractor.extract(chunks, stop=stop):
+        pass
+    return extractor.sections
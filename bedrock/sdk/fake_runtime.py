@@ -0,0 +1,422 @@
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+from urllib.parse import unquote
+import argparse
+import base64
+import io
+import json
+import math
+import random
+import struct
+import threading
+import time
+import zlib
+from botocore.exceptions import ClientError
+from bedrock_sdk.clients import client_config
+from bedrock_sdk.providers import get_provider
+from bedrock_sdk.tokens import estimate_tokens
+
+_WORDS = (
+    "the model answers every request with plausible filler text so that "
+    "latency token counts and streaming behave like a real endpoint"
+).split()
+
+
+@dataclass
+class LatencyDistribution:
+    """Lognormal latency in seconds; sigma=0 gives a fixed latency"""
+    median: float = 0.3
+    sigma: float = 0.3
+
+    def sample(self, rng: random.Random) -> float:
+        if not self.sigma:
+            return self.median
+        return self.median * math.exp(rng.gauss(0.0, self.sigma))
+
+
+@dataclass
+class FakeRuntimeConfig:
+    """
+    Behaviour of a FakeBedrockRuntime
+
+    Attributes:
+        first_token_latency: Time to the first output token
+        output_tokens_per_second: Generation speed after the first token
+        output_tokens: Tokens generated per response, capped by the request's max tokens
+        throttle_probability: Chance a call is rejected with a ThrottlingException
+        chunk_tokens: Output tokens per streamed chunk
+        seed: Seed for reproducible latencies and throttles
+    """
+    first_token_latency: LatencyDistribution = field(default_factory=LatencyDistribution)
+    output_tokens_per_second: float = 100.0
+    output_tokens: int = 64
+    throttle_probability: float = 0.0
+    chunk_tokens: int = 4
+    seed: Optional[int] = None
+
+
+@dataclass
+class FakeRuntimeStats:
+    """Calls served by a FakeBedrockRuntime"""
+    requests: int = 0
+    throttled: int = 0
+    input_tokens: int = 0
+    output_tokens: int = 0
+
+
+# invoke_model response bodies and stream chunks by provider name
+_INVOKE_BODIES: Dict[str, Callable[[str], Dict]] = {
+    "amazon": lambda text: {"results": [{"outputText": text}]},
+    "amazon.nova": lambda text: {"results": [{"outputText": text}]},
+    "meta": lambda text: {"generation": text},
+    "mistral": lambda text: {"outputs": [{"text": text}]},
+    "anthropic": lambda text: {"completion": text},
+    "ai21": lambda text: {"completions": [{"data": {"text": text}}]},
+    "cohere": lambda text: {"generations": [{"text": text}]},
+}
+_STREAM_CHUNKS: Dict[str, Callable[[str], Dict]] = {
+    **_INVOKE_BODIES,
+    "amazon": lambda text: {"outputText": text},
+    "amazon.nova": lambda text: {"outputText": text},
+}
+
+
+class FakeBedrockRuntime:
+    """
+    In-process stand-in for a boto3 bedrock-runtime client.
+
+    Implements converse, converse_stream, invoke_model and
+    invoke_model_with_response_stream with the response shapes botocore
+    returns, so BedrockClient can be load-tested without spending tokens.
+    Each call sleeps for a sampled time-to-first-token plus the time to
+    generate its output at `output_tokens_per_second`; streams deliver
+    chunks at that rate. Calls are throttled at random with
+    `throttle_probability`.
+
+    Example:
+        client = BedrockClient(client=FakeBedrockRuntime(FakeRuntimeConfig(throttle_probability=0.05)))
+    """
+
+    def __init__(self, config: Optional[FakeRuntimeConfig] = None):
+        """
+        Args:
+            config: Latency, token rate and throttling settings
+        """
+        self.config = config or FakeRuntimeConfig()
+        self.stats = FakeRuntimeStats()
+        self._rng = random.Random(self.config.seed)
+        self._lock = threading.Lock()
+
+    def _start(self, operation: str, input_tokens: int, max_tokens: Optional[int]) -> Tuple[float, int]:
+        """Count the call, maybe throttle it, and sample its (first-token latency, output tokens)"""
+        config = self.config
+        with self._lock:
+            self.stats.requests += 1
+            if self._rng.random() < config.throttle_probability:
+                self.stats.throttled += 1
+                raise ClientError(
+                    {
+                        "Error": {"Code": "ThrottlingException", "Message": "Too many requests, please wait before trying again."},
+                        "ResponseMetadata": {"HTTPStatusCode": 429}
+                    },
+                    operation
+                )
+            latency = config.first_token_latency.sample(self._rng)
+            output_tokens = min(config.output_tokens, max_tokens or config.output_tokens)
+            self.stats.input_tokens += input_tokens
+            self.stats.output_tokens += output_tokens
+        return latency, output_tokens
+
+    def _generation_time(self, tokens: int) -> float:
+        return tokens / self.config.output_tokens_per_second if self.config.output_tokens_per_second else 0.0
+
+    def _text(self, tokens: int) -> str:
+        return " ".join(_WORDS[i % len(_WORDS)] for i in range(tokens))
+
+    def _chunks(self, tokens: int) -> List[str]:
+        """Output text split into chunks of chunk_tokens tokens"""
+        words = self._text(tokens).split(" ")
+        size = max(1, self.config.chunk_tokens)
+        return [
+            (" " if start else "") + " ".join(words[start:start + size])
+            for start in range(0, len(words), size)
+        ]
+
+    def _converse_input_tokens(self, kwargs: Dict) -> int:
+        text = "".join(block.get("text", "") for block in kwargs.get("system", []))
+        for message in kwargs.get("messages", []):
+            text += "".join(block.get("text", "") for block in message.get("content", []))
+        return estimate_tokens(text)
+
+    def _invoke_request(self, kwargs: Dict) -> Tuple[Dict, int, Optional[int]]:
+        """Decode an invoke_model body into (body, input tokens, max tokens)"""
+        body = json.loads(kwargs["body"])
+        prompt = body.get("prompt") or body.get("inputText") or ""
+        max_tokens = (
+            body.get("max_tokens") or body.get("max_tokens_to_sample") or body.get("max_gen_len")
+            or body.get("maxTokens") or body.get("textGenerationConfig", {}).get("maxTokenCount")
+        )
+        return body, estimate_tokens(prompt), max_tokens
+
+    def _usage(self, input_tokens: int, output_tokens: int) -> Dict[str, int]:
+        return {"inputTokens": input_tokens, "outputTokens": output_tokens, "totalTokens": input_tokens + output_tokens}
+
+    def _stop_reason(self, output_tokens: int) -> str:
+        return "max_tokens" if output_tokens < self.config.output_tokens else "end_turn"
+
+    def converse(self, **kwargs) -> Dict:
+        input_tokens = self._converse_input_tokens(kwargs)
+        max_tokens = kwargs.get("inferenceConfig", {}).get("maxTokens")
+        latency, output_tokens = self._start("Converse", input_tokens, max_tokens)
+        latency += self._generation_time(output_tokens)
+        time.sleep(latency)
+        return {
+            "output": {"message": {"role": "assistant", "content": [{"text": self._text(output_tokens)}]}},
+            "stopReason": self._stop_reason(output_tokens),
+            "usage": self._usage(input_tokens, output_tokens),
+            "metrics": {"latencyMs": int(latency * 1000)},
+            "ResponseMetadata": {"HTTPStatusCode": 200, "HTTPHeaders": {}}
+        }
+
+    def converse_stream(self, **kwargs) -> Dict:
+        input_tokens = self._converse_input_tokens(kwargs)
+        max_tokens = kwargs.get("inferenceConfig", {}).get("maxTokens")
+        latency, output_tokens = self._start("ConverseStream", input_tokens, max_tokens)
+        return {
+            "stream": self._converse_events(latency, input_tokens, output_tokens),
+            "ResponseMetadata": {"HTTPStatusCode": 200, "HTTPHeaders": {}}
+        }
+
+    def _converse_events(self, latency: float, input_tokens: int, output_tokens: int) -> Iterator[Dict]:
+        started = time.time()
+        time.sleep(latency)
+        yield {"messageStart": {"role": "assistant"}}
+        chunks = self._chunks(output_tokens)
+        for i, text in enumerate(chunks):
+            if i:
+                time.sleep(self._generation_time(self.config.chunk_tokens))
+            yield {"contentBlockDelta": {"delta": {"text": text}, "contentBlockIndex": 0}}
+        yield {"contentBlockStop": {"contentBlockIndex": 0}}
+        yield {"messageStop": {"stopReason": self._stop_reason(output_tokens)}}
+        yield {"metadata": {
+            "usage": self._usage(input_tokens, output_tokens),
+            "metrics": {"latencyMs": int((time.time() - started) * 1000)}
+        }}
+
+    def invoke_model(self, **kwargs) -> Dict:
+        _, input_tokens, max_tokens = self._invoke_request(kwargs)
+        latency, output_tokens = self._start("InvokeModel", input_tokens, max_tokens)
+        latency += self._generation_time(output_tokens)
+        time.sleep(latency)
+        provider = get_provider(kwargs["modelId"]).name
+        body = _INVOKE_BODIES.get(provider, _INVOKE_BODIES["amazon"])(self._text(output_tokens))
+        return {
+            "body": io.BytesIO(json.dumps(body).encode("utf-8")),
+            "contentType": "application/json",
+            "ResponseMetadata": {"HTTPStatusCode": 200, "HTTPHeaders": {
+                "x-amzn-bedrock-input-token-count": str(input_tokens),
+                "x-amzn-bedrock-output-token-count": str(output_tokens),
+                "x-amzn-bedrock-invocation-latency": str(int(latency * 1000))
+            }}
+        }
+
+    def invoke_model_with_response_stream(self, **kwargs) -> Dict:
+        _, input_tokens, max_tokens = self._invoke_request(kwargs)
+        latency, output_tokens = self._start("InvokeModelWithResponseStream", input_tokens, max_tokens)
+        provider = get_provider(kwargs["modelId"]).name
+        return {
+            "body": self._invoke_events(provider, latency, input_tokens, output_tokens),
+            "contentType": "application/json",
+            "ResponseMetadata": {"HTTPStatusCode": 200, "HTTPHeaders": {}}
+        }
+
+    def _invoke_events(self, provider: str, latency: float, input_tokens: int, output_tokens: int) -> Iterator[Dict]:
+        started = time.time()
+        build_chunk = _STREAM_CHUNKS.get(provider, _STREAM_CHUNKS["amazon"])
+        time.sleep(latency)
+        chunks = self._chunks(output_tokens)
+        for i, text in enumerate(chunks):
+            if i:
+                time.sleep(self._generation_time(self.config.chunk_tokens))
+            chunk = build_chunk(text)
+            if i == len(chunks) - 1:
+                chunk["amazon-bedrock-invocationMetrics"] = {
+                    "inputTokenCount": input_tokens,
+                    "outputTokenCount": output_tokens,
+                    "invocationLatency": int((time.time() - started) * 1000),
+                    "firstByteLatency": int(latency * 1000)
+                }
+            yield {"chunk": {"bytes": json.dumps(chunk).encode("utf-8")}}
+
+
+def _encode_event(event_type: str, payload: Dict) -> bytes:
+    """Encode one message in the AWS event stream binary format"""
+    headers = b""
+    for name, value in ((":event-type", event_type), (":content-type", "application/json"), (":message-type", "event")):
+        name_bytes, value_bytes = name.encode("utf-8"), value.encode("utf-8")
+        headers += struct.pack("!B", len(name_bytes)) + name_bytes + b"\x07" + struct.pack("!H", len(value_bytes)) + value_bytes
+    body = json.dumps(payload).encode("utf-8")
+    prelude = struct.pack("!II", 16 + len(headers) + len(body), len(headers))
+    message = prelude + struct.pack("!I", zlib.crc32(prelude)) + headers + body
+    return message + struct.pack("!I", zlib.crc32(message))
+
+
+class _FakeRuntimeHandler(BaseHTTPRequestHandler):
+    """Serves the bedrock-runtime REST API from the server's FakeBedrockRuntime"""
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        runtime: FakeBedrockRuntime = self.server.runtime
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        parts = self.path.split("?")[0].strip("/").split("/")
+        if len(parts) != 3 or parts[0] != "model":
+            return self._send_error(404, "UnknownOperationException", f"Unknown path {self.path}")
+        model_id, operation = unquote(parts[1]), parts[2]
+        try:
+            if operation == "converse":
+                response = runtime.converse(modelId=model_id, **json.loads(body))
+                response.pop("ResponseMetadata")
+                self._send(200, json.dumps(response).encode("utf-8"))
+            elif operation == "converse-stream":
+                response = runtime.converse_stream(modelId=model_id, **json.loads(body))
+                self._send_events(
+                    _encode_event(event_type, payload)
+                    for event in response["stream"] for event_type, payload in event.items()
+                )
+            elif operation == "invoke":
+                response = runtime.invoke_model(modelId=model_id, body=body)
+                headers = response["ResponseMetadata"]["HTTPHeaders"]
+                self._send(200, response["body"].read(), headers)
+            elif operation == "invoke-with-response-stream":
+                response = runtime.invoke_model_with_response_stream(modelId=model_id, body=body)
+                self._send_events(
+                    _encode_event("chunk", {"bytes": base64.b64encode(event["chunk"]["bytes"]).decode("ascii")})
+                    for event in response["body"]
+                )
+            else:
+                self._send_error(404, "UnknownOperationException", f"Unknown operation {operation}")
+        except ClientError as e:
+            error = e.response["Error"]
+            self._send_error(e.response["ResponseMetadata"]["HTTPStatusCode"], error["Code"], error["Message"])
+
+    def _send(self, status: int, body: bytes, headers: Optional[Dict[str, str]] = None):
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_error(self, status: int, code: str, message: str):
+        self._send(status, json.dumps({"message": message}).encode("utf-8"), {"x-amzn-ErrorType": code})
+
+    def _send_events(self, messages: Iterator[bytes]):
+        self.send_response(200)
+        self.send_header("Content-Type", "application/vnd.amazon.eventstream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for message in messages:
+            self.wfile.write(b"%x\r\n%s\r\n" % (len(message), message))
+            self.wfile.flush()
+        self.wfile.write(b"0\r\n\r\n")
+
+
+class FakeRuntimeServer:
+    """
+    Serves a FakeBedrockRuntime as a local bedrock-runtime HTTP endpoint.
+
+    Unlike the in-process fake, requests go through botocore's serialization,
+    signing, connection pool and event stream parsing, so their cost shows up
+    in benchmarks. Any bedrock-runtime client pointed at `endpoint_url` works,
+    including aiobotocore clients for AsyncBedrockClient.
+
+    Example:
+        with FakeRuntimeServer(FakeRuntimeConfig(output_tokens_per_second=50)) as server:
+            client = BedrockClient(client=server.client())
+    """
+
+    def __init__(
+        self,
+        config: Optional[FakeRuntimeConfig] = None,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        runtime: Optional[FakeBedrockRuntime] = None
+    ):
+        """
+        Args:
+            config: Settings for a new FakeBedrockRuntime
+            host: Interface to listen on
+            port: Port to listen on; 0 picks a free port
+            runtime: Existing fake to serve instead of creating one
+        """
+        self.runtime = runtime or FakeBedrockRuntime(config)
+        self._server = ThreadingHTTPServer((host, port), _FakeRuntimeHandler)
+        self._server.daemon_threads = True
+        self._server.runtime = self.runtime
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def endpoint_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "FakeRuntimeServer":
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def client(self, max_pool_connections: int = 50):
+        """boto3 bedrock-runtime client for this endpoint with dummy credentials"""
+        import boto3
+        return boto3.client(
+            "bedrock-runtime",
+            region_name="us-east-1",
+            endpoint_url=self.endpoint_url,
+            aws_access_key_id="fake",
+            aws_secret_access_key="fake",
+            config=client_config(max_pool_connections=max_pool_connections)
+        )
+
+    def __enter__(self) -> "FakeRuntimeServer":
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve a fake bedrock-runtime endpoint")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8123)
+    parser.add_argument("--latency", type=float, default=0.3, help="Median time to first token in seconds")
+    parser.add_argument("--latency-sigma", type=float, default=0.3, help="Lognormal sigma of the latency")
+    parser.add_argument("--tokens-per-second", type=float, default=100.0)
+    parser.add_argument("--output-tokens", type=int, default=64)
+    parser.add_argument("--throttle", type=float, default=0.0, help="Probability of a ThrottlingException")
+    args = parser.parse_args()
+
+    config = FakeRuntimeConfig(
+        first_token_latency=LatencyDistribution(args.latency, args.latency_sigma),
+        output_tokens_per_second=args.tokens_per_second,
+        output_tokens=args.output_tokens,
+        throttle_probability=args.throttle
+    )
+    server = FakeRuntimeServer(config, args.host, args.port)
+    print(f"Serving fake bedrock-runtime at {server.endpoint_url}")
+    try:
+        server.start()._thread.join()
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
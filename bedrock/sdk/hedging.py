@@ -0,0 +1,114 @@
+from dataclasses import dataclass
+from typing import Dict, Optional
+import threading
+from bedrock_sdk.metrics import LatencyHistogram
+from bedrock_sdk.retry import RetryBudget
+
+
+@dataclass
+class HedgeStats:
+    """Counters for hedged requests"""
+    requests: int = 0
+    hedged: int = 0
+    hedge_wins: int = 0
+    budget_denied: int = 0
+
+    @property
+    def hedge_rate(self) -> float:
+        return self.hedged / self.requests if self.requests else 0.0
+
+
+class HedgePolicy:
+    """
+    When and where BedrockClient sends a hedge (backup) request.
+
+    If a converse call hasn't answered after the hedge delay, an identical
+    request is sent, optionally to another region, profile or cross-region
+    inference profile. Whichever answers first is used. The delay defaults to
+    the observed p95 latency of the model. The fraction of requests that may
+    be hedged is capped by a token bucket, so hedging can't double load
+    during an incident.
+
+    Example:
+        client = BedrockClient(hedge_policy=HedgePolicy(percentile=95, budget=0.05, region_name="us-west-2"))
+    """
+
+    def __init__(
+        self,
+        delay: Optional[float] = None,
+        percentile: float = 95.0,
+        min_samples: int = 20,
+        default_delay: float = 2.0,
+        budget: float = 0.05,
+        burst: float = 10.0,
+        client=None,
+        region_name: Optional[str] = None,
+        profile_name: Optional[str] = None,
+        model_id: Optional[str] = None,
+        max_workers: int = 64
+    ):
+        """
+        Args:
+            delay: Fixed seconds to wait before hedging; if None the latency percentile is used
+            percentile: Latency percentile of the model used as the delay
+            min_samples: Successful calls observed before the percentile replaces default_delay
+            default_delay: Delay used until enough latencies have been observed
+            budget: Fraction of requests that may be hedged
+            burst: Hedges that may be sent back to back before the budget applies
+            client: bedrock-runtime client for hedge requests, e.g. in another region
+            region_name: Region for hedge requests when client is not given
+            profile_name: AWS profile for hedge requests when client is not given
+            model_id: Model or inference profile id for hedge requests, e.g. "us.amazon.nova-lite-v1:0"
+            max_workers: Threads available to BedrockClient for concurrent primary and hedge calls
+        """
+        self.delay = delay
+        self.percentile = percentile
+        self.min_samples = min_samples
+        self.default_delay = default_delay
+        self.client = client
+        self.region_name = region_name
+        self.profile_name = profile_name
+        self.model_id = model_id
+        self.max_workers = max_workers
+        self.stats = HedgeStats()
+        self._budget = RetryBudget(capacity=burst, ratio=budget)
+        self._latencies: Dict[str, LatencyHistogram] = {}
+        self._lock = threading.Lock()
+
+    def delay_for(self, model_id: str) -> float:
+        """Seconds to wait for the primary request before hedging"""
+        if self.delay is not None:
+            return self.delay
+        with self._lock:
+            histogram = self._latencies.get(model_id)
+            if histogram is None or histogram.count < self.min_samples:
+                return self.default_delay
+            return histogram.percentile(self.percentile)
+
+    def record(self, model_id: str, latency: float):
+        """Record the latency of a successful primary request"""
+        with self._lock:
+            histogram = self._latencies.get(model_id)
+            if histogram is None:
+                histogram = self._latencies[model_id] = LatencyHistogram()
+            histogram.record(latency)
+
+    def on_request(self):
+        """Count a request and credit the hedge budget"""
+        with self._lock:
+            self.stats.requests += 1
+        self._budget.deposit()
+
+    def try_hedge(self) -> bool:
+        """Take a hedge from the budget, returning False if it is exhausted"""
+        allowed = self._budget.withdraw()
+        with self._lock:
+            if allowed:
+                self.stats.hedged += 1
+            else:
+                self.stats.budget_denied += 1
+        return allowed
+
+    def on_hedge_win(self):
+        with self._lock:
+            self.stats.hedge_wins += 1
@@ -0,0 +1,212 @@
+from dataclasses import dataclass, asdict
+from typing import Dict, Iterable, Optional
+import threading
+from bedrock_sdk.metrics import MetricsEvent
+
+REGION_PREFIXES = ("us.", "eu.", "apac.", "us-gov.", "global.")
+
+
+@dataclass
+class ModelPrice:
+    """
+    On-demand price of a model in USD per 1,000 tokens
+
+    Prompt cache reads and writes are charged at the input rate unless their
+    own rates are given.
+    """
+    input_per_1k: float
+    output_per_1k: float
+    name: str = ""
+    cache_read_per_1k: Optional[float] = None
+    cache_write_per_1k: Optional[float] = None
+
+    def cost(
+        self,
+        input_tokens: int,
+        output_tokens: int,
+        cache_read_tokens: int = 0,
+        cache_write_tokens: int = 0
+    ) -> float:
+        cache_read = self.input_per_1k if self.cache_read_per_1k is None else self.cache_read_per_1k
+        cache_write = self.input_per_1k if self.cache_write_per_1k is None else self.cache_write_per_1k
+        return (
+            self.input_per_1k * input_tokens
+            + self.output_per_1k * output_tokens
+            + cache_read * cache_read_tokens
+            + cache_write * cache_write_tokens
+        ) / 1000.
+
+
+# Prices from the summarization benchmark notebook, plus prompt cache rates
+DEFAULT_PRICES: Dict[str, ModelPrice] = {
+    'us.amazon.nova-micro-v1:0': ModelPrice(0.000035, 0.00014, 'Nova Micro', cache_read_per_1k=0.00000875),
+    'us.amazon.nova-lite-v1:0': ModelPrice(0.00006, 0.00024, 'Nova Lite', cache_read_per_1k=0.000015),
+    'us.amazon.nova-pro-v1:0': ModelPrice(0.0008, 0.0032, 'Nova Pro', cache_read_per_1k=0.0002),
+    'us.meta.llama3-2-1b-instruct-v1:0': ModelPrice(0.0001, 0.0001, 'Llama 1B'),
+    'us.meta.llama3-2-3b-instruct-v1:0': ModelPrice(0.00015, 0.00015, 'Llama 3B'),
+    'us.meta.llama3-1-8b-instruct-v1:0': ModelPrice(0.00022, 0.00022, 'Llama 8B'),
+    'us.meta.llama3-2-11b-instruct-v1:0': ModelPrice(0.00016, 0.00016, 'Llama 11B'),
+    'us.anthropic.claude-3-5-haiku-20241022-v1:0': ModelPrice(
+        0.0008, 0.004, 'Haiku 3.5', cache_read_per_1k=0.00008, cache_write_per_1k=0.001
+    ),
+    'us.anthropic.claude-3-7-sonnet-20250219-v1:0': ModelPrice(
+        0.003, 0.015, 'Sonnet 3.7', cache_read_per_1k=0.0003, cache_write_per_1k=0.00375
+    ),
+}
+
+
+def strip_region_prefix(model_id: str) -> str:
+    """Base model id without a cross-region inference profile prefix such as "us." """
+    for prefix in REGION_PREFIXES:
+        if model_id.startswith(prefix):
+            return model_id[len(prefix):]
+    return model_id
+
+
+@dataclass
+class UsageTotals:
+    """Tokens and cost accumulated for one model, tag or conversation"""
+    requests: int = 0
+    input_tokens: int = 0
+    output_tokens: int = 0
+    cache_read_tokens: int = 0
+    cache_write_tokens: int = 0
+    cost: float = 0.0
+    unpriced_requests: int = 0
+
+    def add(
+        self,
+        input_tokens: int,
+        output_tokens: int,
+        cache_read_tokens: int,
+        cache_write_tokens: int,
+        cost: Optional[float]
+    ):
+        self.requests += 1
+        self.input_tokens += input_tokens
+        self.output_tokens += output_tokens
+        self.cache_read_tokens += cache_read_tokens
+        self.cache_write_tokens += cache_write_tokens
+        if cost is None:
+            self.unpriced_requests += 1
+        else:
+            self.cost += cost
+
+
+class TokenLedger:
+    """
+    Running token and dollar totals by model, tag and conversation.
+
+    The ledger is a metrics hook: BedrockClient feeds it every completed
+    request, using the token counts Bedrock reports. Models missing from the
+    price table are counted in `unpriced_requests` rather than guessed.
+
+    Example:
+        client = BedrockClient()
+        client.converse(prompt, config, tags=["summaries"])
+        print(client.ledger.snapshot()["by_tag"]["summaries"]["cost"])
+    """
+
+    def __init__(self, prices: Optional[Dict[str, ModelPrice]] = None):
+        """
+        Args:
+            prices: Price table keyed by model id; defaults to DEFAULT_PRICES.
+                Ids with and without a region prefix ("us.") match each other.
+        """
+        self.prices: Dict[str, ModelPrice] = {}
+        self._base_prices: Dict[str, ModelPrice] = {}
+        self._lock = threading.Lock()
+        for model_id, price in (prices if prices is not None else DEFAULT_PRICES).items():
+            self.set_price(model_id, price)
+        self._reset_totals()
+
+    def _reset_totals(self):
+        self.total = UsageTotals()
+        self.by_model: Dict[str, UsageTotals] = {}
+        self.by_tag: Dict[str, UsageTotals] = {}
+        self.by_conversation: Dict[str, UsageTotals] = {}
+
+    def set_price(self, model_id: str, price: ModelPrice):
+        """Add or replace the price of a model"""
+        with self._lock:
+            self.prices[model_id] = price
+            self._base_prices[strip_region_prefix(model_id)] = price
+
+    def price_for(self, model_id: str) -> Optional[ModelPrice]:
+        price = self.prices.get(model_id)
+        if price is None:
+            price = self._base_prices.get(strip_region_prefix(model_id))
+        return price
+
+    def cost(
+        self,
+        model_id: str,
+        input_tokens: int,
+        output_tokens: int,
+        cache_read_tokens: int = 0,
+        cache_write_tokens: int = 0
+    ) -> Optional[float]:
+        """Dollar cost of a call, or None if the model has no price"""
+        price = self.price_for(model_id)
+        if price is None:
+            return None
+        return price.cost(input_tokens, output_tokens, cache_read_tokens, cache_write_tokens)
+
+    def record(
+        self,
+        model_id: str,
+        input_tokens: int,
+        output_tokens: int,
+        tags: Iterable[str] = (),
+        conversation_id: Optional[str] = None,
+        cache_read_tokens: int = 0,
+        cache_write_tokens: int = 0
+    ) -> Optional[float]:
+        """
+        Add one call to the ledger
+
+        Returns:
+            Dollar cost of the call, or None if the model has no price
+        """
+        cost = self.cost(model_id, input_tokens, output_tokens, cache_read_tokens, cache_write_tokens)
+        with self._lock:
+            buckets = [self.total, self.by_model.setdefault(model_id, UsageTotals())]
+            buckets.extend(self.by_tag.setdefault(tag, UsageTotals()) for tag in tags)
+            if conversation_id is not None:
+                buckets.append(self.by_conversation.setdefault(conversation_id, UsageTotals()))
+            for bucket in buckets:
+                bucket.add(input_tokens, output_tokens, cache_read_tokens, cache_write_tokens, cost)
+        return cost
+
+    def __call__(self, event: MetricsEvent):
+        if event.event != "request" or event.error is not None or event.api in ("cache", "coalesced"):
+            return
+        self.record(
+            event.model_id,
+            event.input_tokens,
+            event.output_tokens,
+            tags=event.tags,
+            conversation_id=event.conversation_id,
+            cache_read_tokens=event.cache_read_tokens,
+            cache_write_tokens=event.cache_write_tokens
+        )
+
+    def _snapshot(self) -> Dict:
+        return {
+            "total": asdict(self.total),
+            "by_model": {key: asdict(value) for key, value in self.by_model.items()},
+            "by_tag": {key: asdict(value) for key, value in self.by_tag.items()},
+            "by_conversation": {key: asdict(value) for key, value in self.by_conversation.items()},
+        }
+
+    def snapshot(self) -> Dict:
+        """Copy of the current totals as plain dicts"""
+        with self._lock:
+            return self._snapshot()
+
+    def reset(self) -> Dict:
+        """Clear all totals, returning the snapshot taken just before"""
+        with self._lock:
+            snapshot = self._snapshot()
+            self._reset_totals()
+        return snapshot
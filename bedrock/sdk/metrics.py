@@ -0,0 +1,208 @@
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional
+import math
+import threading
+import time
+
+
+@dataclass
+class MetricsEvent:
+    """
+    A single observation emitted by BedrockClient to its metrics hooks.
+
+    Attributes:
+        event (str): "request" when a call finishes (or fails), "retry" before
+            a retry sleep, "fallback" when converse falls back to invoke_model,
+            "hedge" when a hedge request is sent
+        model_id (str): Model the call was made to
+        api (str): "converse", "invoke_model", "cache" for cache hits or
+            "coalesced" for calls that shared another caller's in-flight request
+        latency (float): Seconds since the call started, including retries
+        time_to_first_token (Optional[float]): Seconds to the first chunk, for streams
+        input_tokens (int): Input tokens reported by the service
+        output_tokens (int): Output tokens reported by the service
+        cache_read_tokens (int): Input tokens read from the prompt cache
+        cache_write_tokens (int): Input tokens written to the prompt cache
+        retries (int): Retries made so far
+        error (Optional[str]): Error code or class name if the call failed
+        stream (bool): The call was a streaming call
+        tags (List[str]): Caller-supplied tags for cost attribution
+        conversation_id (Optional[str]): Conversation the call belongs to
+        timestamp (float): Wall-clock time the event was emitted
+    """
+    event: str
+    model_id: str
+    api: str
+    latency: float = 0.0
+    time_to_first_token: Optional[float] = None
+    input_tokens: int = 0
+    output_tokens: int = 0
+    cache_read_tokens: int = 0
+    cache_write_tokens: int = 0
+    retries: int = 0
+    error: Optional[str] = None
+    stream: bool = False
+    tags: List[str] = field(default_factory=list)
+    conversation_id: Optional[str] = None
+    timestamp: float = field(default_factory=time.time)
+
+
+MetricsHook = Callable[[MetricsEvent], None]
+
+
+class LatencyHistogram:
+    """
+    Log-bucketed latency histogram with bounded relative error.
+
+    Each bucket is `growth` times wider than the previous one, so percentiles
+    are accurate to within that factor at constant memory regardless of the
+    number of samples.
+    """
+
+    def __init__(self, min_value: float = 0.001, growth: float = 1.05):
+        """
+        Args:
+            min_value: Smallest distinguishable latency in seconds
+            growth: Ratio between consecutive bucket bounds
+        """
+        self.min_value = min_value
+        self.growth = growth
+        self._log_growth = math.log(growth)
+        self.buckets: Dict[int, int] = {}
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, value: float):
+        index = 0 if value <= self.min_value else int(math.log(value / self.min_value) / self._log_growth) + 1
+        self.buckets[index] = self.buckets.get(index, 0) + 1
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+
+    def percentile(self, p: float) -> Optional[float]:
+        """Upper bound of the bucket holding the p-th percentile (0-100)"""
+        if not self.count:
+            return None
+        rank = max(1, math.ceil(self.count * p / 100))
+        seen = 0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen >= rank:
+                return min(self.max, self.min_value * self.growth ** index)
+        return self.max
+
+    @property
+    def mean(self) -> Optional[float]:
+        return self.total / self.count if self.count else None
+
+
+@dataclass
+class ModelMetrics:
+    """Aggregated metrics for one model"""
+    requests: int = 0
+    errors: int = 0
+    retries: int = 0
+    fallbacks: int = 0
+    hedges: int = 0
+    cache_hits: int = 0
+    coalesced: int = 0
+    input_tokens: int = 0
+    output_tokens: int = 0
+    cache_read_tokens: int = 0
+    cache_write_tokens: int = 0
+    latency: LatencyHistogram = field(default_factory=LatencyHistogram)
+    time_to_first_token: LatencyHistogram = field(default_factory=LatencyHistogram)
+    errors_by_type: Dict[str, int] = field(default_factory=dict)
+
+    def summary(self, percentiles: List[float]) -> Dict:
+        summary = {
+            "requests": self.requests,
+            "errors": self.errors,
+            "retries": self.retries,
+            "fallbacks": self.fallbacks,
+            "hedges": self.hedges,
+            "cache_hits": self.cache_hits,
+            "coalesced": self.coalesced,
+            "input_tokens": self.input_tokens,
+            "output_tokens": self.output_tokens,
+            "cache_read_tokens": self.cache_read_tokens,
+            "cache_write_tokens": self.cache_write_tokens,
+            "latency_mean": self.latency.mean,
+            "errors_by_type": dict(self.errors_by_type),
+        }
+        for p in percentiles:
+            summary[f"latency_p{p:g}"] = self.latency.percentile(p)
+        for p in percentiles:
+            summary[f"ttft_p{p:g}"] = self.time_to_first_token.percentile(p)
+        return summary
+
+
+class MetricsAggregator:
+    """
+    In-process metrics hook keeping per-model counters and latency histograms.
+
+    Example:
+        metrics = MetricsAggregator()
+        client = BedrockClient(metrics_hooks=[metrics])
+        ...
+        print(metrics.snapshot()["anthropic.claude-3-haiku-20240307-v1:0"]["latency_p99"])
+    """
+
+    def __init__(self, percentiles: List[float] = [50, 90, 95, 99]):
+        """
+        Args:
+            percentiles: Percentiles reported by snapshot()
+        """
+        self.percentiles = list(percentiles)
+        self.models: Dict[str, ModelMetrics] = {}
+        self._lock = threading.Lock()
+
+    def __call__(self, event: MetricsEvent):
+        with self._lock:
+            metrics = self.models.get(event.model_id)
+            if metrics is None:
+                metrics = self.models[event.model_id] = ModelMetrics()
+            if event.event == "retry":
+                metrics.retries += 1
+            elif event.event == "fallback":
+                metrics.fallbacks += 1
+            elif event.event == "hedge":
+                metrics.hedges += 1
+            elif event.event == "request":
+                metrics.requests += 1
+                if event.api == "cache":
+                    metrics.cache_hits += 1
+                    return
+                if event.api == "coalesced":
+                    metrics.coalesced += 1
+                    return
+                if event.error is not None:
+                    metrics.errors += 1
+                    metrics.errors_by_type[event.error] = metrics.errors_by_type.get(event.error, 0) + 1
+                    return
+                metrics.input_tokens += event.input_tokens
+                metrics.output_tokens += event.output_tokens
+                metrics.cache_read_tokens += event.cache_read_tokens
+                metrics.cache_write_tokens += event.cache_write_tokens
+                metrics.latency.record(event.latency)
+                if event.time_to_first_token is not None:
+                    metrics.time_to_first_token.record(event.time_to_first_token)
+
+    def percentile(self, model_id: str, p: float) -> Optional[float]:
+        """Latency percentile in seconds for a model, or None without samples"""
+        with self._lock:
+            metrics = self.models.get(model_id)
+            return metrics.latency.percentile(p) if metrics else None
+
+    def snapshot(self) -> Dict[str, Dict]:
+        """Per-model summary of counters, tokens and latency percentiles"""
+        with self._lock:
+            return {
+                model_id: metrics.summary(self.percentiles)
+                for model_id, metrics in self.models.items()
+            }
+
+    def reset(self):
+        with self._lock:
+            self.models = {}
@@ -0,0 +1,130 @@
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional
+import threading
+from bedrock_sdk.tokens import estimate_tokens
+
+CACHE_POINT = {"cachePoint": {"type": "default"}}
+
+# Minimum prefix length in tokens for a checkpoint, by model id substring.
+# Models not listed here don't support Converse prompt caching.
+PROMPT_CACHE_MIN_TOKENS = {
+    "anthropic.claude-3-5-haiku": 2048,
+    "anthropic.claude-3-7-sonnet": 1024,
+    "anthropic.claude-sonnet-4": 1024,
+    "anthropic.claude-opus-4": 1024,
+    "amazon.nova-micro": 1024,
+    "amazon.nova-lite": 1024,
+    "amazon.nova-pro": 1024,
+    "amazon.nova-premier": 1024,
+}
+
+
+def min_cache_tokens(model_id: str) -> Optional[int]:
+    """Minimum cacheable prefix for a model, or None if it doesn't support prompt caching"""
+    matches = [key for key in PROMPT_CACHE_MIN_TOKENS if key in model_id]
+    if not matches:
+        return None
+    return PROMPT_CACHE_MIN_TOKENS[max(matches, key=len)]
+
+
+class PromptCache:
+    """
+    Inserts Converse `cachePoint` blocks after prompt prefixes that repeat.
+
+    Every request's prefixes (the system text, then the system text plus each
+    leading message) are remembered. When a request starts with a prefix that
+    an earlier request also had and that is long enough to cache, a checkpoint
+    goes after the system block and after the longest such message prefix.
+    That covers a fixed system prompt, few-shot examples and earlier turns of
+    a conversation. Prefixes sent only once never pay for a cache write.
+
+    Attributes:
+        system_checkpoints (int): Checkpoints placed after the system block
+        message_checkpoints (int): Checkpoints placed after a message
+    """
+
+    def __init__(
+        self,
+        max_prefixes: int = 4096,
+        min_tokens: Optional[int] = None,
+        token_estimator: Callable[[str], int] = estimate_tokens
+    ):
+        """
+        Args:
+            max_prefixes: Prefix fingerprints remembered before the oldest are forgotten
+            min_tokens: Override the per-model minimum cacheable prefix
+            token_estimator: Function estimating the tokens in a piece of text
+        """
+        self.max_prefixes = max_prefixes
+        self.min_tokens = min_tokens
+        self.token_estimator = token_estimator
+        self.system_checkpoints = 0
+        self.message_checkpoints = 0
+        self._prefixes: "OrderedDict[int, None]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _seen(self, fingerprint: int) -> bool:
+        """Record a prefix fingerprint, returning whether it was already known"""
+        seen = fingerprint in self._prefixes
+        self._prefixes[fingerprint] = None
+        self._prefixes.move_to_end(fingerprint)
+        return seen
+
+    def apply(self, request: Dict) -> Dict:
+        """
+        Add cache checkpoints to converse request arguments
+
+        Args:
+            request: Arguments from BedrockClient._build_converse_request; not modified
+
+        Returns:
+            Request arguments with cachePoint blocks where a repeated prefix ends
+        """
+        model_id = request["modelId"]
+        min_tokens = min_cache_tokens(model_id)
+        if min_tokens is None:
+            return request
+        if self.min_tokens is not None:
+            min_tokens = self.min_tokens
+
+        system: List[Dict] = request.get("system", [])
+        messages: List[Dict] = request["messages"]
+        fingerprint = hash(model_id)
+        tokens = 0
+        cache_system = False
+        cache_message = None
+        with self._lock:
+            if system:
+                text = "".join(block.get("text", "") for block in system)
+                tokens += self.token_estimator(text)
+                fingerprint = hash((fingerprint, "system", text))
+                cache_system = self._seen(fingerprint) and tokens >= min_tokens
+            # The last message is the new turn, so it never ends a cached prefix
+            for i, msg in enumerate(messages[:-1]):
+                text = "".join(block.get("text", "") for block in msg["content"])
+                tokens += self.token_estimator(text)
+                fingerprint = hash((fingerprint, msg["role"], text))
+                if self._seen(fingerprint) and tokens >= min_tokens:
+                    cache_message = i
+            while len(self._prefixes) > self.max_prefixes:
+                self._prefixes.popitem(last=False)
+            if cache_system:
+                self.system_checkpoints += 1
+            if cache_message is not None:
+                self.message_checkpoints += 1
+
+        if not cache_system and cache_message is None:
+            return request
+        request = dict(request)
+        if cache_system:
+            request["system"] = system + [CACHE_POINT]
+        if cache_message is not None:
+            messages = list(messages)
+            msg = messages[cache_message]
+            messages[cache_message] = {"role": msg["role"], "content": msg["content"] + [CACHE_POINT]}
+            request["messages"] = messages
+        return request
+
+    def clear(self):
+        with self._lock:
+            self._prefixes.clear()
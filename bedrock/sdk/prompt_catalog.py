@@ -0,0 +1,148 @@
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Tuple
+import threading
+import time
+import boto3
+from botocore.exceptions import ClientError
+
+_agent_client = None
+_agent_client_lock = threading.Lock()
+
+
+def get_agent_client():
+    """Process-wide bedrock-agent client, created on first use"""
+    global _agent_client
+    if _agent_client is None:
+        with _agent_client_lock:
+            if _agent_client is None:
+                _agent_client = boto3.client('bedrock-agent')
+    return _agent_client
+
+
+@dataclass
+class PromptCatalogStats:
+    """Catalog lookups and the list_prompts calls they cost"""
+    lookups: int = 0
+    refreshes: int = 0
+    list_calls: int = 0
+
+
+class PromptCatalog:
+    """
+    Index of Bedrock Prompt Management prompts by name.
+
+    The first lookup pages through list_prompts and builds a name to
+    (id, version) index; later lookups are dict reads until the index is
+    older than `ttl`, when the next lookup lists the prompts again. Prompts
+    saved or deleted through PromptTemplate update the index in place, so
+    they don't wait for a refresh. Misses are answered from the index too.
+
+    All PromptTemplate instances share the catalog from get_catalog(), so
+    binding many templates costs one listing instead of one per template.
+
+    Example:
+        catalog = get_catalog()
+        prompt_id, version = catalog.lookup("greeting_template")
+    """
+
+    def __init__(self, client=None, ttl: Optional[float] = 300.0, page_size: int = 1000):
+        """
+        Args:
+            client: bedrock-agent client; the shared one from get_agent_client() if not given
+            ttl: Seconds before the index is listed again, or None to keep it until refresh()
+            page_size: maxResults per list_prompts call
+        """
+        self._client = client
+        self.ttl = ttl
+        self.page_size = page_size
+        self.stats = PromptCatalogStats()
+        self._index: Dict[str, Tuple[str, Optional[str]]] = {}
+        self._loaded_at: Optional[float] = None
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+
+    @property
+    def client(self):
+        if self._client is None:
+            self._client = get_agent_client()
+        return self._client
+
+    def _stale(self) -> bool:
+        if self._loaded_at is None:
+            return True
+        return self.ttl is not None and time.time() - self._loaded_at > self.ttl
+
+    def refresh(self):
+        """List every prompt and replace the index"""
+        index = {}
+        kwargs: Dict[str, Any] = {'maxResults': self.page_size}
+        try:
+            while True:
+                response = self.client.list_prompts(**kwargs)
+                self.stats.list_calls += 1
+                for summary in response.get('promptSummaries', []):
+                    # Keep the first match, as the original linear scan did
+                    index.setdefault(summary['name'], (summary['id'], summary.get('version')))
+                next_token = response.get('nextToken')
+                if not next_token:
+                    break
+                kwargs['nextToken'] = next_token
+        except ClientError as e:
+            raise Exception(f"Failed to list prompts: {str(e)}")
+        with self._lock:
+            self._index = index
+            self._loaded_at = time.time()
+            self.stats.refreshes += 1
+
+    def lookup(self, name: str) -> Optional[Tuple[str, Optional[str]]]:
+        """
+        Find a prompt by name, listing prompts first if the index is stale
+
+        Returns:
+            (prompt id, version) or None if no prompt has that name
+        """
+        self.stats.lookups += 1
+        if self._stale():
+            # One thread lists while concurrent lookups wait for its index
+            with self._refresh_lock:
+                if self._stale():
+                    self.refresh()
+        return self._index.get(name)
+
+    def put(self, name: str, prompt_id: str, version: Optional[str]):
+        """Record a prompt created or updated by this process"""
+        with self._lock:
+            self._index[name] = (prompt_id, version)
+
+    def remove(self, name: str):
+        """Forget a prompt deleted by this process"""
+        with self._lock:
+            self._index.pop(name, None)
+
+    def clear(self):
+        """Drop the index so the next lookup lists prompts again"""
+        with self._lock:
+            self._index = {}
+            self._loaded_at = None
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+
+_catalog: Optional[PromptCatalog] = None
+
+
+def get_catalog() -> PromptCatalog:
+    """Process-wide PromptCatalog shared by all PromptTemplates"""
+    global _catalog
+    if _catalog is None:
+        with _agent_client_lock:
+            if _catalog is None:
+                _catalog = PromptCatalog()
+    return _catalog
+
+
+def set_catalog(catalog: PromptCatalog):
+    """Replace the shared catalog, e.g. to change its ttl or client"""
+    global _catalog
+    _catalog = catalog
@@ -0,0 +1,98 @@
+from typing import Dict, List, Optional, Tuple, Union
+import re
+
+ROLE_MARKER = re.compile(r"<<(system|user|assistant)>>")
+
+# (role, raw content) pairs; the first segment is the text before any marker and has role None
+Segment = Tuple[Optional[str], str]
+
+
+def split_roles(text: str) -> List[Segment]:
+    """
+    Split text on <<system>>/<<user>>/<<assistant>> markers in a single pass
+
+    Args:
+        text: Prompt text
+
+    Returns:
+        Segments with unstripped content, starting with the (None, preamble) segment
+    """
+    segments = []
+    role = None
+    position = 0
+    for match in ROLE_MARKER.finditer(text):
+        segments.append((role, text[position:match.start()]))
+        role = match.group(1)
+        position = match.end()
+    segments.append((role, text[position:]))
+    return segments
+
+
+def concat_segments(*parts: Union[str, List[Segment]]) -> List[Segment]:
+    """
+    Concatenate segment lists as if their source texts had been concatenated
+
+    Plain strings are treated as text without markers. Each part's preamble is
+    appended to the last segment of the parts before it.
+    """
+    result: List[Segment] = [(None, "")]
+    for part in parts:
+        segments = [(None, part)] if isinstance(part, str) else part
+        role, content = result[-1]
+        result[-1] = (role, content + segments[0][1])
+        result.extend(segments[1:])
+    return result
+
+
+def segments_to_messages(segments: List[Segment]) -> Dict[str, Union[str, List[str], List[Dict[str, str]]]]:
+    """
+    Build the system/user/assistant structure from segments
+
+    Text before the first marker is ignored, only the first system segment is
+    used and empty assistant segments are dropped. Text without any markers
+    becomes a single user message.
+
+    "messages" holds the turns in prompt order, with adjacent turns of the
+    same role merged so user and assistant alternate; "user" and "assistant"
+    list the same turns by role.
+    """
+    system: Optional[str] = None
+    messages: List[Dict[str, str]] = []
+    for role, content in segments[1:]:
+        if role == "system":
+            if system is None:
+                system = content.strip()
+            continue
+        content = content.strip()
+        if role == "assistant" and not content:
+            continue
+        if messages and messages[-1]["role"] == role:
+            if content:
+                previous = messages[-1]["content"]
+                messages[-1]["content"] = f"{previous}\n\n{content}" if previous else content
+        else:
+            messages.append({"role": role, "content": content})
+    system = system or ""
+
+    if not messages and not system:
+        messages = [{"role": "user", "content": join_segments(segments).strip()}]
+
+    return {
+        "system": system,
+        "user": [message["content"] for message in messages if message["role"] == "user"],
+        "assistant": [message["content"] for message in messages if message["role"] == "assistant"],
+        "messages": messages
+    }
+
+
+def join_segments(segments: List[Segment]) -> str:
+    """Reassemble the original text from segments"""
+    return "".join(
+        content if role is None else f"<<{role}>>{content}"
+        for role, content in segments
+    )
+
+
+def parse_prompt(text: str) -> Dict[str, Union[str, List[str], List[Dict[str, str]]]]:
+    """Parse prompt text into system, user, and assistant components"""
+    return segments_to_messages(split_roles(text))
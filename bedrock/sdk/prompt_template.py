@@ -1,10 +1,49 @@
 from dataclasses import dataclass, field
-from typing import Dict, List, Optional, Any, Tuple
+from typing import Dict, Iterable, List, Optional, Any, TextIO, Tuple
 from datetime import datetime
 import json
-import boto3
 from botocore.exceptions import ClientError
 import re
+from bedrock_sdk.prompt_catalog import get_agent_client, get_catalog
+from bedrock_sdk.prompt_parser import Segment, concat_segments, split_roles
+
+VARIABLE_PATTERN = re.compile(r'\{\{(\w+)\}\}')
+
+
+class CompiledText:
+    """
+    Template text split once into literal and {{variable}} parts
+    
+    Literal parts sit at even indexes of `parts` and variable names at odd
+    ones, so rendering fills the variable slots and joins once instead of
+    scanning the text per variable.
+    """
+    __slots__ = ("parts", "variables", "required", "_slots")
+
+    def __init__(self, text: str):
+        self.parts: List[str] = VARIABLE_PATTERN.split(text)
+        self.variables: List[str] = self.parts[1::2]
+        self.required = frozenset(self.variables)
+        self._slots = list(enumerate(self.parts))[1::2]
+
+    def check(self, variables: Dict[str, str]):
+        """Raise ValueError if any variable in the text is missing"""
+        missing_vars = self.required.difference(variables)
+        if missing_vars:
+            raise ValueError(f"Missing required variables: {set(missing_vars)}")
+
+    def render(self, variables: Dict[str, str]) -> str:
+        if not self._slots:
+            return self.parts[0]
+        parts = self.parts.copy()
+        for index, name in self._slots:
+            parts[index] = str(variables[name])
+        return "".join(parts)
+
+    def write(self, out: TextIO, variables: Dict[str, str]):
+        """Write the rendered text part by part, without building it in memory"""
+        for index, part in enumerate(self.parts):
+            out.write(str(variables[part]) if index % 2 else part)
 
 
 @dataclass
@@ -12,6 +51,12 @@ class PromptTemplate:
     """
     A class to manage prompt templates in Amazon Bedrock.
     
+    Creating a template is local and never touches the network. The template
+    is bound to the Bedrock prompt of the same name on first use of
+    prompt_id, version, save, create_version or delete, or explicitly with
+    bind(); the lookup happens once per template and is answered from the
+    shared PromptCatalog.
+    
     Attributes:
         name (str): Name of the prompt template
         content (str): Content of the prompt with optional variables in {variable} format
@@ -35,27 +80,64 @@ class PromptTemplate:
     _prompt_id: Optional[str] = field(default=None, init=False)
     _version: Optional[str] = field(default=None, init=False)
     _version_history: List[Dict] = field(default_factory=list, init=False)
-    _client: Any = field(init=False)
+    _client: Any = field(default=None, init=False)
+    _bound: bool = field(default=False, init=False, repr=False)
+    _segments: Optional[Tuple[str, List[Segment]]] = field(default=None, init=False, repr=False)
+    _compiled: Optional[Tuple[str, CompiledText, List[Tuple[Optional[str], CompiledText]]]] = field(
+        default=None, init=False, repr=False
+    )
 
     def __post_init__(self):
-        """Initialize the Bedrock client and load any existing prompt"""
-        self._client = boto3.client('bedrock-agent')
-        self._load_existing_prompt()
+        """Validate the template; no remote calls are made until the template is bound"""
         self._validate()
 
+    @property
+    def client(self):
+        """bedrock-agent client, the shared process-wide one unless set"""
+        if self._client is None:
+            self._client = get_agent_client()
+        return self._client
+
+    def bind(self) -> "PromptTemplate":
+        """Look up the Bedrock prompt with this template's name, once"""
+        if not self._bound:
+            self._load_existing_prompt()
+            self._bound = True
+        return self
+
     @property
     def variables(self) -> List[str]:
         """Get list of variables in the prompt template"""
-        return re.findall(r'\{\{(\w+)\}\}', self.content)
+        return list(self.compiled.variables)
+
+    @property
+    def segments(self) -> List[Segment]:
+        """Role-marker structure of the content, parsed once and cached"""
+        if self._segments is None or self._segments[0] is not self.content:
+            self._segments = (self.content, split_roles(self.content))
+        return self._segments[1]
+
+    @property
+    def compiled(self) -> CompiledText:
+        """Content compiled for rendering, cached until the content changes"""
+        return self._compile()[1]
+
+    def _compile(self) -> Tuple[str, CompiledText, List[Tuple[Optional[str], CompiledText]]]:
+        if self._compiled is None or self._compiled[0] is not self.content:
+            segments = [(role, CompiledText(text)) for role, text in self.segments]
+            self._compiled = (self.content, CompiledText(self.content), segments)
+        return self._compiled
 
     @property
     def prompt_id(self) -> Optional[str]:
-        """Get the prompt identifier"""
+        """Get the prompt identifier, binding the template if needed"""
+        self.bind()
         return self._prompt_id
     
     @property
     def version(self) -> Optional[str]:
-        """Get the current version"""
+        """Get the current version, binding the template if needed"""
+        self.bind()
         return self._version
 
     def _validate(self):
@@ -72,17 +154,16 @@ class PromptTemplate:
     def _load_existing_prompt(self):
         """Load existing prompt if it exists with the same name"""
         try:
-            # List prompts to find one with matching name
-            response = self._client.list_prompts()
-            for prompt in response.get('promptSummaries', []):
-                if prompt['name'] == self.name:
-                    self._prompt_id = prompt['id']
-                    # Get full prompt details
-                    prompt_details = self._client.get_prompt(
-                        promptIdentifier=self._prompt_id
-                    )
-                    self._version = prompt_details['version']
-                    return
+            entry = get_catalog().lookup(self.name)
+            if entry is None:
+                return
+            self._prompt_id, self._version = entry
+            if self._version is None:
+                # Get full prompt details
+                prompt_details = self.client.get_prompt(
+                    promptIdentifier=self._prompt_id
+                )
+                self._version = prompt_details['version']
         except ClientError as e:
             raise Exception(f"Failed to check existing prompts: {str(e)}")
 
@@ -94,10 +175,11 @@ class PromptTemplate:
         Returns:
             Tuple[str, str]: Prompt ID and version
         """
+        self.bind()
         try:
             if not self._prompt_id:
                 # Create new prompt
-                response = self._client.create_prompt(
+                response = self.client.create_prompt(
                     name=self.name,
                     description=self.description,
                     #customerEncryptionKeyArn=self.customer_encryption_key_arn,
@@ -119,7 +201,7 @@ class PromptTemplate:
                 self._version = response['version']
             else:
                 # Update existing prompt
-                response = self._client.update_prompt(
+                response = self.client.update_prompt(
                     promptIdentifier=self._prompt_id,
                     name=self.name,
                     description=self.description,
@@ -137,6 +219,7 @@ class PromptTemplate:
                     }]
                 )
                 self._version = response['version']
+            get_catalog().put(self.name, self._prompt_id, self._version)
                 
             return self._prompt_id, self._version
             
@@ -153,11 +236,11 @@ class PromptTemplate:
         Returns:
             str: Version identifier
         """
-        if not self._prompt_id:
+        if not self.prompt_id:
             raise ValueError("Cannot create version - prompt not saved")
             
         try:
-            response = self._client.create_prompt_version(
+            response = self.client.create_prompt_version(
                 promptIdentifier=self._prompt_id,
                 description=description
             )
@@ -185,33 +268,71 @@ class PromptTemplate:
         Raises:
             ValueError: If required variables are missing
         """
-        text = self.content
-        
-        # Find all required variables
-        required_vars = set(re.findall(r'\{\{(\w+)\}\}', text))
+        compiled = self.compiled
+        compiled.check(variables)
+        return compiled.render(variables)
+
+    def render_many(self, variable_sets: Iterable[Dict[str, str]]) -> List[str]:
+        """
+        Render the template once per variables dict
         
-        # Check for missing variables
-        missing_vars = required_vars - set(variables.keys())
-        if missing_vars:
-            raise ValueError(f"Missing required variables: {missing_vars}")
+        Args:
+            variable_sets: Variables for each rendering
+            
+        Returns:
+            Rendered templates in input order
+        """
+        compiled = self.compiled
+        rendered = []
+        for variables in variable_sets:
+            compiled.check(variables)
+            rendered.append(compiled.render(variables))
+        return rendered
+
+    def render_to(self, out: TextIO, variables: Dict[str, str]):
+        """
+        Render template into a text buffer or file
         
-        # Replace each {{variable}} with its value
-        for var, value in variables.items():
-            pattern = r'\{\{' + re.escape(var) + r'\}\}'
-            text = re.sub(pattern, str(value), text)
+        Literal text and variable values are written one after another, so
+        large values are never copied into an intermediate string.
         
-        return text
+        Args:
+            out: Writable text stream, e.g. io.StringIO or an open file
+            variables: Dictionary of variable names and values
+        """
+        compiled = self.compiled
+        compiled.check(variables)
+        compiled.write(out, variables)
 
+    def render_segments(self, variables: Dict[str, str]) -> List[Segment]:
+        """
+        Render template into role segments using the cached template structure
+        
+        Rendered variable values are not re-scanned for role markers unless a
+        value contains '<<', in which case the rendered text is parsed in full.
+        
+        Args:
+            variables: Dictionary of variable names and values
+            
+        Returns:
+            Segments as produced by prompt_parser.split_roles on the rendered text
+        """
+        if any('<<' in str(value) for value in variables.values()):
+            return split_roles(self.render(variables))
+        _, compiled, segments = self._compile()
+        compiled.check(variables)
+        return [(role, text.render(variables)) for role, text in segments]
 
     def delete(self):
         """Delete the prompt template from Bedrock"""
-        if not self._prompt_id:
+        if not self.prompt_id:
             return
             
         try:
-            self._client.delete_prompt(
+            self.client.delete_prompt(
                 promptIdentifier=self._prompt_id
             )
+            get_catalog().remove(self.name)
             self._prompt_id = None
             self._version = None
         except ClientError as e:
@@ -228,7 +349,7 @@ class PromptTemplate:
         Returns:
             PromptTemplate: Loaded template
         """
-        client = boto3.client('bedrock-agent')
+        client = get_agent_client()
         try:
             response = client.get_prompt(
                 promptIdentifier=prompt_id
@@ -237,13 +358,19 @@ class PromptTemplate:
             variant = response['variants'][0]
             content = variant['templateConfiguration']['text']['text']
             
-            return cls(
+            template = cls(
                 name=response['name'],
                 content=content,
                 description=response.get('description'),
                 tags=response.get('tags', {}),
                 #customer_encryption_key_arn=response.get('customerEncryptionKeyArn')
             )
+            # Already bound; no name lookup needed
+            template._prompt_id = response['id']
+            template._version = response['version']
+            template._bound = True
+            get_catalog().put(template.name, template._prompt_id, template._version)
+            return template
             
         except ClientError as e:
             raise Exception(f"Failed to load prompt: {str(e)}")
@@ -263,4 +390,13 @@ class FewShotTemplate:
         return "\n".join(
             template.render(variables) #template.render(variables) template.render(**variables)
             for template, variables in self.examples
-        )
\ No newline at end of file
+        )
+
+    def render_segments(self) -> List[Segment]:
+        """Render all examples into role segments, equivalent to split_roles(self.render())"""
+        parts = []
+        for i, (template, variables) in enumerate(self.examples):
+            if i > 0:
+                parts.append("\n")
+            parts.append(template.render_segments(variables))
+        return concat_segments(*parts)
\ No newline at end of file
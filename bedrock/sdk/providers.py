@@ -0,0 +1,372 @@
+from functools import lru_cache
+from typing import Dict, List, Optional, Union
+
+ParsedPrompt = Dict[str, Union[str, List[str]]]
+
+
+class ProviderAdapter:
+    """
+    invoke_model handling for one model family.
+
+    Adapters own everything that differs between providers on the invoke_model
+    path: prompt formatting, request bodies, response parsing and stream chunk
+    decoding. This base class implements the Amazon Titan format, which is also
+    the fallback for unknown model ids.
+
+    Attributes:
+        name (str): Provider name
+        converse_prefill (bool): The Converse API accepts a trailing assistant prefill
+    """
+    name = "amazon"
+    converse_prefill = False
+
+    def format_prompt(self, parsed_prompt: ParsedPrompt) -> str:
+        """Format system/user/assistant components as a single prompt string"""
+        prompt = ""
+
+        if parsed_prompt["system"]:
+            prompt += f"<<system>>\n{parsed_prompt['system']}\n\n"
+
+        for i in range(max(len(parsed_prompt["user"]), len(parsed_prompt["assistant"]))):
+            if i < len(parsed_prompt["user"]):
+                prompt += f"<<user>>\n{parsed_prompt['user'][i]}\n\n"
+            if i < len(parsed_prompt["assistant"]):
+                prompt += f"<<assistant>>\n{parsed_prompt['assistant'][i]}\n\n"
+
+        return prompt
+
+    def format_history(self, system: Optional[str], messages: List[Dict[str, str]]) -> str:
+        """Format conversation history messages as a single string"""
+        formatted = ""
+        if system:
+            formatted += f"<<system>>\n{system}\n"
+
+        for msg in messages:
+            formatted += f"<<{msg['role']}>>\n{msg['content']}\n"
+        return formatted
+
+    def build_body(self, prompt: str, model_config) -> Dict:
+        """Build the invoke_model request body"""
+        config = {
+            "maxTokenCount": model_config.max_tokens,
+            "temperature": model_config.temperature,
+            "topP": model_config.top_p
+        }
+        if model_config.stop_sequences:
+            config["stopSequences"] = list(model_config.stop_sequences)
+        return {"inputText": prompt, "textGenerationConfig": config}
+
+    def converse_fields(self, model_config) -> Dict:
+        """additionalModelRequestFields for parameters the Converse inferenceConfig lacks"""
+        return {}
+
+    def batch_body(self, system: Optional[str], messages: List[Dict[str, str]], model_config) -> Dict:
+        """
+        Native request body for a batch inference (CreateModelInvocationJob) record
+
+        Args:
+            system: System prompt, if any
+            messages: Alternating user/assistant role/content text messages
+
+        Raises:
+            ValueError: If batch records can't be built for this provider
+        """
+        raise ValueError(f"Batch inference records are not supported for {self.name} models")
+
+    def _prompt_batch_body(self, system: Optional[str], messages: List[Dict[str, str]], model_config) -> Dict:
+        """batch_body for models whose native body is a single formatted prompt"""
+        parsed_prompt = {
+            "system": system or "",
+            "user": [msg["content"] for msg in messages if msg["role"] == "user"],
+            "assistant": [msg["content"] for msg in messages if msg["role"] == "assistant"]
+        }
+        return self.build_body(self.format_prompt(parsed_prompt), model_config)
+
+    def parse_response(self, body: Dict) -> str:
+        """Extract generated text from a decoded invoke_model response body"""
+        return body['results'][0]['outputText']
+
+    def decode_stream_chunk(self, chunk: Dict) -> str:
+        """Extract generated text from a decoded invoke_model_with_response_stream chunk"""
+        return chunk.get('outputText', "")
+
+
+class NovaAdapter(ProviderAdapter):
+    name = "amazon.nova"
+    converse_prefill = True
+
+    def converse_fields(self, model_config) -> Dict:
+        if model_config.top_k is None:
+            return {}
+        return {"inferenceConfig": {"topK": model_config.top_k}}
+
+    def batch_body(self, system: Optional[str], messages: List[Dict[str, str]], model_config) -> Dict:
+        config = {
+            "maxTokens": model_config.max_tokens,
+            "temperature": model_config.temperature,
+            "topP": model_config.top_p
+        }
+        if model_config.stop_sequences:
+            config["stopSequences"] = list(model_config.stop_sequences)
+        if model_config.top_k is not None:
+            config["topK"] = model_config.top_k
+        body = {
+            "schemaVersion": "messages-v1",
+            "messages": [{"role": msg["role"], "content": [{"text": msg["content"]}]} for msg in messages],
+            "inferenceConfig": config
+        }
+        if system:
+            body["system"] = [{"text": system}]
+        return body
+
+
+class LlamaAdapter(ProviderAdapter):
+    name = "meta"
+
+    def format_prompt(self, parsed_prompt: ParsedPrompt) -> str:
+        prompt = "<|begin_of_text|>"
+
+        if parsed_prompt["system"]:
+            prompt += f"<|start_header_id|>system<|end_header_id|>\n{parsed_prompt['system']}<|eot_id|>\n"
+
+        for i in range(max(len(parsed_prompt["user"]), len(parsed_prompt["assistant"]))):
+            if i < len(parsed_prompt["user"]):
+                prompt += f"<|start_header_id|>user<|end_header_id|>\n{parsed_prompt['user'][i]}<|eot_id|>\n"
+            if i < len(parsed_prompt["assistant"]):
+                prompt += f"<|start_header_id|>assistant<|end_header_id|>\n{parsed_prompt['assistant'][i]}<|eot_id|>\n"
+
+        return prompt
+
+    def format_history(self, system: Optional[str], messages: List[Dict[str, str]]) -> str:
+        formatted = "<|begin_of_text|>"
+        if system:
+            formatted += f"<|start_header_id|>system<|end_header_id|>\n{system}<|eot_id|>\n"
+
+        for msg in messages:
+            formatted += f"<|start_header_id|>{msg['role']}<|end_header_id|>\n{msg['content']}<|eot_id|>\n"
+        return formatted
+
+    def build_body(self, prompt: str, model_config) -> Dict:
+        return {
+            "prompt": prompt,
+            "max_gen_len": model_config.max_tokens,
+            "temperature": model_config.temperature,
+            "top_p": model_config.top_p
+        }
+
+    def parse_response(self, body: Dict) -> str:
+        return body['generation']
+
+    def decode_stream_chunk(self, chunk: Dict) -> str:
+        return chunk.get('generation', "")
+
+    def batch_body(self, system: Optional[str], messages: List[Dict[str, str]], model_config) -> Dict:
+        return self._prompt_batch_body(system, messages, model_config)
+
+
+class MistralAdapter(ProviderAdapter):
+    name = "mistral"
+
+    def format_prompt(self, parsed_prompt: ParsedPrompt) -> str:
+        prompt = ""
+
+        if parsed_prompt["system"]:
+            prompt += f"<<SYS>>{parsed_prompt['system']}<</SYS>>"
+
+        prompt += "<s>[INST]"
+
+        for i in range(max(len(parsed_prompt["user"]), len(parsed_prompt["assistant"]))):
+            if i < len(parsed_prompt["user"]):
+                if i > 0:
+                    prompt += "</s><s>[INST]"
+                prompt += parsed_prompt["user"][i]
+            if i < len(parsed_prompt["assistant"]):
+                prompt += "[/INST]" + parsed_prompt["assistant"][i]
+
+        return prompt
+
+    def format_history(self, system: Optional[str], messages: List[Dict[str, str]]) -> str:
+        formatted = ""
+        if system:
+            formatted += f"<<SYS>>{system}<</SYS>>"
+
+        formatted += "<s>[INST]"
+        for i, msg in enumerate(messages):
+            if msg["role"] == "user":
+                if i > 0:
+                    formatted += "</s><s>[INST]"
+                formatted += msg["content"]
+            else:
+                formatted += "[/INST]" + msg["content"]
+        return formatted
+
+    def build_body(self, prompt: str, model_config) -> Dict:
+        body = {
+            "prompt": prompt,
+            "max_tokens": model_config.max_tokens,
+            "temperature": model_config.temperature,
+            "top_p": model_config.top_p
+        }
+        if model_config.stop_sequences:
+            body["stop"] = list(model_config.stop_sequences)
+        if model_config.top_k is not None:
+            body["top_k"] = model_config.top_k
+        return body
+
+    def converse_fields(self, model_config) -> Dict:
+        return {} if model_config.top_k is None else {"top_k": model_config.top_k}
+
+    def parse_response(self, body: Dict) -> str:
+        return body['outputs'][0]['text']
+
+    def decode_stream_chunk(self, chunk: Dict) -> str:
+        outputs = chunk.get('outputs') or [{}]
+        return outputs[0].get('text', "")
+
+    def batch_body(self, system: Optional[str], messages: List[Dict[str, str]], model_config) -> Dict:
+        return self._prompt_batch_body(system, messages, model_config)
+
+
+class AnthropicAdapter(ProviderAdapter):
+    name = "anthropic"
+    converse_prefill = True
+
+    def format_prompt(self, parsed_prompt: ParsedPrompt) -> str:
+        prompt = ""
+
+        if parsed_prompt["system"]:
+            prompt += f"\n\nHuman: {parsed_prompt['system']}\n\nAssistant: Understood. I'll follow those instructions.\n\n"
+
+        for i in range(max(len(parsed_prompt["user"]), len(parsed_prompt["assistant"]))):
+            if i < len(parsed_prompt["user"]):
+                prompt += f"Human: {parsed_prompt['user'][i]}\n\n"
+            if i < len(parsed_prompt["assistant"]):
+                prompt += f"Assistant: {parsed_prompt['assistant'][i]}\n\n"
+
+        return prompt
+
+    def build_body(self, prompt: str, model_config) -> Dict:
+        body = {
+            "prompt": prompt,
+            "max_tokens_to_sample": model_config.max_tokens,
+            "temperature": model_config.temperature,
+            "top_p": model_config.top_p
+        }
+        if model_config.stop_sequences:
+            body["stop_sequences"] = list(model_config.stop_sequences)
+        if model_config.top_k is not None:
+            body["top_k"] = model_config.top_k
+        return body
+
+    def converse_fields(self, model_config) -> Dict:
+        return {} if model_config.top_k is None else {"top_k": model_config.top_k}
+
+    def parse_response(self, body: Dict) -> str:
+        return body['completion']
+
+    def decode_stream_chunk(self, chunk: Dict) -> str:
+        return chunk.get('completion', "")
+
+    def batch_body(self, system: Optional[str], messages: List[Dict[str, str]], model_config) -> Dict:
+        # Messages API body, accepted by every Claude model on Bedrock
+        body = {
+            "anthropic_version": "bedrock-2023-05-31",
+            "max_tokens": model_config.max_tokens,
+            "temperature": model_config.temperature,
+            "top_p": model_config.top_p,
+            "messages": [
+                {"role": msg["role"], "content": [{"type": "text", "text": msg["content"]}]}
+                for msg in messages
+            ]
+        }
+        if system:
+            body["system"] = system
+        if model_config.stop_sequences:
+            body["stop_sequences"] = list(model_config.stop_sequences)
+        if model_config.top_k is not None:
+            body["top_k"] = model_config.top_k
+        return body
+
+
+class AI21Adapter(ProviderAdapter):
+    name = "ai21"
+
+    def build_body(self, prompt: str, model_config) -> Dict:
+        body = {
+            "prompt": prompt,
+            "maxTokens": model_config.max_tokens,
+            "temperature": model_config.temperature,
+            "topP": model_config.top_p
+        }
+        if model_config.stop_sequences:
+            body["stopSequences"] = list(model_config.stop_sequences)
+        return body
+
+    def parse_response(self, body: Dict) -> str:
+        return body['completions'][0]['data']['text']
+
+    def decode_stream_chunk(self, chunk: Dict) -> str:
+        completions = chunk.get('completions') or [{}]
+        return completions[0].get('data', {}).get('text', "")
+
+
+class CohereAdapter(ProviderAdapter):
+    name = "cohere"
+
+    def build_body(self, prompt: str, model_config) -> Dict:
+        body = {
+            "prompt": prompt,
+            "max_tokens": model_config.max_tokens,
+            "temperature": model_config.temperature,
+            "p": model_config.top_p
+        }
+        if model_config.stop_sequences:
+            body["stop_sequences"] = list(model_config.stop_sequences)
+        if model_config.top_k is not None:
+            body["k"] = model_config.top_k
+        return body
+
+    def converse_fields(self, model_config) -> Dict:
+        return {} if model_config.top_k is None else {"k": model_config.top_k}
+
+    def parse_response(self, body: Dict) -> str:
+        return body['generations'][0]['text']
+
+    def decode_stream_chunk(self, chunk: Dict) -> str:
+        if 'generations' in chunk:
+            return chunk['generations'][0].get('text', "")
+        return chunk.get('text', "")
+
+
+DEFAULT_ADAPTER = ProviderAdapter()
+
+# Model id substrings mapped to adapters; the longest matching pattern wins
+_REGISTRY: Dict[str, ProviderAdapter] = {
+    "amazon.nova": NovaAdapter(),
+    "llama": LlamaAdapter(),
+    "mistral": MistralAdapter(),
+    "anthropic": AnthropicAdapter(),
+    "ai21": AI21Adapter(),
+    "cohere": CohereAdapter(),
+}
+
+
+def register_provider(pattern: str, adapter: ProviderAdapter):
+    """
+    Register an adapter for model ids containing `pattern`
+
+    Args:
+        pattern: Model id substring, e.g. "writer.palmyra"
+        adapter: Adapter instance handling matching models
+    """
+    _REGISTRY[pattern] = adapter
+    get_provider.cache_clear()
+
+
+@lru_cache(maxsize=256)
+def get_provider(model_id: str) -> ProviderAdapter:
+    """Resolve the adapter for a model id, falling back to the Amazon Titan format"""
+    matches = [pattern for pattern in _REGISTRY if pattern in model_id]
+    if not matches:
+        return DEFAULT_ADAPTER
+    return _REGISTRY[max(matches, key=len)]
@@ -0,0 +1,196 @@
+from dataclasses import dataclass, field, replace
+from typing import Awaitable, Callable, List, Optional, TypeVar
+import asyncio
+import random
+import threading
+import time
+from botocore.exceptions import ClientError, ConnectTimeoutError, ReadTimeoutError
+
+T = TypeVar("T")
+
+THROTTLING_ERROR_CODES = frozenset({
+    "ThrottlingException",
+    "TooManyRequestsException",
+})
+
+RETRYABLE_ERROR_CODES = THROTTLING_ERROR_CODES | frozenset({
+    "ModelNotReadyException",
+    "ServiceUnavailableException",
+    "InternalServerException",
+    "InternalFailure",
+    "RequestTimeout",
+})
+
+
+def error_code(error: Exception) -> str:
+    """Get the AWS error code for an exception, or its class name"""
+    if isinstance(error, ClientError):
+        return error.response.get("Error", {}).get("Code", type(error).__name__)
+    return type(error).__name__
+
+
+def is_throttling_error(error: Exception) -> bool:
+    """Check whether an exception is a Bedrock throttling error"""
+    if isinstance(error, ClientError):
+        return error_code(error) in THROTTLING_ERROR_CODES
+    return "ThrottlingException" in str(error)
+
+
+class RetryBudget:
+    """
+    Token bucket shared across calls that caps retries to a fraction of traffic.
+
+    Each retry withdraws one token and each successful call deposits `ratio`
+    tokens, so during an outage retries stop once the burst `capacity` is spent
+    instead of multiplying load on an already struggling service.
+    """
+
+    def __init__(self, capacity: float = 50.0, ratio: float = 0.1):
+        """
+        Args:
+            capacity: Maximum number of retries that can be banked
+            ratio: Retries earned per successful call
+        """
+        self.capacity = capacity
+        self.ratio = ratio
+        self.tokens = capacity
+        self._lock = threading.Lock()
+
+    def withdraw(self) -> bool:
+        """Take one retry token, returning False if the budget is exhausted"""
+        with self._lock:
+            if self.tokens < 1:
+                return False
+            self.tokens -= 1
+            return True
+
+    def deposit(self):
+        """Credit the budget for a successful call"""
+        with self._lock:
+            self.tokens = min(self.capacity, self.tokens + self.ratio)
+
+
+@dataclass
+class RetryStats:
+    """Retry accounting for a single call"""
+    attempts: int = 0
+    retries: int = 0
+    sleep_time: float = 0.0
+    errors: List[str] = field(default_factory=list)
+    started_at: float = field(default_factory=time.monotonic)
+
+    @property
+    def elapsed(self) -> float:
+        """Seconds since the call started"""
+        return time.monotonic() - self.started_at
+
+
+@dataclass
+class RetryPolicy:
+    """
+    Exponential backoff with full jitter for Bedrock calls.
+
+    Attributes:
+        max_retries (int): Retries allowed per call
+        base_delay (float): Backoff base in seconds; attempt n sleeps up to base_delay * 2**n
+        max_delay (float): Cap on a single backoff sleep
+        deadline (Optional[float]): Seconds after which a call is no longer retried
+        budget (Optional[RetryBudget]): Retry budget shared across calls
+        retryable_codes (frozenset): AWS error codes that are retried
+    """
+    max_retries: int = 4
+    base_delay: float = 1.0
+    max_delay: float = 20.0
+    deadline: Optional[float] = None
+    budget: Optional[RetryBudget] = None
+    retryable_codes: frozenset = RETRYABLE_ERROR_CODES
+
+    def without_retries(self) -> "RetryPolicy":
+        """Copy of this policy that never retries"""
+        return replace(self, max_retries=0)
+
+    def is_retryable(self, error: Exception) -> bool:
+        """Classify an exception as transient"""
+        if isinstance(error, (ReadTimeoutError, ConnectTimeoutError)):
+            return True
+        if isinstance(error, ClientError):
+            if error_code(error) in self.retryable_codes:
+                return True
+            status = error.response.get("ResponseMetadata", {}).get("HTTPStatusCode", 0)
+            return status >= 500
+        return is_throttling_error(error)
+
+    def backoff(self, retry: int) -> float:
+        """Full-jitter backoff for the given retry number (0-based)"""
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** retry))
+
+    def next_delay(self, error: Exception, stats: RetryStats) -> Optional[float]:
+        """
+        Decide whether to retry after an error
+
+        Returns:
+            Seconds to sleep before the next attempt, or None to give up
+        """
+        stats.errors.append(error_code(error))
+        if not self.is_retryable(error) or stats.retries >= self.max_retries:
+            return None
+        delay = self.backoff(stats.retries)
+        if self.deadline is not None and stats.elapsed + delay > self.deadline:
+            return None
+        if self.budget is not None and not self.budget.withdraw():
+            return None
+        stats.retries += 1
+        stats.sleep_time += delay
+        print(f"{error_code(error)} detected, waiting {delay:.2f} seconds before retry {stats.retries}/{self.max_retries}...")
+        return delay
+
+    def record_success(self):
+        """Credit the retry budget after a successful call"""
+        if self.budget is not None:
+            self.budget.deposit()
+
+    def call(
+        self,
+        fn: Callable[[], T],
+        stats: Optional[RetryStats] = None,
+        on_retry: Optional[Callable[[Exception, RetryStats], None]] = None
+    ) -> T:
+        """Call fn, retrying transient errors according to this policy"""
+        stats = stats if stats is not None else RetryStats()
+        while True:
+            stats.attempts += 1
+            try:
+                result = fn()
+            except Exception as e:
+                delay = self.next_delay(e, stats)
+                if delay is None:
+                    raise
+                if on_retry is not None:
+                    on_retry(e, stats)
+                time.sleep(delay)
+                continue
+            self.record_success()
+            return result
+
+    async def acall(
+        self,
+        fn: Callable[[], Awaitable[T]],
+        stats: Optional[RetryStats] = None,
+        on_retry: Optional[Callable[[Exception, RetryStats], None]] = None
+    ) -> T:
+        """Await fn(), retrying transient errors according to this policy"""
+        stats = stats if stats is not None else RetryStats()
+        while True:
+            stats.attempts += 1
+            try:
+                result = await fn()
+            except Exception as e:
+                delay = self.next_delay(e, stats)
+                if delay is None:
+                    raise
+                if on_retry is not None:
+                    on_retry(e, stats)
+                await asyncio.sleep(delay)
+                continue
+            self.record_success()
+            return result
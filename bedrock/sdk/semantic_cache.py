@@ -0,0 +1,235 @@
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+import random
+import re
+import threading
+import time
+import unicodedata
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_PUNCTUATION = re.compile(r"[^\w\s]")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_text(text: str) -> str:
+    """Lowercase, NFKC-normalize, drop punctuation and collapse whitespace"""
+    text = unicodedata.normalize("NFKC", text).lower()
+    text = _PUNCTUATION.sub(" ", text)
+    return _WHITESPACE.sub(" ", text).strip()
+
+
+def shingles(text: str, size: int = 4) -> Set[str]:
+    """Character n-grams of already normalized text"""
+    if len(text) <= size:
+        return {text}
+    return {text[i:i + size] for i in range(len(text) - size + 1)}
+
+
+class MinHasher:
+    """MinHash signatures estimating the Jaccard similarity of shingle sets"""
+
+    def __init__(self, num_perm: int = 64, seed: int = 1):
+        """
+        Args:
+            num_perm: Hash functions per signature; more is slower but more accurate
+            seed: Seed for the hash function coefficients
+        """
+        rng = random.Random(seed)
+        self.num_perm = num_perm
+        self._coefficients = [
+            (rng.randrange(1, _MERSENNE_PRIME), rng.randrange(0, _MERSENNE_PRIME))
+            for _ in range(num_perm)
+        ]
+
+    def signature(self, items: Iterable[str]) -> Tuple[int, ...]:
+        hashes = [hash(item) & 0xFFFFFFFFFFFFFFFF for item in items]
+        return tuple(
+            min((a * h + b) % _MERSENNE_PRIME for h in hashes)
+            for a, b in self._coefficients
+        )
+
+    @staticmethod
+    def similarity(a: Tuple[int, ...], b: Tuple[int, ...]) -> float:
+        """Estimated Jaccard similarity of two signatures"""
+        return sum(x == y for x, y in zip(a, b)) / len(a)
+
+
+@dataclass
+class _SemanticEntry:
+    scope: str
+    signature: Tuple[int, ...]
+    value: str
+    created_at: float
+    bands: List[Tuple]
+
+
+@dataclass
+class SemanticCacheStats:
+    """Lookup counters for a SemanticCache"""
+    hits: int = 0
+    exact_hits: int = 0
+    misses: int = 0
+    expired: int = 0
+    evictions: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+
+class SemanticCache:
+    """
+    Near-duplicate response cache for BedrockClient.converse.
+
+    The fuzzy part of a request (a template's variables, or the last paragraph
+    of a plain prompt's final user turn) is normalized, split into character
+    shingles and MinHashed. Signatures are indexed with locality-sensitive
+    hashing, so a lookup only compares against entries sharing a band. A stored
+    answer is returned when its estimated Jaccard similarity reaches
+    `threshold`. Everything else about the request (model, inference config,
+    template text or prompt context, exact variables, few-shot examples) must
+    match exactly.
+
+    Templates opt in by name. Calls that carry conversation history are never
+    served from this cache, since the same question can mean something
+    different mid-conversation.
+
+    Example:
+        cache = SemanticCache(threshold=0.9, ttl=3600)
+        cache.enable("faq", fields=["question"])
+        client = BedrockClient(semantic_cache=cache)
+    """
+
+    def __init__(
+        self,
+        threshold: float = 0.9,
+        max_entries: int = 4096,
+        ttl: Optional[float] = None,
+        num_perm: int = 64,
+        bands: int = 16,
+        shingle_size: int = 4,
+        plain_prompts: bool = False
+    ):
+        """
+        Args:
+            threshold: Estimated Jaccard similarity needed for a hit, between 0 and 1
+            max_entries: Entries kept before the least recently used is evicted
+            ttl: Seconds an entry stays valid, or None for no expiry
+            num_perm: MinHash functions per signature; must be divisible by bands
+            bands: LSH bands; more bands find less similar candidates
+            shingle_size: Characters per shingle
+            plain_prompts: Also cache prompts passed as plain strings
+        """
+        if num_perm % bands:
+            raise ValueError("num_perm must be divisible by bands")
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.bands = bands
+        self.shingle_size = shingle_size
+        self.plain_prompts = plain_prompts
+        self.hasher = MinHasher(num_perm)
+        self.stats = SemanticCacheStats()
+        self._rows = num_perm // bands
+        self._templates: Dict[str, Optional[List[str]]] = {}
+        self._entries: "OrderedDict[int, _SemanticEntry]" = OrderedDict()
+        self._index: Dict[Tuple, Set[int]] = {}
+        self._next_id = 0
+        self._lock = threading.Lock()
+
+    def enable(self, template_name: str, fields: Optional[List[str]] = None):
+        """
+        Opt a prompt template in to semantic caching
+
+        Args:
+            template_name: PromptTemplate.name
+            fields: Variables matched approximately; the rest must match exactly.
+                All variables are matched approximately if not given.
+        """
+        self._templates[template_name] = list(fields) if fields is not None else None
+
+    def disable(self, template_name: str):
+        self._templates.pop(template_name, None)
+
+    def is_enabled(self, template_name: str) -> bool:
+        return template_name in self._templates
+
+    def fields_for(self, template_name: str) -> Optional[List[str]]:
+        """Approximately matched variables of an enabled template, or None for all of them"""
+        return self._templates.get(template_name)
+
+    def _signature(self, text: str) -> Tuple[int, ...]:
+        return self.hasher.signature(shingles(normalize_text(text), self.shingle_size))
+
+    def _band_keys(self, scope: str, signature: Tuple[int, ...]) -> List[Tuple]:
+        rows = self._rows
+        return [(scope, band, signature[band * rows:(band + 1) * rows]) for band in range(self.bands)]
+
+    def _remove(self, entry_id: int):
+        entry = self._entries.pop(entry_id)
+        for band_key in entry.bands:
+            ids = self._index.get(band_key)
+            if ids is not None:
+                ids.discard(entry_id)
+                if not ids:
+                    del self._index[band_key]
+
+    def get(self, scope: str, text: str) -> Optional[str]:
+        """
+        Find a stored response for text similar to `text`
+
+        Args:
+            scope: Exact-match part of the request, e.g. from cache_key()
+            text: Approximately matched part of the request
+        """
+        signature = self._signature(text)
+        with self._lock:
+            candidates: Set[int] = set()
+            for band_key in self._band_keys(scope, signature):
+                candidates.update(self._index.get(band_key, ()))
+            best_id, best_similarity = None, 0.0
+            for entry_id in candidates:
+                entry = self._entries[entry_id]
+                if self.ttl is not None and time.time() - entry.created_at > self.ttl:
+                    self._remove(entry_id)
+                    self.stats.expired += 1
+                    continue
+                similarity = MinHasher.similarity(signature, entry.signature)
+                if similarity > best_similarity:
+                    best_id, best_similarity = entry_id, similarity
+            if best_id is None or best_similarity < self.threshold:
+                self.stats.misses += 1
+                return None
+            self.stats.hits += 1
+            if best_similarity == 1.0:
+                self.stats.exact_hits += 1
+            self._entries.move_to_end(best_id)
+            return self._entries[best_id].value
+
+    def set(self, scope: str, text: str, value: str):
+        """Store a response for the approximately matched `text` within `scope`"""
+        signature = self._signature(text)
+        band_keys = self._band_keys(scope, signature)
+        with self._lock:
+            entry_id = self._next_id
+            self._next_id += 1
+            self._entries[entry_id] = _SemanticEntry(scope, signature, value, time.time(), band_keys)
+            for band_key in band_keys:
+                self._index.setdefault(band_key, set()).add(entry_id)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+                self.stats.evictions += 1
+
+    def reset_stats(self):
+        with self._lock:
+            self.stats = SemanticCacheStats()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._index.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -0,0 +1,150 @@
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Callable, Optional
+import asyncio
+import threading
+import time
+
+
+@dataclass
+class Session:
+    """A conversation held in a SessionStore"""
+    session_id: str
+    history: Any  # ConversationHistory
+    lock: threading.Lock = field(default_factory=threading.Lock)
+    async_lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+    last_used: float = field(default_factory=time.time)
+    tokens: int = 0
+
+
+@dataclass
+class SessionStoreStats:
+    """Session counters for a SessionStore"""
+    created: int = 0
+    expired: int = 0
+    evicted: int = 0
+
+
+def _new_history():
+    # Imported here because bedrock_client imports this module
+    from bedrock_sdk.bedrock_client import ConversationHistory
+    return ConversationHistory()
+
+
+class SessionStore:
+    """
+    Thread-safe store of per-session conversation histories.
+
+    Lets one BedrockClient, and its connection pool, serve many concurrent
+    conversations via converse(..., session_id=...). Calls for the same
+    session are serialized by a per-session lock; different sessions run in
+    parallel. Sessions idle for longer than `ttl` start over, and the least
+    recently used are evicted once `max_sessions` or the `max_tokens` memory
+    cap is exceeded. Sessions with a call in progress are never evicted.
+
+    Example:
+        client = BedrockClient(session_store=SessionStore(max_sessions=10000, ttl=1800))
+        client.converse("Hi, I'm Sam", model_config, session_id="user-42")
+    """
+
+    def __init__(
+        self,
+        max_sessions: int = 10000,
+        ttl: Optional[float] = 3600.0,
+        max_tokens: Optional[int] = None,
+        history_factory: Callable[[], Any] = _new_history
+    ):
+        """
+        Args:
+            max_sessions: Sessions kept before the least recently used is evicted
+            ttl: Seconds a session may sit idle before it is discarded, or None to keep it
+            max_tokens: Cap on the estimated tokens held across all histories
+            history_factory: Creates the ConversationHistory for a new session,
+                e.g. to set max_tokens or a summarizer
+        """
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self.max_tokens = max_tokens
+        self.history_factory = history_factory
+        self.stats = SessionStoreStats()
+        self.total_tokens = 0
+        self._sessions: "OrderedDict[str, Session]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _expired(self, session: Session, now: float) -> bool:
+        return self.ttl is not None and now - session.last_used > self.ttl
+
+    def _remove(self, session_id: str):
+        session = self._sessions.pop(session_id)
+        self.total_tokens -= session.tokens
+
+    def session(self, session_id: str) -> Session:
+        """Get a session, creating it if it is missing or has expired"""
+        now = time.time()
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is not None and self._expired(session, now) and not session.lock.locked():
+                self._remove(session_id)
+                self.stats.expired += 1
+                session = None
+            if session is None:
+                session = self._sessions[session_id] = Session(session_id, self.history_factory())
+                self.stats.created += 1
+            session.last_used = now
+            self._sessions.move_to_end(session_id)
+            self._evict(now, keep=session_id)
+            return session
+
+    def get(self, session_id: str):
+        """ConversationHistory of a session, creating the session if needed"""
+        return self.session(session_id).history
+
+    def update(self, session_id: str):
+        """Re-count a session's tokens after a turn and enforce the caps"""
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                return
+            tokens = session.history.token_count
+            self.total_tokens += tokens - session.tokens
+            session.tokens = tokens
+            session.last_used = time.time()
+            self._evict(session.last_used, keep=session_id)
+
+    def _evict(self, now: float, keep: Optional[str] = None):
+        """Drop expired sessions, then least recently used ones over the caps, except `keep`"""
+        victims = []
+        count, tokens = len(self._sessions), self.total_tokens
+        for session_id, session in self._sessions.items():
+            over = count > self.max_sessions or (self.max_tokens is not None and tokens > self.max_tokens)
+            expired = self._expired(session, now)
+            if not over and not expired:
+                break
+            if session_id == keep or session.lock.locked() or session.async_lock.locked():
+                continue
+            victims.append((session_id, expired))
+            count -= 1
+            tokens -= session.tokens
+        for session_id, expired in victims:
+            self._remove(session_id)
+            if expired:
+                self.stats.expired += 1
+            else:
+                self.stats.evicted += 1
+
+    def drop(self, session_id: str):
+        """Forget a session"""
+        with self._lock:
+            if session_id in self._sessions:
+                self._remove(session_id)
+
+    def clear(self):
+        with self._lock:
+            self._sessions.clear()
+            self.total_tokens = 0
+
+    def __contains__(self, session_id: str) -> bool:
+        return session_id in self._sessions
+
+    def __len__(self) -> int:
+        return len(self._sessions)
@@ -0,0 +1,285 @@
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterator, List, Optional
+import asyncio
+import threading
+
+
+@dataclass
+class SingleFlightStats:
+    """Upstream calls made and calls saved by coalescing"""
+    calls: int = 0
+    coalesced: int = 0
+
+    @property
+    def coalesce_rate(self) -> float:
+        total = self.calls + self.coalesced
+        return self.coalesced / total if total else 0.0
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+        self.followers = 0
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent identical calls into one upstream call.
+
+    The first caller for a key runs the call; callers arriving with the same
+    key while it is in flight wait for it and share its result or error. Once
+    the call returns the key is forgotten, so later callers start a new call.
+
+    Example:
+        client = BedrockClient(single_flight=SingleFlight())
+        client.converse_many([prompt] * 8, model_config)  # duplicates share one call
+        print(client.single_flight.stats.coalesced)
+    """
+
+    def __init__(self):
+        self.stats = SingleFlightStats()
+        self._calls: Dict[str, _Call] = {}
+        self._async_calls: Dict[str, asyncio.Future] = {}
+        self._async_followers: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def do(
+        self,
+        key: str,
+        fn: Callable[[], Any],
+        on_shared: Optional[Callable[[Any, int], None]] = None
+    ):
+        """
+        Run fn, or wait for an in-flight call with the same key
+
+        Args:
+            key: Identifies identical calls
+            fn: Makes the call
+            on_shared: Called with the result and the number of callers sharing
+                it, before any of them get it
+
+        Returns:
+            Tuple of (result, whether this caller made the call)
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.stats.calls += 1
+            else:
+                call.followers += 1
+                self.stats.coalesced += 1
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, False
+        try:
+            call.result = fn()
+            return call.result, True
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            try:
+                if call.error is None and on_shared is not None:
+                    on_shared(call.result, 1 + call.followers)
+            finally:
+                call.done.set()
+
+    async def ado(
+        self,
+        key: str,
+        fn: Callable[[], Awaitable[Any]],
+        on_shared: Optional[Callable[[Any, int], None]] = None
+    ):
+        """Async counterpart of do(); calls are coalesced within one event loop"""
+        with self._lock:
+            future = self._async_calls.get(key)
+            leader = future is None
+            if leader:
+                future = self._async_calls[key] = asyncio.get_running_loop().create_future()
+                self._async_followers[key] = 0
+                self.stats.calls += 1
+            else:
+                self._async_followers[key] += 1
+                self.stats.coalesced += 1
+        if not leader:
+            return await asyncio.shield(future), False
+        try:
+            result = await fn()
+            with self._lock:
+                del self._async_calls[key]
+                followers = self._async_followers.pop(key)
+            if on_shared is not None:
+                on_shared(result, 1 + followers)
+            future.set_result(result)
+            return result, True
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            # Mark the exception retrieved when nobody else was waiting
+            future.exception()
+            raise
+        finally:
+            with self._lock:
+                if self._async_calls.get(key) is future:
+                    del self._async_calls[key]
+                    del self._async_followers[key]
+
+
+class StreamTee:
+    """
+    Shares one chunk iterator between several readers.
+
+    Chunks are buffered, and whichever reader gets ahead pulls the next chunk
+    from the upstream iterator, so every reader sees the full stream. Once
+    expect() has been told how many readers share the stream, the upstream is
+    closed when the last of them is closed before the end.
+    """
+
+    def __init__(self, chunks: Iterator[str]):
+        self._upstream = iter(chunks)
+        self._chunks: List[str] = []
+        self._finished = False
+        self._error: Optional[BaseException] = None
+        self._open: Optional[int] = None
+        self._lock = threading.Lock()
+
+    def expect(self, readers: int):
+        """Set the number of readers sharing the stream"""
+        with self._lock:
+            self._open = readers
+
+    def _release(self):
+        """A reader was closed; close the upstream after the last one"""
+        with self._lock:
+            if self._open is None:
+                return
+            self._open -= 1
+            if self._open > 0 or self._finished or self._error is not None:
+                return
+            self._finished = True
+            close = getattr(self._upstream, "close", None)
+            if close is not None:
+                close()
+
+    def _pull(self, index: int) -> bool:
+        """Make chunk `index` available, returning False at the end of the stream"""
+        with self._lock:
+            while index >= len(self._chunks):
+                if self._error is not None:
+                    raise self._error
+                if self._finished:
+                    return False
+                try:
+                    self._chunks.append(next(self._upstream))
+                except StopIteration:
+                    self._finished = True
+                except BaseException as e:
+                    self._error = e
+            return True
+
+    def reader(self) -> "_TeeReader":
+        return _TeeReader(self)
+
+
+class _TeeReader:
+    """One reader's position in a StreamTee"""
+
+    def __init__(self, tee: StreamTee):
+        self._tee = tee
+        self._index = 0
+        self._closed = False
+
+    def __iter__(self) -> "_TeeReader":
+        return self
+
+    def __next__(self) -> str:
+        tee = self._tee
+        if self._closed or not (self._index < len(tee._chunks) or tee._pull(self._index)):
+            raise StopIteration
+        self._index += 1
+        return tee._chunks[self._index - 1]
+
+    def close(self):
+        if not self._closed:
+            self._closed = True
+            self._tee._release()
+
+
+class AsyncStreamTee:
+    """Async counterpart of StreamTee"""
+
+    def __init__(self, chunks: AsyncIterator[str]):
+        self._upstream = chunks.__aiter__()
+        self._chunks: List[str] = []
+        self._finished = False
+        self._error: Optional[BaseException] = None
+        self._open: Optional[int] = None
+        self._lock = asyncio.Lock()
+
+    def expect(self, readers: int):
+        """Set the number of readers sharing the stream"""
+        self._open = readers
+
+    async def _release(self):
+        async with self._lock:
+            if self._open is None:
+                return
+            self._open -= 1
+            if self._open > 0 or self._finished or self._error is not None:
+                return
+            self._finished = True
+            close = getattr(self._upstream, "aclose", None)
+            if close is not None:
+                await close()
+
+    async def _pull(self, index: int) -> bool:
+        async with self._lock:
+            while index >= len(self._chunks):
+                if self._error is not None:
+                    raise self._error
+                if self._finished:
+                    return False
+                try:
+                    self._chunks.append(await self._upstream.__anext__())
+                except StopAsyncIteration:
+                    self._finished = True
+                except BaseException as e:
+                    self._error = e
+            return True
+
+    def reader(self) -> "_AsyncTeeReader":
+        return _AsyncTeeReader(self)
+
+
+class _AsyncTeeReader:
+    """One reader's position in an AsyncStreamTee"""
+
+    def __init__(self, tee: AsyncStreamTee):
+        self._tee = tee
+        self._index = 0
+        self._closed = False
+
+    def __aiter__(self) -> "_AsyncTeeReader":
+        return self
+
+    async def __anext__(self) -> str:
+        tee = self._tee
+        if self._closed or not (self._index < len(tee._chunks) or await tee._pull(self._index)):
+            raise StopAsyncIteration
+        self._index += 1
+        return tee._chunks[self._index - 1]
+
+    async def aclose(self):
+        if not self._closed:
+            self._closed = True
+            await self._tee._release()
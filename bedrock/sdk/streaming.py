@@ -0,0 +1,210 @@
+from typing import AsyncIterator, Callable, Dict, Iterator, List, Optional
+import time
+
+
+class _StreamTimings:
+    """Text accumulation and token timing shared by the sync and async streams"""
+
+    def __init__(
+        self,
+        metadata: Optional[Dict] = None,
+        on_complete: Optional[Callable[["_StreamTimings"], None]] = None,
+        started_at: Optional[float] = None,
+        on_end: Optional[Callable[[], None]] = None,
+        on_stop: Optional[Callable[["_StreamTimings"], None]] = None
+    ):
+        """
+        Args:
+            metadata: Dict the underlying stream fills with the final metadata event
+            on_complete: Called with this stream once it is fully consumed
+            started_at: time.monotonic() when the request was sent
+            on_end: Called once when the stream completes, is closed or fails,
+                after on_complete
+            on_stop: Called with this stream when it is stopped early with close()
+        """
+        self.metadata = metadata if metadata is not None else {}
+        self.on_complete = on_complete
+        self.on_end = on_end
+        self.on_stop = on_stop
+        self.started_at = started_at if started_at is not None else time.monotonic()
+        self.first_token_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.inter_token_latencies: List[float] = []
+        self.completed = False
+        self.stopped = False
+        self._chunks: List[str] = []
+        self._last_token_at: Optional[float] = None
+
+    def _on_chunk(self, chunk: str):
+        now = time.monotonic()
+        if self.first_token_at is None:
+            self.first_token_at = now
+        else:
+            self.inter_token_latencies.append(now - self._last_token_at)
+        self._last_token_at = now
+        self._chunks.append(chunk)
+
+    def _on_finish(self):
+        self.finished_at = time.monotonic()
+        self.completed = True
+        if self.on_complete is not None:
+            self.on_complete(self)
+
+    def _on_stop(self):
+        self.finished_at = time.monotonic()
+        if self.on_stop is not None:
+            self.on_stop(self)
+
+    def _end(self):
+        on_end = getattr(self, "on_end", None)
+        self.on_end = None
+        if on_end is not None:
+            on_end()
+
+    def __del__(self):
+        # An abandoned stream is reported like a closed one, and must still
+        # release whatever on_end guards
+        try:
+            if not (getattr(self, "completed", True) or getattr(self, "stopped", True)):
+                self.stopped = True
+                self._on_stop()
+        finally:
+            self._end()
+
+    @property
+    def text(self) -> str:
+        """Text received so far"""
+        return "".join(self._chunks)
+
+    @property
+    def usage(self) -> Dict[str, int]:
+        """Token usage from the final metadata event, empty until the stream ends"""
+        return self.metadata.get("usage", {})
+
+    @property
+    def time_to_first_token(self) -> Optional[float]:
+        """Seconds from sending the request to the first text chunk"""
+        if self.first_token_at is None:
+            return None
+        return self.first_token_at - self.started_at
+
+    @property
+    def mean_inter_token_latency(self) -> Optional[float]:
+        """Average seconds between consecutive text chunks"""
+        if not self.inter_token_latencies:
+            return None
+        return sum(self.inter_token_latencies) / len(self.inter_token_latencies)
+
+    @property
+    def total_time(self) -> Optional[float]:
+        """Seconds from sending the request to the end of the stream"""
+        if self.finished_at is None:
+            return None
+        return self.finished_at - self.started_at
+
+
+class StreamResponse(_StreamTimings):
+    """
+    Iterator of text chunks from a streaming converse call.
+
+    Accumulates the text as it is consumed. When the stream is exhausted the
+    turn is committed to conversation history and `usage`/`metadata` hold the
+    final metadata event. A stream stopped early with close(), or dropped
+    before the end, is reported to metrics hooks and the ledger with estimated
+    usage, since Bedrock sends none for it, but its partial turn is not added
+    to conversation history.
+
+    Example:
+        response = client.converse(prompt, config, stream=True)
+        for chunk in response:
+            print(chunk, end="")
+        print(response.time_to_first_token, response.usage)
+    """
+
+    def __init__(self, chunks: Iterator[str], **kwargs):
+        super().__init__(**kwargs)
+        self._iterator = iter(chunks)
+
+    def __iter__(self) -> "StreamResponse":
+        return self
+
+    def __next__(self) -> str:
+        try:
+            chunk = next(self._iterator)
+        except StopIteration:
+            if not self.completed:
+                try:
+                    self._on_finish()
+                finally:
+                    self._end()
+            raise
+        except BaseException:
+            self._end()
+            raise
+        self._on_chunk(chunk)
+        return chunk
+
+    def read(self) -> str:
+        """Consume the rest of the stream and return the full text"""
+        for _ in self:
+            pass
+        return self.text
+
+    def close(self):
+        """Stop the stream early, closing the connection so no more tokens are generated"""
+        if self.completed or self.stopped:
+            return
+        self.stopped = True
+        try:
+            close = getattr(self._iterator, "close", None)
+            if close is not None:
+                close()
+            self._on_stop()
+        finally:
+            self._end()
+
+
+class AsyncStreamResponse(_StreamTimings):
+    """Async iterator counterpart of StreamResponse"""
+
+    def __init__(self, chunks: AsyncIterator[str], **kwargs):
+        super().__init__(**kwargs)
+        self._iterator = chunks.__aiter__()
+
+    def __aiter__(self) -> "AsyncStreamResponse":
+        return self
+
+    async def __anext__(self) -> str:
+        try:
+            chunk = await self._iterator.__anext__()
+        except StopAsyncIteration:
+            if not self.completed:
+                try:
+                    self._on_finish()
+                finally:
+                    self._end()
+            raise
+        except BaseException:
+            self._end()
+            raise
+        self._on_chunk(chunk)
+        return chunk
+
+    async def read(self) -> str:
+        """Consume the rest of the stream and return the full text"""
+        async for _ in self:
+            pass
+        return self.text
+
+    async def aclose(self):
+        """Stop the stream early, closing the connection so no more tokens are generated"""
+        if self.completed or self.stopped:
+            return
+        self.stopped = True
+        try:
+            close = getattr(self._iterator, "aclose", None)
+            if close is not None:
+                await close()
+            self._on_stop()
+        finally:
+            self._end()
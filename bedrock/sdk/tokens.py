@@ -0,0 +1,47 @@
+from functools import lru_cache
+from typing import Optional
+
+# Context window sizes in tokens, matched against model ids by longest substring
+CONTEXT_WINDOWS = {
+    "anthropic.claude-instant": 100_000,
+    "anthropic.claude-v2": 100_000,
+    "anthropic.claude-3": 200_000,
+    "anthropic.claude-sonnet-4": 200_000,
+    "anthropic.claude-opus-4": 200_000,
+    "amazon.nova-micro": 128_000,
+    "amazon.nova-lite": 300_000,
+    "amazon.nova-pro": 300_000,
+    "amazon.nova-premier": 1_000_000,
+    "amazon.titan-text-lite": 4_096,
+    "amazon.titan-text-express": 8_192,
+    "amazon.titan-text-premier": 32_000,
+    "meta.llama3-": 8_192,
+    "meta.llama3-1": 128_000,
+    "meta.llama3-2": 128_000,
+    "meta.llama3-3": 128_000,
+    "mistral.mistral-7b": 32_000,
+    "mistral.mixtral-8x7b": 32_000,
+    "mistral.mistral-small": 32_000,
+    "mistral.mistral-large": 128_000,
+    "cohere.command-r": 128_000,
+    "ai21.jamba": 256_000,
+}
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Fast local token estimate
+
+    Uses the common ~4 characters per token rule of thumb for English text,
+    which is O(1) in Python and close enough for budgeting context windows.
+    """
+    return (len(text) + 3) // 4
+
+
+@lru_cache(maxsize=256)
+def context_window(model_id: str) -> Optional[int]:
+    """Look up the context window for a model id, or None if unknown"""
+    matches = [key for key in CONTEXT_WINDOWS if key in model_id]
+    if not matches:
+        return None
+    return CONTEXT_WINDOWS[max(matches, key=len)]